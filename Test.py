@@ -1,15 +1,18 @@
-import serial
-import struct
+import os
+
 import dash
 from dash.dependencies import Output, Input
-import dash_core_components as dcc
-import dash_html_components as html
+from dash import dcc
+from dash import html
 import plotly.graph_objs as go
 import dash_leaflet as dl
 from collections import deque
 from datetime import datetime, timedelta
 import dash_bootstrap_components as dbc
 
+from luftdaten.data_sources import open_source
+from luftdaten.frame_decoder import FrameDecoder
+
 # Define data Deques to save data
 pm1_values = deque()
 pm2_5_values = deque()
@@ -24,11 +27,11 @@ hum_values = deque()
 # Graphs x-axis limits to the last x minutes of data
 lim_x_axis = 2
 
-# Open the serial port (assuming serial data)
-ser = serial.Serial('COM7', 115200, timeout=1)
+# Open the data source (see data_sources.open_source), reads must not block the callback
+source = open_source(os.environ.get('LUFTDATEN_SOURCE', 'serial:COM7'), timeout=0)
 
-# Define the format of the struct
-struct_format = '<9fH5B3d'
+# Streaming decoder for the '<...>' frames coming from the data source
+decoder = FrameDecoder()
 
 # Initialisation of the Dash application
 app = dash.Dash(__name__)
@@ -110,29 +113,21 @@ def update_graph_scatter(n):
     min_time = None
     max_time = None
 
-    # Check if data is available from serial port
-    if ser.in_waiting > 0:
-        while ser.read() != b'<':
-            pass
-        struct_size = struct.calcsize(struct_format)
-        data = ser.read(struct_size)
-
-        if ser.read() == b'>':
-            if len(data) == struct_size:
-                unpacked_data = struct.unpack(struct_format, data)
-                pm1, pm25, pm10, sumBins, temp, altitude, hum, xtra, co2, year, month, day, hour, minute, second, lat, lng, heading = unpacked_data
+    # Decode all complete frames the data source has received since the last update
+    for unpacked_data in decoder.feed(source.read()):
+        pm1, pm25, pm10, sumBins, temp, altitude, hum, xtra, co2, year, month, day, hour, minute, second, lat, lng, heading = unpacked_data
 
-                # Append data to deque lists
-                timestamp = datetime(year, month, day, hour, minute, second)
-                pm1_values.append(pm1)
-                pm2_5_values.append(pm25)
-                pm10_values.append(pm10)
-                timestamps.append(timestamp)
-                lng_values.append(lng)
-                lat_values.append(lat)
-                hight_values.append(altitude)
-                temp_values.append(temp)
-                hum_values.append(hum)
+        # Append data to deque lists
+        timestamp = datetime(year, month, day, hour, minute, second)
+        pm1_values.append(pm1)
+        pm2_5_values.append(pm25)
+        pm10_values.append(pm10)
+        timestamps.append(timestamp)
+        lng_values.append(lng)
+        lat_values.append(lat)
+        hight_values.append(altitude)
+        temp_values.append(temp)
+        hum_values.append(hum)
 
     # Set the x-axis limits to the last 'lim_x_axis' minutes
     if timestamps:
@@ -275,4 +270,4 @@ def update_graph_scatter(n):
 
 # Start of the Dash server
 if __name__ == '__main__':
-    app.run_server(port=4052)
+    app.run(port=4052)
@@ -0,0 +1,42 @@
+# Cost of the alert rules of the dashboard on the ingestion path, per decoded batch and
+# per frame, at the batch sizes the reader thread sees (one frame per read at 1 frame/s,
+# thousands when catching up).
+#
+# Run from the repository root:  python -m benchmarks.bench_alerts
+import copy
+import json
+import time
+
+from luftdaten import dashboard
+from luftdaten.alerts import AlertEngine
+from luftdaten.data_sources import synthetic_values
+from luftdaten.sample_buffer import frame_columns
+from luftdaten.timestamps import frame_times
+
+BATCH_SIZES = (1, 10, 100, 1000)
+
+# Frames evaluated per batch size
+N_FRAMES = 20000
+
+
+def bench_batches(columns, times, batch_size):
+    engine = AlertEngine(copy.deepcopy(dashboard.ALERT_RULES), dashboard.ALERT_LOG_SIZE)
+    started = time.perf_counter()
+    for start in range(0, len(times), batch_size):
+        engine.update({name: values[start:start + batch_size] for name, values in columns.items()},
+                      times[start:start + batch_size], start)
+    elapsed = time.perf_counter() - started
+    batches = -(-len(times) // batch_size)
+    return {'batch_frames': batch_size, 'us_per_batch': round(elapsed / batches * 1e6, 1),
+            'us_per_frame': round(elapsed / len(times) * 1e6, 2), 'events': len(engine.events())}
+
+
+def run():
+    frames = [synthetic_values(i) for i in range(N_FRAMES)]
+    columns = frame_columns(frames)
+    times = frame_times(frames)
+    return [bench_batches(columns, times, batch_size) for batch_size in BATCH_SIZES]
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
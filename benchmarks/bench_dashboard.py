@@ -0,0 +1,153 @@
+# Latency and response size of the dashboard callbacks, and memory per buffered sample,
+# with the ring buffer filled with synthetic frames.
+#
+# Run from the repository root:  python -m benchmarks.bench_dashboard
+import gzip
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from luftdaten import dashboard
+from luftdaten.data_sources import synthetic_values
+from luftdaten.geo_grid import GeoGrid
+from luftdaten.rollups import RollupPyramid
+from luftdaten.sample_buffer import SampleBuffer, frame_columns
+from luftdaten.timestamps import frame_times
+
+BUFFER_SIZES = (1000, 10000, 100000, 1000000)
+
+# Timed calls per measurement, the median is reported
+REPEAT = 5
+
+
+# Fill a new ring buffer of the dashboard with 'n' synthetic frames at 1 frame/s. Returns
+# the heatmap version before the last frame
+def fill_buffer(n):
+    start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(seconds=n)
+    frames = [synthetic_values(i, start) for i in range(n)]
+    dashboard.samples = SampleBuffer(n)
+    times = dashboard.samples.extend(frames, frame_times(frames))
+    dashboard.rollups = RollupPyramid(dashboard.rollups.columns, dashboard.ROLLUP_TIERS)
+    dashboard.rollups.update(frame_columns(frames), times)
+    dashboard.grid = GeoGrid(dashboard.grid.columns, dashboard.grid.cell_degrees)
+    dashboard.grid.update(frame_columns(frames[:-1]), n - 1)
+    version = dashboard.grid.version
+    dashboard.grid.update(frame_columns(frames[-1:]), n)
+    return version
+
+
+# POST one callback request to /_dash-update-component like a browser (accepting gzip),
+# returns (seconds, response bytes, uncompressed bytes). Inputs and state of the callback
+# not given in 'values' are sent as None
+def post_callback(client, outputs, values, changed):
+    output = '..' + '...'.join(outputs) + '..'
+    spec = dashboard.app.callback_map[output]
+    body = {
+        'output': output,
+        'outputs': [dict(zip(('id', 'property'), output.rsplit('.', 1))) for output in outputs],
+        'inputs': [dict(item, value=values.get(f"{item['id']}.{item['property']}")) for item in spec['inputs']],
+        'state': [dict(item, value=values.get(f"{item['id']}.{item['property']}")) for item in spec['state']],
+        'changedPropIds': changed,
+    }
+    started = time.perf_counter()
+    response = client.post('/_dash-update-component', json=body, headers={'Accept-Encoding': 'gzip'})
+    elapsed = time.perf_counter() - started
+    assert response.status_code in (200, 204), response.status_code
+    uncompressed = response.data
+    if response.headers.get('Content-Encoding') == 'gzip':
+        uncompressed = gzip.decompress(uncompressed)
+    return elapsed, len(response.data), len(uncompressed)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def clear_render_caches():
+    for render in (dashboard.render_figures, dashboard.render_rollup_figures, dashboard.render_extend_data,
+                   dashboard.render_track, dashboard.render_track_delta, dashboard.render_heatmap):
+        render.cache_clear()
+
+
+# Median latency and response size of a callback request; without 'cached' the render
+# caches are cleared before every request, as for the first client after a new frame
+def measure(client, outputs, values, changed, cached=False):
+    runs = []
+    for _ in range(REPEAT):
+        if not cached:
+            clear_render_caches()
+        runs.append(post_callback(client, outputs, values, changed))
+    return {'latency_ms': round(median([elapsed for elapsed, _, _ in runs]) * 1000, 3),
+            'response_bytes': runs[-1][1], 'json_bytes': runs[-1][2]}
+
+
+# Callback latency and response size for a first load (uncached and cached), a time window
+# change, a one-frame update and an update without new data of the graphs, a first load of
+# a whole day (drawn from the rollups once there are enough samples), and for a first load
+# and update of the map track and heatmap
+def bench_callbacks(n, lim_x_axis=60):
+    grid_version = fill_buffer(n)
+    client = dashboard.app.server.test_client()
+    total = dashboard.samples.total
+    version = dashboard.samples.version
+    graph_outputs = [f'{graph_id}.figure' for graph_id in dashboard.graph_ids] + \
+                    [f'{graph_id}.extendData' for graph_id in dashboard.graph_ids] + ['graph-sent-index.data']
+    graph_inputs = {'graph-update.n_intervals': 1}
+    map_outputs = ['track-delta.data', 'map-sent-index.data']
+    map_inputs = {'graph-update.n_intervals': 1, 'live-map.zoom': 14}
+
+    def graphs(sent, changed, cached=False, minutes=lim_x_axis):
+        values = dict(graph_inputs, **{'graph-sent-index.data': sent,
+                                       'lim-x-axis-slider.value': dashboard.WINDOW_MINUTES.index(minutes)})
+        return measure(client, graph_outputs, values, [changed], cached)
+
+    def track(sent):
+        return measure(client, map_outputs, dict(map_inputs, **{'map-sent-index.data': sent}),
+                       ['graph-update.n_intervals'])
+
+    def heatmap(sent_version):
+        return measure(client, ['heatmap-delta.data', 'heatmap-sent-version.data'],
+                       {'heatmap-update.n_intervals': 1, 'heatmap-sent-version.data': sent_version},
+                       ['heatmap-update.n_intervals'])
+
+    return {
+        'samples': n,
+        'graphs_first_load': graphs(None, 'graph-update.n_intervals'),
+        'graphs_first_load_cached': graphs(None, 'graph-update.n_intervals', cached=True),
+        'graphs_window_change': graphs({'index': total, 'full': total, 'version': version},
+                                       'lim-x-axis-slider.value'),
+        'graphs_update': graphs({'index': total - 1, 'full': total - 1, 'version': None},
+                                'graph-update.n_intervals'),
+        'graphs_unchanged': graphs({'index': total, 'full': total, 'version': version},
+                                   'graph-update.n_intervals'),
+        'graphs_day_window': graphs(None, 'graph-update.n_intervals', minutes=24 * 60),
+        'map_first_load': track(None),
+        'map_update': track({'index': total - 1, 'zoom': 14, 'version': None}),
+        'heatmap_first_load': heatmap(None),
+        'heatmap_update': heatmap(grid_version),
+    }
+
+
+# Bytes allocated per sample by the ring buffer
+def bench_memory(n=100000):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    buffer = SampleBuffer(n)
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {'capacity': buffer.capacity, 'bytes_per_sample': round(allocated / n, 1)}
+
+
+def run(sizes=BUFFER_SIZES):
+    # Measure the polled updates, pushed ones don't go through the callbacks
+    dashboard.PUSH_UPDATES = False
+    return {
+        'callbacks': [bench_callbacks(n) for n in sizes],
+        'memory': bench_memory(),
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
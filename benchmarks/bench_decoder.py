@@ -0,0 +1,110 @@
+# Throughput test of the serial frame decoder on synthetic '<9fH5B3d' byte streams.
+#
+# Run from the repository root:  python -m benchmarks.bench_decoder
+import io
+import random
+import time
+
+from luftdaten.data_sources import synthetic_values
+from luftdaten.frame_decoder import FrameDecoder, encode_frame, frame_struct, struct_format, payload_struct
+
+N_FRAMES = 200000
+
+
+def synthetic_stream(n, garbage_every=0, seed=1):
+    rng = random.Random(seed)
+    parts = []
+    for i in range(n):
+        if garbage_every and i % garbage_every == 0:
+            # Line noise, a torn frame and a stray '<' between two good frames
+            parts.append(bytes(rng.randrange(256) for _ in range(rng.randrange(1, 20))))
+            parts.append(encode_frame(synthetic_values(i))[:rng.randrange(1, frame_struct.size)])
+            parts.append(b'<')
+        parts.append(encode_frame(synthetic_values(i)))
+    return b''.join(parts)
+
+
+# Split a stream into chunks of random size, as a serial port with bursty senders delivers it
+def random_chunks(data, max_chunk, seed=2):
+    rng = random.Random(seed)
+    pos = 0
+    while pos < len(data):
+        size = rng.randrange(1, max_chunk + 1)
+        yield data[pos:pos + size]
+        pos += size
+
+
+# The original byte-at-a-time reader, for comparison
+def legacy_decode(data):
+    port = io.BytesIO(data)
+    frames = []
+    while port.tell() < len(data):
+        while True:
+            byte = port.read(1)
+            if byte in (b'<', b''):
+                break
+        payload = port.read(payload_struct.size)
+        if port.read(1) == b'>' and len(payload) == payload_struct.size:
+            frames.append(payload_struct.unpack(payload))
+    return frames
+
+
+def check_decoder():
+    expected = [payload_struct.unpack(payload_struct.pack(*synthetic_values(i))) for i in range(2000)]
+
+    decoder = FrameDecoder()
+    frames = []
+    for chunk in random_chunks(synthetic_stream(2000), 300):
+        frames.extend(decoder.feed(chunk))
+    assert frames == expected, 'clean stream not decoded completely'
+    assert decoder.resyncs == 0 and decoder.bad_frames == 0 and decoder.pending == 0
+
+    decoder = FrameDecoder()
+    frames = []
+    for chunk in random_chunks(synthetic_stream(2000, garbage_every=50), 300):
+        frames.extend(decoder.feed(chunk))
+    assert frames == expected, 'frames lost after a desync'
+    assert decoder.resyncs > 0 and decoder.bad_frames > 0
+
+
+def bench(name, n_frames, run):
+    started = time.perf_counter()
+    decoded = run()
+    elapsed = time.perf_counter() - started
+    assert decoded == n_frames
+    return {'name': name, 'frames': decoded, 'seconds': round(elapsed, 4),
+            'frames_per_second': round(decoded / elapsed)}
+
+
+def decode_chunks(chunks):
+    decoder = FrameDecoder()
+    count = 0
+    for chunk in chunks:
+        count += len(decoder.feed(chunk))
+    return count
+
+
+def run(n_frames=N_FRAMES):
+    check_decoder()
+    clean = synthetic_stream(n_frames)
+    noisy = synthetic_stream(n_frames, garbage_every=100)
+    results = []
+    for chunk_size in (64, 512, 4096):
+        chunks = [clean[i:i + chunk_size] for i in range(0, len(clean), chunk_size)]
+        results.append(bench(f'chunked, {chunk_size} byte reads', n_frames, lambda: decode_chunks(chunks)))
+    chunks = list(random_chunks(noisy, 4096))
+    results.append(bench('chunked, noisy stream', n_frames, lambda: decode_chunks(chunks)))
+    results.append(bench('legacy byte-at-a-time', n_frames // 10,
+                         lambda: len(legacy_decode(clean[:len(clean) // 10]))))
+    return results
+
+
+def main():
+    print(f'struct {struct_format!r}, {frame_struct.size} bytes per frame')
+    for result in run():
+        print(f"{result['name']:<34} {result['frames']:>8} frames  {result['seconds'] * 1000:9.1f} ms  "
+              f"{result['frames_per_second']:>12,} frames/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# Startup cost of the entry points: wall time and peak memory of a fresh interpreter that
+# imports the module of a 'python -m luftdaten' command. The headless logger must not
+# load dash and plotly.
+#
+# Run from the repository root:  python -m benchmarks.bench_startup
+import json
+import subprocess
+import sys
+import time
+
+# Modules of the commands, as in luftdaten/__main__.py
+ENTRY_POINTS = {'log': 'luftdaten.logger', 'ingest': 'luftdaten.ingest', 'dashboard': 'luftdaten.dashboard'}
+
+# Fresh interpreters per entry point, the median is reported
+REPEAT = 5
+
+# Run in the child: peak resident memory in KB from /proc (Linux; getrusage would include
+# the memory of the benchmark process it was forked from), None where it can't be read
+_CHILD = '''
+import {module}
+try:
+    with open('/proc/self/status') as status:
+        print(next(line.split()[1] for line in status if line.startswith('VmHWM:')))
+except OSError:
+    print('null')
+'''
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def bench_entry_point(module):
+    seconds, memory = [], []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', _CHILD.format(module=module)], capture_output=True,
+                                text=True, check=True).stdout
+        seconds.append(time.perf_counter() - started)
+        memory.append(json.loads(output))
+    return {'startup_ms': round(median(seconds) * 1000, 1),
+            'peak_rss_kb': None if None in memory else median(memory)}
+
+
+def run():
+    return {command: bench_entry_point(module) for command, module in ENTRY_POINTS.items()}
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,314 @@
+# Load test of the dashboard's graph callback with many simultaneous viewers.
+#
+# Starts the dashboard in a child process with 'history' synthetic samples already buffered
+# and a synthetic source adding one frame per second, then lets N clients poll the graph
+# callback on /_dash-update-component every REFRESH seconds like a browser does (keeping
+# the returned graph-sent-index, moving the time window slider now and then). Reports the
+# latency percentiles, the throughput, the number of refreshes that came late and the CPU
+# and memory of the server (read from /proc, Linux only) for every history size and number
+# of clients. Needs no hardware and no packages beyond the dashboard's. The started
+# dashboard takes the settings from the environment, e.g. LUFTDATEN_CLIENT_WINDOWS=1.
+#
+# Run from the repository root:
+#   python -m benchmarks.load_test --clients 1 10 50 --history 3600 86400 [--output results.json]
+#   python -m benchmarks.load_test --url http://localhost:8000 --pid 1234   (a running dashboard)
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+# Seconds between two refreshes of a client, the interval of the dashboard's graph-update
+REFRESH = 1.0
+
+# Seconds every number of clients is measured
+DURATION = 20
+
+# Chance per refresh that a client moves the time window slider instead
+SLIDER_CHANCE = 0.05
+
+# Port of the dashboard started by the load test
+PORT = 8950
+
+# Seconds to wait for the started dashboard to answer
+STARTUP_TIMEOUT = 120
+
+
+# Child process: the dashboard with 'history' samples buffered, polled updates (the
+# worst case, pushed updates hardly reach the callback) and a synthetic source. The
+# callbacks are registered on import, so the setting goes in the environment first.
+# Exits with an error if the reader thread stops: the clients would only measure a
+# buffer that no longer changes
+def serve(history, port, rate):
+    import logging
+
+    os.environ['LUFTDATEN_PUSH_UPDATES'] = '0'
+    from benchmarks.bench_dashboard import fill_buffer
+    from luftdaten import dashboard
+    from luftdaten.data_sources import open_source
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    fill_buffer(history)
+    reader = dashboard.start_ingestion([('device1', open_source(f'synthetic:{rate:g}', timeout=0))],
+                                       record_path='')
+    threading.Thread(target=dashboard.app.server.run, kwargs={'port': port, 'threaded': True}, daemon=True).start()
+    reader.join()
+    sys.exit('The reader thread of the dashboard stopped')
+
+
+def start_server(history, port, rate):
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.load_test', '--serve', '--history', str(history),
+                                '--port', str(port), '--rate', str(rate)])
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Dashboard exited with {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('localhost', port, timeout=5)
+            connection.request('GET', '/_dash-dependencies')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.5)
+    process.kill()
+    raise RuntimeError('Dashboard did not start')
+
+
+# CPU seconds (user + system) and resident memory in bytes of process 'pid', None if /proc
+# can't be read
+def process_usage(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            # Fields after the command name, which may contain spaces
+            fields = stat.read().rpartition(')')[2].split()
+        with open(f'/proc/{pid}/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK'), pages * os.sysconf('SC_PAGE_SIZE')
+
+
+# Component 'component_id' in the layout JSON of a Dash app, None if it isn't there
+def find_component(layout, component_id):
+    if isinstance(layout, list):
+        return next((found for item in layout if (found := find_component(item, component_id))), None)
+    if not isinstance(layout, dict):
+        return None
+    props = layout.get('props', {})
+    if props.get('id') == component_id:
+        return layout
+    return find_component(props.get('children'), component_id)
+
+
+# Request body of the graph callback from the dependencies and layout the dashboard serves
+class GraphCallback:
+    def __init__(self, host, port):
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        connection.request('GET', '/_dash-dependencies')
+        dependencies = json.loads(connection.getresponse().read())
+        connection.request('GET', '/_dash-layout')
+        slider = find_component(json.loads(connection.getresponse().read()), 'lim-x-axis-slider')['props']
+        connection.close()
+        spec = next(dependency for dependency in dependencies if dependency['output'].startswith('..') and
+                    'graph-sent-index.data' in dependency['output'] and '@' not in dependency['output'])
+        self.output = spec['output']
+        self.outputs = [dict(zip(('id', 'property'), output.rsplit('.', 1)))
+                        for output in spec['output'].strip('.').split('...')]
+        self.inputs = spec['inputs']
+        self.state = spec['state']
+        # The browser applies the slider itself with CLIENT_WINDOWS, it's no input then
+        slider_input = any(item['id'] == 'lim-x-axis-slider' for item in self.inputs)
+        self.slider_values = range(slider['min'], slider['max'] + 1, slider.get('step', 1)) if slider_input else ()
+        self.slider_value = slider['value']
+
+    def body(self, values, changed):
+        return json.dumps({
+            'output': self.output,
+            'outputs': self.outputs,
+            'inputs': [dict(item, value=values.get(f"{item['id']}.{item['property']}")) for item in self.inputs],
+            'state': [dict(item, value=values.get(f"{item['id']}.{item['property']}")) for item in self.state],
+            'changedPropIds': [changed],
+        })
+
+
+# One viewer: refreshes every REFRESH seconds until 'stop', on its own keep-alive connection
+class Client(threading.Thread):
+    def __init__(self, host, port, callback, stop, seed):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.callback = callback
+        self.stop = stop
+        self.random = random.Random(seed)
+        self.latencies = []
+        self.late = 0
+        self.errors = 0
+        self.response_bytes = 0
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        values = {'graph-update.n_intervals': 0, 'lim-x-axis-slider.value': self.callback.slider_value}
+        # Spread the clients over the refresh interval like browsers opened at different times
+        next_refresh = time.monotonic() + self.random.random() * REFRESH
+        while not self.stop.is_set():
+            wait = next_refresh - time.monotonic()
+            if wait > 0:
+                self.stop.wait(wait)
+                if self.stop.is_set():
+                    break
+            else:
+                # The last request ran past the time of this refresh
+                self.late += 1
+                if wait < -REFRESH:
+                    # Past a whole refresh, the browser would have skipped one
+                    next_refresh = time.monotonic()
+            next_refresh += REFRESH
+
+            if self.callback.slider_values and self.random.random() < SLIDER_CHANCE:
+                values['lim-x-axis-slider.value'] = self.random.choice(self.callback.slider_values)
+                changed = 'lim-x-axis-slider.value'
+            else:
+                values['graph-update.n_intervals'] += 1
+                changed = 'graph-update.n_intervals'
+            self.request(connection, values, changed)
+        connection.close()
+
+    def request(self, connection, values, changed):
+        started = time.perf_counter()
+        try:
+            connection.request('POST', '/_dash-update-component', self.callback.body(values, changed),
+                               {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'})
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.errors += 1
+            connection.close()
+            return
+        self.latencies.append(time.perf_counter() - started)
+        self.response_bytes += len(data)
+        if response.status == 200:
+            if response.getheader('Content-Encoding') == 'gzip':
+                data = gzip.decompress(data)
+            sent = json.loads(data)['response'].get('graph-sent-index', {}).get('data')
+            if sent is not None:
+                values['graph-sent-index.data'] = sent
+        elif response.status != 204:
+            self.errors += 1
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q / 100 * len(values)), len(values) - 1)] if values else None
+
+
+# Run 'n' clients for 'duration' seconds against the dashboard, with the CPU and memory of
+# process 'pid' if given
+def run_clients(host, port, callback, n, duration, pid=None):
+    stop = threading.Event()
+    clients = [Client(host, port, callback, stop, seed) for seed in range(n)]
+    usage_before = process_usage(pid) if pid else None
+    peak_memory = usage_before[1] if usage_before else None
+    started = time.monotonic()
+    for client in clients:
+        client.start()
+    while time.monotonic() - started < duration:
+        time.sleep(0.5)
+        usage = process_usage(pid) if pid else None
+        if usage and peak_memory is not None:
+            peak_memory = max(peak_memory, usage[1])
+    stop.set()
+    for client in clients:
+        client.join()
+    elapsed = time.monotonic() - started
+    usage_after = process_usage(pid) if pid else None
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    requests = len(latencies)
+    result = {
+        'clients': n,
+        'requests': requests,
+        'errors': sum(client.errors for client in clients),
+        'throughput_rps': round(requests / elapsed, 1),
+        'late_refreshes': sum(client.late for client in clients),
+        'kb_per_response': round(sum(client.response_bytes for client in clients) / max(requests, 1) / 1024, 1),
+    }
+    for q in (50, 95, 99):
+        value = percentile(latencies, q)
+        result[f'p{q}_ms'] = None if value is None else round(value * 1000, 1)
+    if usage_before and usage_after:
+        result['server_cpu_percent'] = round((usage_after[0] - usage_before[0]) / elapsed * 100, 1)
+        result['server_rss_mb'] = round(usage_after[1] / 2 ** 20, 1)
+        result['server_peak_rss_mb'] = round(peak_memory / 2 ** 20, 1)
+    return result
+
+
+def print_result(history, result):
+    cpu = result.get('server_cpu_percent')
+    memory = result.get('server_rss_mb')
+    print(f"history {history if history is not None else '-':>8}  clients {result['clients']:>4}  "
+          f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+          f"{result['throughput_rps']} req/s  late {result['late_refreshes']}  errors {result['errors']}  "
+          f"cpu {cpu if cpu is not None else '-'} %  rss {memory if memory is not None else '-'} MB",
+          file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test of the dashboard graph callback with N clients')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 50, 100],
+                        help='numbers of simultaneous clients to measure (default: %(default)s)')
+    parser.add_argument('--history', type=int, nargs='+', default=[3600, 86400],
+                        help='samples buffered before the test, one dashboard per size (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=DURATION,
+                        help='seconds every number of clients runs (default: %(default)s)')
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help='frames per second of the synthetic source (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=PORT, help='port of the started dashboard')
+    parser.add_argument('--url', help='test a running dashboard instead of starting one (no --history)')
+    parser.add_argument('--pid', type=int, help='process ID of the running dashboard, for its CPU and memory')
+    parser.add_argument('--output', help='file to write the JSON results to (default: stdout)')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.history[0], args.port, args.rate)
+        return
+
+    results = []
+    if args.url:
+        address = urllib.parse.urlsplit(args.url)
+        callback = GraphCallback(address.hostname, address.port or 80)
+        for n in args.clients:
+            result = run_clients(address.hostname, address.port or 80, callback, n, args.duration, args.pid)
+            print_result(None, result)
+            results.append(dict(result, history=None))
+    else:
+        for history in args.history:
+            server = start_server(history, args.port, args.rate)
+            try:
+                callback = GraphCallback('localhost', args.port)
+                for n in args.clients:
+                    result = run_clients('localhost', args.port, callback, n, args.duration, server.pid)
+                    if server.poll() is not None:
+                        raise RuntimeError(f'Dashboard exited with {server.returncode} during the run')
+                    print_result(history, result)
+                    results.append(dict(result, history=history))
+            finally:
+                server.terminate()
+                server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
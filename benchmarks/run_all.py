@@ -0,0 +1,50 @@
+# Benchmark suite: decoder throughput, callback latency and response size at growing
+# buffer sizes, and memory per sample. Runs offline on synthetic frames and writes the
+# results as JSON, so runs on different commits can be compared.
+#
+# Run from the repository root:  python -m benchmarks.run_all [--output results.json]
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks import bench_alerts, bench_dashboard, bench_decoder, bench_startup
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the dashboard benchmark suite')
+    parser.add_argument('--output', help='file to write the JSON results to (default: stdout)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=bench_dashboard.BUFFER_SIZES,
+                        help='buffered sample counts to measure the callbacks at')
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'decoder': bench_decoder.run(),
+        'startup': bench_startup.run(),
+        'alerts': bench_alerts.run(),
+        **bench_dashboard.run(args.sizes),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
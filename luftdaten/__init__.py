@@ -0,0 +1,37 @@
+import importlib
+
+# Air quality sensor package: frame decoding, flight logs, ingestion and the live dashboard.
+#
+# Nothing is imported with the package itself. Submodules and the names below are loaded
+# on first access (luftdaten.FlightRecorder, luftdaten.dashboard, ...), so the headless
+# logger never pays for dash and plotly.
+
+# Public names and the submodule they live in
+_exports = {
+    'FrameDecoder': 'frame_decoder',
+    'encode_frame': 'frame_decoder',
+    'FlightRecorder': 'flight_recorder',
+    'open_records': 'flight_recorder',
+    'read_time_range': 'flight_recorder',
+    'open_source': 'data_sources',
+    'SampleBuffer': 'sample_buffer',
+    'SharedRing': 'shared_ring',
+}
+
+_submodules = ('alerts', 'dashboard', 'data_sources', 'downsample', 'export', 'flight_recorder', 'frame_decoder',
+               'geo_grid', 'ingest', 'live_stream', 'logger', 'map_track', 'metrics', 'multi_ingest', 'rolling_stats',
+               'rollups', 'sample_buffer', 'shared_ring', 'timestamps', 'typed_arrays')
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name in _exports:
+        return getattr(importlib.import_module(f'.{_exports[name]}', __name__), name)
+    if name in _submodules:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports) | set(_submodules))
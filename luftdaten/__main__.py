@@ -0,0 +1,27 @@
+import importlib
+import sys
+
+# Commands of 'python -m luftdaten' and the module each one runs. Only that module is
+# imported, so 'log' starts without dash and plotly
+commands = {
+    'log': ('logger', 'headless logger: decode the frames and append them to the flight log, optionally '
+                      'relaying them to dashboards on a local socket'),
+    'ingest': ('ingest', 'ingestion process publishing the samples in shared memory for the dashboards'),
+    'dashboard': ('dashboard', 'live dashboard'),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in commands:
+        lines = ['usage: python -m luftdaten {%s} [options]' % ','.join(commands), '']
+        lines += [f'  {command:10} {description}' for command, (_, description) in commands.items()]
+        print('\n'.join(lines), file=sys.stderr)
+        return 0 if argv and argv[0] in ('-h', '--help') else 2
+    module = importlib.import_module(f'luftdaten.{commands[argv[0]][0]}')
+    module.main(argv[1:], prog=f'python -m luftdaten {argv[0]}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import itertools
+import threading
+from collections import deque
+
+import numpy as np
+
+# Alert rules watch one column and tell for every sample of a batch whether their condition
+# holds: 'condition(times, values)' gets the timestamps (epoch ms) and values of a batch as
+# arrays and returns a boolean array, computed for the whole batch at once. What a rule
+# needs from earlier batches (its state, the last values) is kept in the rule, so a batch
+# of one frame and a batch of thousands give the same result. AlertEngine turns the
+# changes of the conditions into events.
+
+
+# Value at or above 'on', until it drops to 'off' or below again (hysteresis, so a value
+# hovering around the limit doesn't raise an event per frame)
+class ThresholdRule:
+    def __init__(self, name, column, on, off):
+        self.name = name
+        self.column = column
+        self.on = on
+        self.off = off
+        self._active = False
+
+    def condition(self, times, values):
+        # +1 where a value switches the alert on, -1 where it switches it off, every value
+        # in between keeps the state of the last switch before it
+        switch = np.where(values >= self.on, 1, np.where(values <= self.off, -1, 0))
+        last = np.maximum.accumulate(np.where(switch != 0, np.arange(len(values)), -1))
+        state = np.where(last >= 0, switch[np.maximum(last, 0)] > 0, self._active)
+        self._active = bool(state[-1])
+        return state
+
+
+# Value changed by 'limit' or more within 'seconds' seconds: compared with the last sample
+# at least 'seconds' older (timestamps only have whole seconds, consecutive frames can't be
+# divided by their time difference)
+class RateRule:
+    def __init__(self, name, column, limit, seconds=10):
+        self.name = name
+        self.column = column
+        self.limit = limit
+        self.seconds = seconds
+        self._times = np.zeros(0, dtype=np.int64)
+        self._values = np.zeros(0)
+
+    def condition(self, times, values):
+        all_times = np.concatenate([self._times, times])
+        all_values = np.concatenate([self._values, values])
+        length = self.seconds * 1000
+        before = np.searchsorted(all_times, times - length, 'right') - 1
+        change = values - all_values[np.maximum(before, 0)]
+        state = (before >= 0) & (np.abs(change) >= self.limit)
+
+        # Keep the samples later ones may be compared with
+        keep = max(int(np.searchsorted(all_times, all_times[-1] - length, 'right')) - 1, 0)
+        self._times, self._values = all_times[keep:], all_values[keep:]
+        return state
+
+
+# Spike: value 'threshold' or more standard deviations away from the mean of the 'samples'
+# values before it. Needs 'min_samples' values before it, missing values are skipped
+class ZScoreRule:
+    def __init__(self, name, column, threshold, samples=300, min_samples=30):
+        self.name = name
+        self.column = column
+        self.threshold = threshold
+        self.samples = samples
+        self.min_samples = min_samples
+        self._history = np.zeros(0)
+
+    def condition(self, times, values):
+        valid = np.isfinite(values)
+        history = np.concatenate([self._history, values[valid]])
+        # Running sums relative to the first value, so the variance doesn't cancel out
+        shifted = history - history[0] if len(history) else history
+        sums = np.concatenate([[0.0], np.cumsum(shifted)])
+        squares = np.concatenate([[0.0], np.cumsum(shifted ** 2)])
+
+        # Window [position - n, position) of every new value
+        positions = len(self._history) + np.arange(valid.sum())
+        n = np.minimum(positions, self.samples)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (sums[positions] - sums[positions - n]) / n
+            variance = (squares[positions] - squares[positions - n] - n * mean ** 2) / (n - 1)
+            z = (shifted[positions] - mean) / np.sqrt(np.maximum(variance, 0))
+        spikes = (n >= self.min_samples) & (variance > 0) & (np.abs(z) >= self.threshold)
+
+        self._history = history[-self.samples:]
+        state = np.zeros(len(values), dtype=bool)
+        state[valid] = spikes
+        return state
+
+
+# Stuck sensor: value hasn't changed by more than 'tolerance' for 'seconds' seconds.
+# Missing values count as a change
+class StuckRule:
+    def __init__(self, name, column, seconds, tolerance=0.0):
+        self.name = name
+        self.column = column
+        self.seconds = seconds
+        self.tolerance = tolerance
+        self._last = None
+        self._run_start = None
+
+    def condition(self, times, values):
+        previous = np.concatenate([[values[0] if self._last is None else self._last], values[:-1]])
+        changed = ~(np.abs(values - previous) <= self.tolerance)
+        if self._run_start is None:
+            changed[0] = True
+        # Time of the last change at or before every sample
+        run_start = np.maximum.accumulate(np.where(changed, times, np.iinfo(np.int64).min))
+        if self._run_start is not None:
+            run_start = np.maximum(run_start, self._run_start)
+        self._last = values[-1]
+        self._run_start = int(run_start[-1])
+        return times - run_start >= self.seconds * 1000
+
+
+# Evaluates the rules on every batch of samples and keeps the last 'capacity' events.
+#
+# An event is logged where the condition of a rule starts ('begin') or stops ('end') to
+# hold: {'id', 'index', 'time' (epoch ms), 'rule', 'column', 'kind', 'value', 'lat', 'lng'},
+# 'id' counts all events ever logged, 'index' is the global index of the sample.
+#
+# 'version' is the global index of the sample after the one of the newest event, 0 before
+# the first. Not a counter of the process: every dashboard worker attached to the same
+# ingestion process (SHARED_MEMORY) evaluates the same samples, so it has the same events
+# at the same version, however the samples were batched.
+class AlertEngine:
+    def __init__(self, rules, capacity=200):
+        self.rules = rules
+        self.version = 0
+        self.lock = threading.Lock()
+        self._events = deque(maxlen=capacity)
+        self._ids = itertools.count()
+        self._active = [False] * len(rules)
+        self._counts = {rule.name: 0 for rule in rules}
+
+    # Evaluate a batch: a mapping of column arrays (see sample_buffer.frame_columns, or flight
+    # log records) with 'lat' and 'lng', their timestamps (epoch ms) and the global index of
+    # the first sample. Only called from one thread
+    def update(self, columns, times, start):
+        if not len(times):
+            return
+        times = np.asarray(times, dtype=np.int64)
+        events = []
+        for number, rule in enumerate(self.rules):
+            values = np.asarray(columns[rule.column], dtype=np.float64)
+            state = rule.condition(times, values)
+            previous = np.concatenate([[self._active[number]], state[:-1]])
+            for position in np.flatnonzero(state != previous).tolist():
+                events.append((int(times[position]), position, number, 'begin' if state[position] else 'end',
+                               float(values[position]), float(columns['lat'][position]),
+                               float(columns['lng'][position])))
+            self._active[number] = bool(state[-1])
+        if not events:
+            return
+
+        with self.lock:
+            for t, position, number, kind, value, lat, lng in sorted(events):
+                rule = self.rules[number]
+                self._events.append({'id': next(self._ids), 'index': start + position, 'time': t, 'rule': rule.name,
+                                     'column': rule.column, 'kind': kind, 'value': value, 'lat': lat, 'lng': lng})
+                if kind == 'begin':
+                    self._counts[rule.name] += 1
+            self.version = max(self.version, start + max(event[1] for event in events) + 1)
+
+    # Logged events, oldest first
+    def events(self):
+        with self.lock:
+            return list(self._events)
+
+    # Names of the rules whose condition holds at the last sample
+    def active(self):
+        return [rule.name for rule, active in zip(self.rules, self._active) if active]
+
+    # Events that began per rule name, including those no longer in the log
+    def counts(self):
+        with self.lock:
+            return dict(self._counts)
@@ -0,0 +1,113 @@
+// Client-side rendering of the flight track on the live map
+
+// Color of a PM value between hideout.min (green) and hideout.max (red)
+function pmColor(value, hideout) {
+    const t = Math.min(Math.max((value - hideout.min) / (hideout.max - hideout.min), 0), 1);
+    return `hsl(${Math.round(120 * (1 - t))}, 90%, 45%)`;
+}
+
+window.luftdaten = Object.assign({}, window.luftdaten, {
+    map: {
+        // Draw every track point as a small circle colored by hideout.colorProp
+        pointToLayer: function (feature, latlng, context) {
+            const hideout = context.hideout;
+            const color = pmColor(feature.properties[hideout.colorProp], hideout);
+            return L.circleMarker(latlng, {radius: 3, stroke: false, fillColor: color, fillOpacity: 0.8});
+        },
+
+        // Mark where an alert rule started to hold with a ring in hideout.color
+        alertToLayer: function (feature, latlng, context) {
+            return L.circleMarker(latlng, {radius: 8, color: context.hideout.color, weight: 2, fillOpacity: 0});
+        },
+
+        // Fill every heatmap cell with the color of its hideout.colorProp
+        cellStyle: function (feature, context) {
+            const color = pmColor(feature.properties[context.hideout.colorProp], context.hideout);
+            return {stroke: false, fillColor: color, fillOpacity: 0.5};
+        }
+    }
+});
+
+// Number of points kept in the small "recent" layer before they are moved to the history layer
+const RECENT_FEATURES = 200;
+
+// Minimum distance in screen pixels between track points, as MIN_PIXEL_DISTANCE in map_track.py
+const TRACK_MIN_PIXEL_DISTANCE = 4;
+
+// Decimation cells of the drawn track points and the zoom level they are for
+const trackCells = {zoom: null, cells: new Set()};
+
+// Decimation cell of a point at the given zoom level, as map_track.decimate
+function trackCell(lat, lng, zoom) {
+    const size = TRACK_MIN_PIXEL_DISTANCE * 360.0 / (256 * Math.pow(2, zoom));
+    return Math.floor(lat / size) + ':' + Math.floor(lng / size);
+}
+
+function featureCell(feature, zoom) {
+    return trackCell(feature.geometry.coordinates[1], feature.geometry.coordinates[0], zoom);
+}
+
+function featureCollection(features) {
+    return {type: 'FeatureCollection', features: features};
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    luftdaten: Object.assign({}, (window.dash_clientside || {}).luftdaten, {
+        // Append the new track points sent by the server to the map layers.
+        //
+        // New points go to the "recent" layer, so a tick only redraws a few points. Once it
+        // holds RECENT_FEATURES points they are moved to the history layer in one go.
+        // New points in a decimation cell that already has one are dropped, like the server
+        // does for the whole track. A delta with 'reset' replaces the whole track.
+        mergeTrack: function (delta, zoom, history, recent) {
+            const noUpdate = window.dash_clientside.no_update;
+            if (!delta) {
+                return [noUpdate, noUpdate];
+            }
+            const drawn = delta.reset ? [] : ((history && history.features) || []).concat(
+                (recent && recent.features) || []);
+            if (delta.reset || trackCells.zoom !== zoom) {
+                trackCells.zoom = zoom;
+                trackCells.cells = new Set(drawn.map(feature => featureCell(feature, zoom)));
+            }
+            const features = delta.features.filter(feature => {
+                const cell = featureCell(feature, zoom);
+                if (trackCells.cells.has(cell)) {
+                    return false;
+                }
+                trackCells.cells.add(cell);
+                return true;
+            });
+            if (delta.reset) {
+                return [featureCollection(features), featureCollection([])];
+            }
+            if (!features.length) {
+                return [noUpdate, noUpdate];
+            }
+            const recentFeatures = ((recent && recent.features) || []).concat(features);
+            if (recentFeatures.length < RECENT_FEATURES) {
+                return [noUpdate, featureCollection(recentFeatures)];
+            }
+            const historyFeatures = ((history && history.features) || []).concat(recentFeatures);
+            return [featureCollection(historyFeatures), featureCollection([])];
+        },
+
+        // Replace the heatmap cells sent by the server, matched by their id, and add the new
+        // ones. A delta with 'reset' replaces all cells
+        mergeCells: function (delta, cells) {
+            if (!delta) {
+                return window.dash_clientside.no_update;
+            }
+            if (delta.reset || !cells) {
+                return featureCollection(delta.features);
+            }
+            const changed = new Map(delta.features.map(feature => [feature.properties.id, feature]));
+            const features = cells.features.map(feature => {
+                const update = changed.get(feature.properties.id);
+                changed.delete(feature.properties.id);
+                return update || feature;
+            });
+            return featureCollection(features.concat(Array.from(changed.values())));
+        }
+    })
+});
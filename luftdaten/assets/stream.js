@@ -0,0 +1,95 @@
+// Push updates of the live graphs and map through Server-Sent Events (PUSH_UPDATES in dashboard.py)
+
+// Buffer columns of the traces of every graph, as graph_columns in dashboard.py
+const STREAM_GRAPH_COLUMNS = [['temp', 'hum'], ['pm1'], ['pm25'], ['pm10'], ['altitude']];
+
+// Open event source and the global index of the next sample the graphs and the map expect
+const liveStream = {source: null, next: 0, mapNext: 0, previous: null, full: null};
+
+// Ask the server for complete figures, after a gap in the stream or when it tells us to
+function requestResync() {
+    if (liveStream.source) {
+        liveStream.source.close();
+        liveStream.source = null;
+    }
+    window.dash_clientside.set_props('stream-resync', {data: Date.now()});
+}
+
+// (Re)connect to the stream, starting with the sample 'since'
+function openStream(since) {
+    if (liveStream.source) {
+        liveStream.source.close();
+    }
+    liveStream.next = since;
+    const source = new EventSource('stream?since=' + since);
+    source.onmessage = function (event) {
+        const batch = JSON.parse(event.data);
+        if (batch.start > liveStream.next) {
+            requestResync();
+        } else {
+            window.dash_clientside.set_props('live-stream', {data: batch});
+        }
+    };
+    source.addEventListener('resync', requestResync);
+    liveStream.source = source;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    stream: {
+        // Follow the complete figures rendered by the server: the graphs restart the stream
+        // after their last sample, the map only takes points after its last one. Updates of
+        // the graphs that are no complete figures (new buckets for CLIENT_WINDOWS) keep it
+        followStream: function (graphSent, mapSent) {
+            const triggered = window.dash_clientside.callback_context.triggered.map(t => t.prop_id);
+            if (graphSent && triggered.includes('graph-sent-index.data') &&
+                (graphSent.full !== liveStream.full || !liveStream.source)) {
+                liveStream.full = graphSent.full;
+                openStream(graphSent.index);
+            }
+            if (mapSent && triggered.includes('map-sent-index.data')) {
+                liveStream.mapNext = mapSent.index;
+                liveStream.previous = null;
+            }
+            return window.dash_clientside.no_update;
+        },
+
+        // extendData of every graph and the new track points of a pushed batch
+        applyBatch: function (batch, zoom, graphSent) {
+            const noUpdate = window.dash_clientside.no_update;
+            const skip = batch ? Math.max(liveStream.next - batch.start, 0) : 0;
+            if (!batch || skip >= batch.time.length || !graphSent) {
+                return STREAM_GRAPH_COLUMNS.map(() => noUpdate).concat([noUpdate]);
+            }
+            const column = name => batch[name].slice(skip);
+            const time = column('time');
+            liveStream.next = batch.start + batch.time.length;
+
+            // Graphs drawn from the rollups are redrawn by the server instead, graphs drawn by
+            // the browser (CLIENT_WINDOWS) take the batch from 'live-stream' themselves
+            const extendData = STREAM_GRAPH_COLUMNS.map(columns => graphSent.rollup || graphSent.client ? noUpdate : [
+                {x: columns.map(() => time), y: columns.map(column)},
+                columns.map((_, i) => i),
+                graphSent.max_points
+            ]);
+
+            // Points in the cell of the one before are dropped right away, mergeTrack (map.js)
+            // drops those in any other cell the track already has a point in
+            const features = [];
+            for (let k = skip; k < batch.time.length; k++) {
+                const index = batch.start + k;
+                const lat = batch.lat[k], lng = batch.lng[k];
+                const cell = trackCell(lat, lng, zoom);
+                if (index >= liveStream.mapNext && cell !== liveStream.previous) {
+                    features.push({
+                        type: 'Feature',
+                        geometry: {type: 'Point', coordinates: [lng, lat]},
+                        properties: {i: index, pm1: batch.pm1[k], pm25: batch.pm25[k], pm10: batch.pm10[k]}
+                    });
+                }
+                liveStream.previous = cell;
+            }
+            liveStream.mapNext = Math.max(liveStream.mapNext, liveStream.next);
+            return extendData.concat([{reset: false, features: features}]);
+        }
+    }
+});
@@ -0,0 +1,198 @@
+// Graphs drawn in the browser from its own copy of the recent samples (CLIENT_WINDOWS in dashboard.py)
+
+// Plain array of a typed array spec ({dtype, bdata}, see typed_arrays.py) or of a list
+function decodeValues(values) {
+    if (Array.isArray(values)) {
+        return values;
+    }
+    const bytes = Uint8Array.from(atob(values.bdata), c => c.charCodeAt(0));
+    const types = {f4: Float32Array, f8: Float64Array};
+    return Array.from(new types[values.dtype](bytes.buffer));
+}
+
+// Position of the first time at or after 'minTime' in the sorted 'times'
+function firstIndexFrom(times, minTime) {
+    let low = 0, high = times.length;
+    while (low < high) {
+        const middle = (low + high) >> 1;
+        if (times[middle] < minTime) {
+            low = middle + 1;
+        } else {
+            high = middle;
+        }
+    }
+    return low;
+}
+
+// Append the series of 'update' (decoded) to those of 'data', dropping the first 'skip'
+// values of the update, and keep only the values from 'minTime' on
+function appendSeries(data, update, names, skip, minTime) {
+    const merged = {};
+    for (const name of names) {
+        merged[name] = data[name].concat(decodeValues(update[name]).slice(skip));
+    }
+    const cut = firstIndexFrom(merged.time, minTime);
+    for (const name of names) {
+        merged[name] = merged[name].slice(cut);
+    }
+    return [merged, cut];
+}
+
+// Indices of the lowest and highest value of every group of samples, at most 'maxPoints'
+// in total, in order. Keeps the peaks a plain stride would skip
+function minMaxIndices(values, first, last, maxPoints) {
+    const count = last - first;
+    if (count <= maxPoints) {
+        return Array.from({length: count}, (_, i) => first + i);
+    }
+    const groups = Math.max(Math.floor(maxPoints / 2), 1);
+    const indices = [];
+    for (let group = 0; group < groups; group++) {
+        const start = first + Math.floor(group * count / groups);
+        const end = first + Math.floor((group + 1) * count / groups);
+        let low = start, high = start;
+        for (let i = start + 1; i < end; i++) {
+            // Missing values (null from the stream, NaN from the server) are never picked over a number
+            if (values[i] === null || Number.isNaN(values[i])) {
+                continue;
+            }
+            if (!(values[low] <= values[i])) {
+                low = i;
+            }
+            if (!(values[high] >= values[i])) {
+                high = i;
+            }
+        }
+        indices.push(Math.min(low, high));
+        if (high !== low) {
+            indices.push(Math.max(low, high));
+        }
+    }
+    return indices;
+}
+
+// Buckets [first, last) merged in groups to at most 'maxPoints': the mean of the means
+// and the min and max of every group
+function mergeBuckets(buckets, column, first, last, maxPoints, halfBucket) {
+    const factor = Math.max(Math.ceil((last - first) / maxPoints), 1);
+    const merged = {time: [], mean: [], min: [], max: []};
+    for (let start = first; start < last; start += factor) {
+        const end = Math.min(start + factor, last);
+        let sum = 0, low = Infinity, high = -Infinity;
+        for (let i = start; i < end; i++) {
+            sum += buckets[column + '_mean'][i];
+            low = Math.min(low, buckets[column + '_min'][i]);
+            high = Math.max(high, buckets[column + '_max'][i]);
+        }
+        // Every group at the center of its buckets
+        merged.time.push((buckets.time[start] + buckets.time[end - 1]) / 2 + halfBucket);
+        merged.mean.push(sum / (end - start));
+        merged.min.push(low);
+        merged.max.push(high);
+    }
+    return merged;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    windows: {
+        // Merge the samples and buckets sent by the server, or a pushed batch, into the
+        // browser's copy: the samples of the last CLIENT_RAW_MINUTES and the buckets of the
+        // longest time window, as plain arrays
+        mergeSamples: function (delta, batch, data, config) {
+            const triggered = window.dash_clientside.callback_context.triggered.map(t => t.prop_id);
+            const update = triggered.includes('live-stream.data') ? batch : delta;
+            if (!update || !config) {
+                return window.dash_clientside.no_update;
+            }
+            const columns = config.columns.flat();
+            const sampleNames = ['time'].concat(columns);
+            const bucketNames = ['time'].concat(
+                columns.flatMap(column => ['mean', 'min', 'max'].map(stat => column + '_' + stat)));
+            const empty = names => Object.fromEntries(names.map(name => [name, []]));
+            if (!data || update.reset) {
+                data = {start: update.start || 0, samples: empty(sampleNames), buckets: empty(bucketNames)};
+            }
+            let samples = data.samples, start = data.start, buckets = data.buckets;
+
+            if (update.time) {
+                const end = start + samples.time.length;
+                if (update.start > end) {
+                    // Samples missed in between, the older ones are dropped
+                    samples = empty(sampleNames);
+                    start = update.start;
+                }
+                const skip = Math.max(start + samples.time.length - update.start, 0);
+                const times = decodeValues(update.time);
+                const last = times.length > skip ? times[times.length - 1] :
+                    samples.time[samples.time.length - 1];
+                let cut;
+                [samples, cut] = appendSeries(samples, Object.assign({}, update, {time: times}), sampleNames, skip,
+                                              last - config.raw_minutes * 60000);
+                start += cut;
+            }
+
+            if (update.buckets && update.buckets.time) {
+                const times = decodeValues(update.buckets.time);
+                const newest = buckets.time.length ? buckets.time[buckets.time.length - 1] : -Infinity;
+                const skip = firstIndexFrom(times, newest + 1);
+                const last = times.length ? Math.max(times[times.length - 1], newest) : newest;
+                const longest = config.window_minutes[config.window_minutes.length - 1];
+                [buckets] = appendSeries(buckets, Object.assign({}, update.buckets, {time: times}), bucketNames,
+                                         skip, last - longest * 60000);
+            }
+            return {start: start, samples: samples, buckets: buckets};
+        },
+
+        // Figures of the time window chosen with the slider: the raw samples decimated to
+        // max_points per trace, or the bucket means with a min/max band for windows longer
+        // than the raw samples kept. The zoom of a graph is kept until the window changes
+        drawWindows: function (data, windowIndex, config, ...figures) {
+            const noUpdate = window.dash_clientside.no_update;
+            if (!data || !config || !data.samples.time.length) {
+                return figures.map(() => noUpdate);
+            }
+            const minutes = config.window_minutes[windowIndex];
+            const samples = data.samples, buckets = data.buckets;
+            const maxTime = samples.time[samples.time.length - 1];
+            const minTime = maxTime - minutes * 60000;
+            const raw = minutes <= config.raw_minutes || !buckets.time.length;
+            const first = firstIndexFrom(raw ? samples.time : buckets.time, minTime);
+            const last = raw ? samples.time.length : buckets.time.length;
+
+            return config.columns.map((columns, number) => {
+                const traces = [], bands = [];
+                columns.forEach((column, i) => {
+                    const style = config.styles[number][i];
+                    if (raw) {
+                        const indices = minMaxIndices(samples[column], first, last, config.max_points);
+                        traces.push(Object.assign({}, style, {
+                            type: 'scatter', mode: 'lines+markers',
+                            x: indices.map(k => samples.time[k]), y: indices.map(k => samples[column][k])
+                        }));
+                        return;
+                    }
+                    const merged = mergeBuckets(buckets, column, first, last, config.max_points,
+                                                config.bucket_seconds * 500);
+                    traces.push(Object.assign({}, style, {
+                        type: 'scatter', mode: 'lines+markers', x: merged.time, y: merged.mean
+                    }));
+                    bands.push({type: 'scatter', x: merged.time, y: merged.max, yaxis: style.yaxis, mode: 'lines',
+                                line: {width: 0}, showlegend: false, hoverinfo: 'skip'});
+                    bands.push({type: 'scatter', x: merged.time, y: merged.min, yaxis: style.yaxis, mode: 'lines',
+                                line: {width: 0}, fill: 'tonexty', showlegend: false,
+                                name: style.name + ' min/max'});
+                });
+
+                const base = config.layouts[number];
+                const previous = figures[number] && figures[number].layout || {};
+                const layout = Object.assign({}, base, {
+                    xaxis: Object.assign({}, base.xaxis, {range: [minTime, maxTime], autorange: false}),
+                    uirevision: windowIndex,
+                    shapes: previous.shapes || [],
+                    annotations: previous.annotations || []
+                });
+                return {data: traces.concat(bands), layout: layout};
+            });
+        }
+    }
+});
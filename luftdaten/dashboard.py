@@ -0,0 +1,1183 @@
+import argparse
+import importlib.util
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from functools import lru_cache
+
+import dash
+import dash_leaflet as dl
+import numpy as np
+import plotly.graph_objs as go
+from dash import Patch, dcc, html
+from dash.dependencies import Output, Input, State, ClientsideFunction
+from dash_extensions.javascript import Namespace
+from flask import Response, g, request
+
+from .alerts import AlertEngine, RateRule, StuckRule, ThresholdRule, ZScoreRule
+from .data_sources import open_source
+from .downsample import lttb_indices
+from .export import buffer_reader, formats as export_formats, recording_reader
+from .flight_recorder import FlightRecorder, read_last_minutes
+from .frame_decoder import FrameDecoder
+from .geo_grid import GeoGrid, cell_features
+from . import ingest
+from .live_stream import RESYNC_MESSAGE, Broadcaster, batch_message, stream_columns
+from .map_track import decimate, limit_points, track_features
+from .metrics import SIZE_BUCKETS, Registry, SlowestCalls
+from .multi_ingest import Device, align_devices, device_record_path, parse_device_spec, poll_devices
+from .rolling_stats import RollingStats
+from .rollups import RollupPyramid, merge_buckets
+from .sample_buffer import SampleBuffer, frame_columns
+from .shared_ring import SharedRing, read_directory, ring_name
+from .timestamps import frame_times, plotly_times, to_epoch_ms
+from .typed_arrays import time_array, typed_array
+
+_logger = logging.getLogger(__name__)
+
+# Maximum number of frames kept in memory (24 h at one frame per second)
+BUFFER_CAPACITY = 24 * 60 * 60
+
+# Preallocated ring buffer holding the latest frames, shared by the reader thread and the callback
+samples = SampleBuffer(BUFFER_CAPACITY)
+
+# Flight log every received frame is appended to (None to disable recording)
+RECORD_PATH = 'flight_log.bin'
+
+# Minutes of recorded data loaded from the flight log into the buffer on startup
+RELOAD_MINUTES = 60
+
+# Boolean setting from the environment variable 'name' (1/0, true/false, yes/no, on/off), or
+# 'default' if it isn't set. The settings that decide which callbacks are registered can't be
+# command line options, the callbacks are registered when the module is imported
+def env_flag(name, default):
+    value = os.environ.get(name, '').strip().lower()
+    if not value:
+        return default
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f'{name} must be 1 or 0, not {value!r}')
+
+
+# Data source of the frames, see data_sources.open_source (overridden by --source)
+DATA_SOURCE = os.environ.get('LUFTDATEN_SOURCE', 'serial:COM7')
+
+# Name of the shared memory of a separate ingestion process (ingest.py). When set, the
+# dashboard attaches to it instead of reading the sources itself, so it can run in several
+# worker processes
+SHARED_MEMORY = os.environ.get('LUFTDATEN_SHARED_MEMORY')
+
+# Seconds between the checks for new samples in the shared memory
+FOLLOW_INTERVAL = 0.05
+
+# Measurements that can be compared between devices: (buffer column, label)
+COMPARE_COLUMNS = [('pm1', 'PM1 (µg/m³)'), ('pm25', 'PM2.5 (µg/m³)'), ('pm10', 'PM10 (µg/m³)'),
+                   ('temp', 'Temperatur (°C)'), ('hum', 'Luftfeuchte (%)'), ('altitude', 'Höhe (m)')]
+
+# Send only new samples to the graphs (extendData) instead of rebuilding the figures every
+# second (LUFTDATEN_INCREMENTAL_UPDATES=0 to disable)
+INCREMENTAL_UPDATES = env_flag('LUFTDATEN_INCREMENTAL_UPDATES', True)
+
+# Push new samples to the browsers through Server-Sent Events (/stream) instead of polling
+# every second (LUFTDATEN_PUSH_UPDATES=0 to disable). Needs Dash >= 2.16 for set_props in
+# assets/stream.js
+PUSH_UPDATES = env_flag('LUFTDATEN_PUSH_UPDATES', True)
+
+# Seconds between the checks whether a pushed, downsampled graph has to be redrawn
+PUSH_CHECK_INTERVAL = 10
+
+# Seconds between two refreshes of the statistics cards and the device comparison, which
+# are never pushed
+STATS_INTERVAL = 1
+
+# Draw the graphs in the browser from its own copy of the recent samples (assets/windows.js),
+# so moving the time window slider and zooming need no request. The server only sends the
+# new samples and rollup buckets, but the first load is larger than the complete figures
+# (LUFTDATEN_CLIENT_WINDOWS=1 to enable)
+CLIENT_WINDOWS = env_flag('LUFTDATEN_CLIENT_WINDOWS', False)
+
+# Minutes of raw samples the browser keeps with CLIENT_WINDOWS, longer time windows are drawn
+# from the rollup buckets
+CLIENT_RAW_MINUTES = 60
+
+# Bucket size in seconds of the rollup tier the browser keeps with CLIENT_WINDOWS, for the
+# longest time window
+CLIENT_ROLLUP_SECONDS = 60
+
+# Maximum number of points sent per trace, larger time windows are downsampled (LTTB)
+MAX_POINTS_PER_TRACE = 1000
+
+# Time windows of the graphs selectable with the slider, in minutes
+WINDOW_MINUTES = [1, 2, 5, 10, 20, 30, 60, 120, 240, 480, 720, 1440]
+
+# Rollup tiers of the graphs: bucket size in seconds and number of buckets kept
+ROLLUP_TIERS = {1: 6 * 60 * 60, 10: 3 * 24 * 360, 60: 14 * 24 * 60, 600: 90 * 24 * 6}
+
+# Time windows with more samples than this are drawn from the rollups (min/mean/max per
+# bucket) instead of the raw samples
+RAW_MAX_SAMPLES = 10 * MAX_POINTS_PER_TRACE
+
+# Minimum number of buckets of the rollup tier chosen for a time window
+ROLLUP_MIN_POINTS = MAX_POINTS_PER_TRACE // 4
+
+# Minutes of the flight log loaded into the rollups on startup
+ROLLUP_RELOAD_MINUTES = 24 * 60
+
+# Number of rendered callback outputs kept per kind, shared by all clients
+RENDER_CACHE_SIZE = 16
+
+# Compress the responses with gzip (flask-compress, 'pip install dash[compress]', listed in
+# requirements.txt). Without it the dashboard still runs, uncompressed, and warns on startup
+COMPRESS_RESPONSES = importlib.util.find_spec('flask_compress') is not None
+
+# PM2.5 range (µg/m³) the track on the map is colored over, from green to red
+MAP_PM_RANGE = (0, 50)
+
+# Size in degrees of the cells of the PM heatmap on the map (~110 m north-south, ~70 m
+# east-west in Germany)
+HEATMAP_CELL_DEGREES = 0.001
+
+# Seconds between the updates of the changed heatmap cells
+HEATMAP_INTERVAL = 2
+
+# Measurements aggregated in the heatmap cells: buffer column and label
+HEATMAP_COLUMNS = {'pm1': 'PM1', 'pm25': 'PM2.5', 'pm10': 'PM10'}
+
+# Rules evaluated on every decoded batch of the first device. The limits are the EU daily
+# limit of PM10 and the WHO 24 h guideline of PM2.5 (µg/m³), crossed by a single sample
+ALERT_RULES = [
+    ThresholdRule('PM2.5 über Grenzwert', 'pm25', on=25, off=20),
+    ThresholdRule('PM10 über Grenzwert', 'pm10', on=50, off=40),
+    RateRule('PM2.5-Sprung', 'pm25', limit=20, seconds=10),
+    ZScoreRule('PM2.5-Ausreißer', 'pm25', threshold=5),
+    ZScoreRule('PM10-Ausreißer', 'pm10', threshold=5),
+    StuckRule('PM2.5-Sensor hängt', 'pm25', seconds=120),
+    StuckRule('Temperatursensor hängt', 'temp', seconds=600),
+]
+
+# Number of alert events kept and shown on the graphs and the map
+ALERT_LOG_SIZE = 200
+
+# Seconds between the checks for new alert events
+ALERT_INTERVAL = 2
+
+# Color of the alert lines on the graphs and markers on the map
+ALERT_COLOR = '#ff4fd8'
+
+# Keep cProfile statistics of the slowest callback requests, shown at /metrics/slowest
+# (overridden by --profile)
+PROFILE_CALLBACKS = False
+
+# Measurements with rolling statistics shown as cards: (buffer column, label, unit)
+STATS_COLUMNS = [('pm25', 'PM2.5', 'µg/m³'), ('pm10', 'PM10', 'µg/m³'), ('pm1', 'PM1', 'µg/m³'),
+                 ('temp', 'Temperatur', '°C'), ('hum', 'Luftfeuchte', '%')]
+
+# Time windows of the rolling statistics: label and length in seconds
+STATS_WINDOWS = {'1 h': 60 * 60, '24 h': 24 * 60 * 60}
+
+# Streaming decoder for the '<...>' frames coming from the data source
+decoder = FrameDecoder()
+
+# All connected sensor packages by device ID. The first one uses 'samples' and 'decoder'
+# and is shown in the main graphs and on the map, the others only in the device comparison
+devices = {}
+
+# Flight recorders of the devices whose frames this process records, by device ID
+recorders = {}
+
+# Connected /stream clients
+stream = Broadcaster()
+
+# Rolling mean/min/max/stddev of the first device, updated with every decoded batch
+stats = RollingStats([column for column, _, _ in STATS_COLUMNS], STATS_WINDOWS)
+
+# Graph channels of the first device in buckets of 1 s to 10 min, for long time windows
+rollups = RollupPyramid(['temp', 'hum', 'pm1', 'pm25', 'pm10', 'altitude'], ROLLUP_TIERS)
+
+# PM count/mean/max of the first device per map cell, for the heatmap
+grid = GeoGrid(list(HEATMAP_COLUMNS), HEATMAP_CELL_DEGREES)
+
+# Threshold and anomaly events of the first device
+alerts = AlertEngine(ALERT_RULES, ALERT_LOG_SIZE)
+
+# Counters and histograms served at /metrics, and the slowest profiled callback requests
+metrics = Registry()
+profiler = SlowestCalls()
+
+read_batch_frames = metrics.histogram('luftdaten_read_batch_frames', 'Frames decoded per read of a data source',
+                                      (1, 2, 5, 10, 50, 100, 500, 1000, 5000), label='device')
+callback_seconds = metrics.histogram('luftdaten_callback_seconds',
+                                     'Duration of Dash callback requests, including serialization',
+                                     label='callback')
+callback_response_bytes = metrics.histogram('luftdaten_callback_response_bytes',
+                                            'Size of Dash callback responses before compression', SIZE_BUCKETS,
+                                            label='callback')
+metrics.collected('luftdaten_frames_total', 'Frames decoded',
+                  lambda: {device_id: device.decoder.frames for device_id, device in devices.items()},
+                  'counter', 'device')
+metrics.collected('luftdaten_decoder_resyncs_total', 'Times the decoder skipped garbage to find a frame start',
+                  lambda: {device_id: device.decoder.resyncs for device_id, device in devices.items()},
+                  'counter', 'device')
+metrics.collected('luftdaten_decoder_bad_frames_total', 'Frames dropped for a missing end marker',
+                  lambda: {device_id: device.decoder.bad_frames for device_id, device in devices.items()},
+                  'counter', 'device')
+metrics.collected('luftdaten_time_glitches_total', 'Sample timestamps repaired after a GPS glitch',
+                  lambda: {device_id: device.samples.time_glitches for device_id, device in devices.items()},
+                  'counter', 'device')
+metrics.collected('luftdaten_source_backlog_bytes', 'Bytes received by the data source but not read yet',
+                  lambda: {device_id: device.source.backlog for device_id, device in devices.items()},
+                  label='device')
+metrics.collected('luftdaten_buffer_samples', 'Samples held in the ring buffer',
+                  lambda: {device_id: len(device.samples) for device_id, device in devices.items()},
+                  label='device')
+metrics.collected('luftdaten_buffer_capacity', 'Capacity of the ring buffer',
+                  lambda: {device_id: device.samples.capacity for device_id, device in devices.items()},
+                  label='device')
+metrics.collected('luftdaten_recorder_failed', 'Whether writing the flight log failed and recording stopped',
+                  lambda: {device_id: int(recorder.error is not None) for device_id, recorder in recorders.items()},
+                  label='device')
+metrics.collected('luftdaten_recorder_dropped_frames_total', 'Frames not written to the flight log after an error',
+                  lambda: {device_id: recorder.dropped for device_id, recorder in recorders.items()},
+                  'counter', 'device')
+metrics.collected('luftdaten_stream_clients', 'Connected /stream clients', lambda: len(stream))
+metrics.collected('luftdaten_heatmap_cells', 'Map cells with samples in the heatmap', lambda: len(grid))
+metrics.collected('luftdaten_alerts_total', 'Alert events that began', alerts.counts, 'counter', 'rule')
+
+# Initialisation of the Dash application
+app = dash.Dash(__name__, compress=COMPRESS_RESPONSES)
+if not COMPRESS_RESPONSES:
+    _logger.warning("flask-compress is not installed, the responses are sent uncompressed "
+                    "(pip install 'dash[compress]')")
+
+# WSGI application, e.g. for 'gunicorn -w 4 luftdaten.dashboard:server'
+server = app.server
+
+# JavaScript functions of assets/map.js
+map_functions = Namespace('luftdaten', 'map')
+
+colors = {
+    "text": "#FFFFFF",  # white
+    "background": "#333333",  # dark gray
+    "plot_background": "#333333",  # medium gray
+    "paper_color": "#696969"  # very dark gray
+}
+
+# Create layout of Dash-app graphs of data and map
+app.layout = html.Div(style={'backgroundColor': colors['background']},
+                      children=[
+                          html.H1(
+                              children="Luftdaten-Analyse",
+                              style={
+                                  "textAlign": "center",
+                                  "color": colors["text"],
+                                  'backgroundColor': colors['background']
+                              }
+                          ),
+                          html.Div([
+                              html.Label('Zeitraum der Datendarstellung:'),
+                              # The value is the position in WINDOW_MINUTES
+                              dcc.Slider(
+                                  id='lim-x-axis-slider',
+                                  min=0,
+                                  max=len(WINDOW_MINUTES) - 1,
+                                  step=1,
+                                  value=WINDOW_MINUTES.index(20),
+                                  marks={i: f'{minutes} min' if minutes < 60 else f'{minutes // 60} h'
+                                         for i, minutes in enumerate(WINDOW_MINUTES)},
+                              ),
+                          ],
+                              style={'backgroundColor': colors['background'], 'color': colors['text']}
+                          ),
+
+                          # Rolling statistics of the first device
+                          html.Div(id='stats-cards',
+                                   style={'backgroundColor': colors['background'], 'color': colors['text'],
+                                          'display': 'flex', 'flex-direction': 'row', 'flex-wrap': 'wrap'}),
+
+                          html.Div([
+                              html.Div([dcc.Graph(id='live-graph-temp_hum', animate=True)],
+                                       style={'display': 'inline-block', 'width': '25%'}),
+                              html.Div([dcc.Graph(id='live-graph-pm1', animate=True)],
+                                       style={'display': 'inline-block', 'width': '25%'}),
+                              html.Div([dcc.Graph(id='live-graph-pm25', animate=True)],
+                                       style={'display': 'inline-block', 'width': '25%'}),
+                              html.Div([dcc.Graph(id='live-graph-pm10', animate=True)],
+                                       style={'display': 'inline-block', 'width': '25%'}),
+                          ],
+                              style={'backgroundColor': colors['background'], 'color': colors['text'],
+                                     'display': 'flex', 'flex-direction': 'row'}
+                          ),
+
+                          html.Div([
+                              html.Div([
+                                  dl.Map([
+                                      dl.TileLayer(),
+                                      dl.LayersControl([
+                                          # Mean PM2.5 per grid cell, colored like the track
+                                          dl.Overlay(dl.GeoJSON(id='pm-heatmap', style=map_functions('cellStyle'),
+                                                                hideout=dict(colorProp='pm25', min=MAP_PM_RANGE[0],
+                                                                             max=MAP_PM_RANGE[1])),
+                                                     name='Feinstaub-Raster', checked=True),
+                                          # Flight track, the browser colors the points by PM2.5.
+                                          # New points go to 'track-recent' first (see assets/map.js)
+                                          dl.Overlay(dl.LayerGroup([
+                                              dl.GeoJSON(id='track-history', pointToLayer=map_functions('pointToLayer'),
+                                                         hideout=dict(colorProp='pm25', min=MAP_PM_RANGE[0],
+                                                                      max=MAP_PM_RANGE[1])),
+                                              dl.GeoJSON(id='track-recent', pointToLayer=map_functions('pointToLayer'),
+                                                         hideout=dict(colorProp='pm25', min=MAP_PM_RANGE[0],
+                                                                      max=MAP_PM_RANGE[1])),
+                                          ]), name='Flugbahn', checked=True),
+                                          # Where the alert rules started to hold
+                                          dl.Overlay(dl.GeoJSON(id='alert-markers',
+                                                                pointToLayer=map_functions('alertToLayer'),
+                                                                hideout=dict(color=ALERT_COLOR)),
+                                                     name='Warnungen', checked=True),
+                                      ]),
+                                      dl.LayerGroup(id="marker-layer"),
+                                  ], center=[51.4325, 6.8797], zoom=10, id='live-map', preferCanvas=True,
+                                      trackViewport=True, style={'width': '100%', 'height': '500px'}),
+                              ], style={'display': 'inline-block', 'width': '65%'}),
+                              html.Div([
+                                  dcc.Graph(id='live-graph-altitude', animate=True)],
+                                  style={'display': 'inline-block', 'width': '35%'}),
+                          ], style={'display': 'flex', 'flex-direction': 'row'}),
+
+                          html.Div([
+                              html.Label('Geräte:'),
+                              dcc.Dropdown(id='device-select', multi=True),
+                              html.Label('Messgröße:'),
+                              dcc.Dropdown(id='compare-column', clearable=False, value='pm25',
+                                           options=[{'label': label, 'value': column}
+                                                    for column, label in COMPARE_COLUMNS]),
+                              dcc.Graph(id='live-graph-compare'),
+                          ],
+                              style={'backgroundColor': colors['background'], 'color': colors['text']}
+                          ),
+
+                          dcc.Interval(
+                              id='graph-update',
+                              interval=PUSH_CHECK_INTERVAL * 1000 if PUSH_UPDATES else 1000,  # 1000 msec = 1 sec
+                              n_intervals=0
+                          ),
+                          dcc.Interval(id='stats-update', interval=STATS_INTERVAL * 1000, n_intervals=0),
+
+                          # Pushed sample batch, a timestamp set by the browser when it needs complete
+                          # figures again, and the (unused) output of the stream follower
+                          dcc.Store(id='live-stream'),
+                          dcc.Store(id='stream-resync'),
+                          dcc.Store(id='stream-state'),
+
+                          # Global index of the next sample this client has not been sent yet, and of
+                          # the first sample after its last complete figure
+                          dcc.Store(id='graph-sent-index'),
+
+                          # Global index of the next sample not yet sent to this client's map and the
+                          # zoom level the track was decimated for
+                          dcc.Store(id='map-sent-index'),
+                          # Track points sent by the server, merged into the map layers in the browser
+                          dcc.Store(id='track-delta'),
+
+                          # Heatmap version this client has all cells of, and the cells changed since
+                          # the version before, merged into the heatmap in the browser
+                          dcc.Interval(id='heatmap-update', interval=HEATMAP_INTERVAL * 1000, n_intervals=0),
+                          dcc.Store(id='heatmap-sent-version'),
+                          dcc.Store(id='heatmap-delta'),
+
+                          # Alert version and figures ('full' and 'buckets' of graph-sent-index) this
+                          # client has the alert lines of
+                          dcc.Interval(id='alert-update', interval=ALERT_INTERVAL * 1000, n_intervals=0),
+                          dcc.Store(id='alert-sent')
+                      ]
+                      )
+
+
+# Feed new samples of the first device, with global indices start, start + 1, ..., into the
+# statistics, the rollups and the stream. 'columns' maps buffer columns to arrays
+def process_samples(start, columns, times):
+    stats.update(columns, times)
+    rollups.update(columns, times)
+    grid.update(columns, start + len(times))
+    alerts.update(columns, times, start)
+    if stream:
+        stream.publish(batch_message(start, dict(columns, time=times)))
+
+
+# Background data-reading thread, one for all devices
+def read_serial_data(device_list, recorders):
+    primary = device_list[0]
+    # Wait until one of the sources has bytes and decode everything they have buffered
+    for device, frames in poll_devices(device_list):
+        read_batch_frames.observe(len(frames), device.device_id)
+
+        # Append the new frames to the device's ring buffer
+        times = device.samples.extend(frames, frame_times(frames))
+        if device is primary:
+            process_samples(samples.total - len(frames), frame_columns(frames), times)
+        if device.device_id in recorders:
+            recorders[device.device_id].write(frames, times)
+
+
+# Load the end of the last recordings, so the dashboard doesn't start empty after a restart,
+# and start the background thread reading from the sources, a list of (device ID, source)
+# pairs opened with timeout=0. With 'history_path' instead of 'record_path', the recent
+# samples are loaded from the flight logs another process (the headless logger) writes.
+# Returns the reader thread
+def start_ingestion(sources, record_path=RECORD_PATH, history_path=None):
+    for number, (device_id, source) in enumerate(sources):
+        if number == 0:
+            device = Device(device_id, source, samples, decoder)
+        else:
+            device = Device(device_id, source, SampleBuffer(BUFFER_CAPACITY))
+        devices[device_id] = device
+        if record_path or history_path:
+            path = device.record_path = device_record_path(record_path or history_path, device_id, number)
+            recent, times = read_last_minutes(path, RELOAD_MINUTES)
+            times = device.samples.load(recent.tolist(), times)
+            if number == 0:
+                stats.update(recent, times)
+                alerts.update(recent, times, samples.total - len(times))
+                history, history_times = read_last_minutes(path, ROLLUP_RELOAD_MINUTES)
+                rollups.update(history, history_times)
+                grid.update(history, samples.total)
+            if record_path:
+                recorders[device_id] = FlightRecorder(path)
+    reader = threading.Thread(target=read_serial_data, args=(list(devices.values()), recorders), daemon=True)
+    reader.start()
+    return reader
+
+
+# Background thread of a dashboard attached to an ingestion process, processing the samples
+# the first device's ring got since the last check
+def follow_shared_ring(ring):
+    position = ring.first
+    while True:
+        total = ring.total
+        if total == position:
+            time.sleep(FOLLOW_INTERVAL)
+            continue
+        data = ring.snapshot(position, total)
+        # Samples overwritten before they were read are skipped
+        process_samples(total - len(data['time']), data, data['time'])
+        position = total
+
+
+# Attach to the shared memory rings of the ingestion process 'name' instead of reading the
+# sources. The first device's ring replaces 'samples'
+def attach_ingestion(name):
+    global samples
+    for number, entry in enumerate(read_directory(name)):
+        ring = SharedRing.attach(ring_name(name, entry['id']))
+        if number == 0:
+            samples = ring
+        # The ring publishes the decoder and source counters of the ingestion process
+        devices[entry['id']] = Device(entry['id'], ring.status, ring, ring.status, entry['record_path'])
+    threading.Thread(target=follow_shared_ring, args=(samples,), daemon=True).start()
+
+
+# Graphs of the dashboard and the buffer columns plotted in them, one per trace
+graph_ids = ['live-graph-temp_hum', 'live-graph-pm1', 'live-graph-pm25', 'live-graph-pm10', 'live-graph-altitude']
+graph_columns = [('temp', 'hum'), ('pm1',), ('pm25',), ('pm10',), ('altitude',)]
+
+
+# Name and y-axis of the trace of every graph column
+trace_styles = {
+    'temp': dict(name='Temp', yaxis='y'),
+    'hum': dict(name='Humidity', yaxis='y2'),
+    'pm1': dict(name='PM1', yaxis='y'),
+    'pm25': dict(name='PM2.5', yaxis='y'),
+    'pm10': dict(name='PM10', yaxis='y'),
+    'altitude': dict(name='Altitude', yaxis='y'),
+}
+
+
+def _graph_layout(title, yaxis, height, margin, **options):
+    return go.Layout(xaxis=dict(title='Zeit', type='date'), yaxis=yaxis, title=title,
+                     paper_bgcolor=colors['paper_color'], plot_bgcolor=colors['plot_background'],
+                     font=dict(color=colors['text']), height=height, margin=margin, **options).to_plotly_json()
+
+
+# Layouts of the graphs, in the order of 'graph_ids'. Built and validated once as plain
+# dicts, every figure only gets a copy with its x-axis range
+graph_layouts = [
+    _graph_layout('Temp & Humidity', dict(title='Temperatur (°C)', side='left'), 400,
+                  {'l': 40, 'r': 35, 't': 105, 'b': 80},
+                  yaxis2=dict(title='Luftfeuchte (%)', overlaying='y', side='right'),
+                  legend=dict(yanchor="bottom", xanchor="right")),
+    _graph_layout('PM1 Werte', dict(title='Partikelkonzentration (µg/m³)'), 400,
+                  {'l': 40, 'r': 20, 't': 40, 'b': 80}),
+    _graph_layout('PM2.5 Werte', dict(title='Partikelkonzentration (µg/m³)'), 400,
+                  {'l': 40, 'r': 20, 't': 40, 'b': 80}),
+    _graph_layout('PM10 Werte', dict(title='Partikelkonzentration (µg/m³)'), 400,
+                  {'l': 40, 'r': 20, 't': 40, 'b': 80}),
+    _graph_layout('Flughöhe', dict(title='Höhe (m)'), 500, {'l': 40, 'r': 40, 't': 40, 'b': 40}),
+]
+
+
+# Complete figures of all graphs, in the order of 'graph_ids'. 'bands' optionally maps
+# columns to (low, high) values drawn as a shaded band around their trace.
+#
+# The traces are plain dicts with typed arrays (see typed_arrays.py): the times as epoch
+# ms and the values as float32, which is all the precision the sensor sends
+def make_figures(data, min_time, max_time, bands=None):
+    xaxis_range = dict(autorange=True) if INCREMENTAL_UPDATES else dict(range=[min_time, max_time])
+    figures = []
+    for layout, columns in zip(graph_layouts, graph_columns):
+        traces = []
+        band_traces = []
+        for column in columns:
+            # Points reduced to MAX_POINTS_PER_TRACE with a shape-preserving downsampler
+            indices = lttb_indices(data['time'], data[column], MAX_POINTS_PER_TRACE)
+            style = trace_styles[column]
+            x = time_array(data['time'][indices])
+            traces.append(dict(style, type='scatter', mode='lines+markers', x=x,
+                               y=typed_array(data[column][indices], 'f4')))
+            if bands and column in bands:
+                low, high = bands[column]
+                band_traces.append(dict(type='scatter', x=x, y=typed_array(high[indices], 'f4'),
+                                        yaxis=style['yaxis'], mode='lines', line=dict(width=0), showlegend=False,
+                                        hoverinfo='skip'))
+                band_traces.append(dict(type='scatter', x=x, y=typed_array(low[indices], 'f4'),
+                                        yaxis=style['yaxis'], mode='lines', line=dict(width=0), fill='tonexty',
+                                        showlegend=False, name=f"{style['name']} min/max"))
+        # Bands after all traces, so extendData still addresses the traces by their position
+        figures.append({'data': traces + band_traces,
+                        'layout': dict(layout, xaxis=dict(layout['xaxis'], **xaxis_range))})
+    return figures
+
+
+# Complete figures of the samples [window_start, total). Rendered once per data version and
+# time window, all clients asking for the same figures get them from the cache.
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_figures(version, lim_x_axis, window_start, total, min_time, max_time):
+    # Consistent copy of the samples in the time window, the reader thread keeps appending meanwhile
+    return make_figures(samples.snapshot(window_start, total), min_time, max_time)
+
+
+# Complete figures of the last 'lim_x_axis' minutes of the closed buckets of a rollup tier:
+# the mean of every bucket as trace and its min/max as band, at most MAX_POINTS_PER_TRACE
+# points. Rendered once per closed bucket
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_rollup_figures(tier_seconds, buckets, lim_x_axis):
+    tier = rollups.tiers[tier_seconds]
+    with rollups.lock:
+        max_time = tier.newest + tier_seconds * 1000
+        data = tier.window(max_time - lim_x_axis * 60 * 1000)
+    data = merge_buckets(data, rollups.columns, MAX_POINTS_PER_TRACE)
+
+    # Every bucket at its center
+    means = {'time': data['time'] + tier_seconds * 500}
+    means.update({column: data[column + '_mean'] for column in rollups.columns})
+    bands = {column: (data[column + '_min'], data[column + '_max']) for column in rollups.columns}
+    return make_figures(means, max_time - lim_x_axis * 60 * 1000, max_time, bands)
+
+
+# extendData of all graphs for the samples [start, total), trimmed to 'max_points' points
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_extend_data(version, start, total, max_points):
+    # Numbers, they are appended to the typed arrays of the figures (epoch ms on date axes)
+    data = samples.snapshot(start, total)
+    times = data['time'].tolist()
+    return [
+        [dict(x=[times] * len(columns), y=[data[column].tolist() for column in columns]),
+         list(range(len(columns))), max_points]
+        for columns in graph_columns
+    ]
+
+
+# Figures of the graphs rendered by the server
+def update_graph_scatter(n_intervals, window_index, resync, sent):
+    lim_x_axis = WINDOW_MINUTES[window_index]
+    min_time = None
+    max_time = None
+
+    with samples.lock:
+        version = samples.version
+        # Set the x-axis limits to the chosen 'lim_x_axis'-value
+        if samples.total:
+            max_time = int(samples.view()['time'][-1])
+            min_time = max_time - lim_x_axis * 60 * 1000
+        # Binary search for the samples inside the time window
+        window_start, total = samples.time_range(min_time)
+        first = samples.first
+    window_points = total - window_start
+    triggered = [trigger['prop_id'] for trigger in dash.callback_context.triggered]
+    slider_changed = 'lim-x-axis-slider.value' in triggered or 'stream-resync.data' in triggered
+
+    # Windows with too many samples are drawn from the coarsest rollup tier that still has
+    # enough buckets, and redrawn completely whenever a bucket of it was closed
+    tier_seconds = rollups.select(lim_x_axis * 60, ROLLUP_MIN_POINTS)
+    with rollups.lock:
+        buckets = rollups.tiers[tier_seconds].total
+        closed = rollups.tiers[tier_seconds].newest is not None
+    if window_points > RAW_MAX_SAMPLES and closed:
+        if sent is not None and sent.get('rollup') == tier_seconds and sent['buckets'] == buckets and \
+                not slider_changed:
+            return [dash.no_update] * (2 * len(graph_ids) + 1)
+        figures = render_rollup_figures(tier_seconds, buckets, lim_x_axis)
+        return figures + [dash.no_update] * len(graph_ids) + \
+            [{'index': total, 'full': total, 'version': version, 'max_points': MAX_POINTS_PER_TRACE,
+              'rollup': tier_seconds, 'buckets': buckets}]
+
+    # Nothing to do if no frame arrived since this client's last update
+    if sent is not None and sent['version'] == version and not slider_changed and not sent.get('rollup'):
+        return [dash.no_update] * (2 * len(graph_ids) + 1)
+
+    # Send the complete figures on first load, when the time window changes, when switching
+    # back from the rollups and when the client missed samples that are no longer buffered.
+    # Pushed clients can't be behind, the stream tells them to resync instead
+    redraw = not INCREMENTAL_UPDATES or sent is None or slider_changed or sent.get('rollup') or \
+        (sent['index'] < first and not PUSH_UPDATES)
+
+    # A downsampled figure loses a whole bucket of samples for every raw point extendData
+    # appends, redraw it once the time span it shows shrank by a tenth
+    if not redraw and window_points > MAX_POINTS_PER_TRACE:
+        bucket = window_points / MAX_POINTS_PER_TRACE
+        redraw = (total - sent['full']) * (bucket - 1) > window_points / 10
+
+    max_points = max(min(window_points, MAX_POINTS_PER_TRACE), 1)
+    if redraw:
+        figures = render_figures(version, lim_x_axis, window_start, total, min_time, max_time)
+        return figures + [dash.no_update] * len(graph_ids) + \
+            [{'index': total, 'full': total, 'version': version, 'max_points': max_points}]
+
+    # New samples of pushed clients arrive through the stream
+    if PUSH_UPDATES:
+        return [dash.no_update] * (2 * len(graph_ids) + 1)
+
+    # Only the samples the client has not seen yet, trimmed to the points of the time window
+    extend_data = render_extend_data(version, sent['index'], total, max_points)
+    return [dash.no_update] * len(graph_ids) + extend_data + \
+        [{'index': total, 'full': sent['full'], 'version': version, 'max_points': max_points}]
+
+
+# Samples [start, total) for the browser's copy (CLIENT_WINDOWS), the values as float32 like
+# the figures
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_sample_delta(version, start, total):
+    data = samples.snapshot(start, total)
+    delta = {'start': start, 'time': time_array(data['time'])}
+    delta.update({column: typed_array(data[column], 'f4') for column in rollups.columns})
+    return delta
+
+
+# Closed buckets of the CLIENT_ROLLUP_SECONDS tier starting at min_time or later (epoch ms)
+# for the browser's copy: the start, mean, min and max of every bucket
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_bucket_delta(buckets, min_time):
+    with rollups.lock:
+        data = rollups.tiers[CLIENT_ROLLUP_SECONDS].window(min_time)
+    delta = {'time': time_array(data['time'])}
+    for column in rollups.columns:
+        for stat in ('mean', 'min', 'max'):
+            delta[f'{column}_{stat}'] = typed_array(data[f'{column}_{stat}'], 'f4')
+    return delta
+
+
+# New samples and buckets for the browser's copy (see assets/windows.js), which draws the
+# graphs itself: the last CLIENT_RAW_MINUTES of samples and a day of buckets on first load
+# and after a stream resync, afterwards only what was added. Pushed clients get the new
+# samples through the stream
+def update_graph_samples(n_intervals, resync, sent):
+    with samples.lock:
+        version = samples.version
+        total = samples.total
+        start = total
+        max_time = None
+        if total:
+            max_time = int(samples.view()['time'][-1])
+            start, _ = samples.time_range(max_time - CLIENT_RAW_MINUTES * 60 * 1000)
+    tier = rollups.tiers[CLIENT_ROLLUP_SECONDS]
+    with rollups.lock:
+        buckets = tier.total
+        newest = tier.newest
+    triggered = [trigger['prop_id'] for trigger in dash.callback_context.triggered]
+    reset = sent is None or 'stream-resync.data' in triggered
+
+    if not reset and (sent['version'] == version or PUSH_UPDATES) and sent['buckets'] == buckets:
+        return dash.no_update, dash.no_update
+
+    delta = {'reset': reset}
+    if reset or not PUSH_UPDATES:
+        # Samples no longer in the browser's time span are skipped, it drops the older ones
+        delta.update(render_sample_delta(version, start if reset else max(sent['index'], start), total))
+    if newest is not None and (reset or sent['bucket_time'] != newest):
+        min_time = max_time - WINDOW_MINUTES[-1] * 60 * 1000 if reset or sent['bucket_time'] is None else \
+            sent['bucket_time'] + CLIENT_ROLLUP_SECONDS * 1000
+        delta['buckets'] = render_bucket_delta(buckets, min_time)
+    full = total if reset else sent['full']
+    return delta, {'index': total if reset or not PUSH_UPDATES else sent['index'], 'full': full,
+                   'version': version, 'buckets': buckets, 'bucket_time': newest, 'client': True}
+
+
+if CLIENT_WINDOWS:
+    # The browser's copy of the recent samples, the new samples and buckets sent by the server,
+    # and the layouts and settings it draws the graphs with
+    app.layout.children += [
+        dcc.Store(id='graph-samples'),
+        dcc.Store(id='graph-samples-delta'),
+        dcc.Store(id='graph-config', data={
+            'columns': graph_columns, 'styles': [[trace_styles[column] for column in columns]
+                                                 for columns in graph_columns],
+            'layouts': graph_layouts, 'window_minutes': WINDOW_MINUTES, 'max_points': MAX_POINTS_PER_TRACE,
+            'raw_minutes': CLIENT_RAW_MINUTES, 'bucket_seconds': CLIENT_ROLLUP_SECONDS}),
+    ]
+
+    app.callback([Output('graph-samples-delta', 'data'),
+                  Output('graph-sent-index', 'data')],
+                 [Input('graph-update', 'n_intervals'),
+                  Input('stream-resync', 'data')],
+                 [State('graph-sent-index', 'data')])(update_graph_samples)
+
+    # Merge the new samples from the server and the stream into the browser's copy
+    app.clientside_callback(
+        ClientsideFunction(namespace='windows', function_name='mergeSamples'),
+        Output('graph-samples', 'data'),
+        [Input('graph-samples-delta', 'data'),
+         Input('live-stream', 'data')],
+        [State('graph-samples', 'data'),
+         State('graph-config', 'data')]
+    )
+
+    # Draw the time window of the slider, the alert lines patched into the figures are kept
+    app.clientside_callback(
+        ClientsideFunction(namespace='windows', function_name='drawWindows'),
+        [Output(graph_id, 'figure') for graph_id in graph_ids],
+        [Input('graph-samples', 'data'),
+         Input('lim-x-axis-slider', 'value')],
+        [State('graph-config', 'data')] +
+        [State(graph_id, 'figure') for graph_id in graph_ids]
+    )
+else:
+    app.callback([Output(graph_id, 'figure') for graph_id in graph_ids] +
+                 [Output(graph_id, 'extendData') for graph_id in graph_ids] +
+                 [Output('graph-sent-index', 'data')],
+                 [Input('graph-update', 'n_intervals'),
+                  Input('lim-x-axis-slider', 'value'),
+                  Input('stream-resync', 'data')],
+                 [State('graph-sent-index', 'data')])(update_graph_scatter)
+
+
+# The whole track of the samples [first, total), decimated for the zoom level and limited to
+# the newest MAX_TRACK_POINTS points
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_track(version, zoom, first, total):
+    data = samples.snapshot(first, total)
+    keep = limit_points(decimate(data['lat'], data['lng'], zoom))
+    return {'reset': True, 'features': track_features(data, first, keep)}
+
+
+# The track points of the samples [start, total), decimated against the sample before 'start'
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_track_delta(version, zoom, start, total):
+    data = samples.snapshot(start - 1, total)
+    keep = decimate(data['lat'][1:], data['lng'][1:], zoom, data['lat'][0], data['lng'][0])
+    return {'reset': False, 'features': track_features(data, start - 1, np.append(False, keep))}
+
+
+@app.callback([Output('track-delta', 'data'),
+               Output('map-sent-index', 'data')],
+              [Input('graph-update', 'n_intervals'),
+               Input('live-map', 'zoom'),
+               Input('stream-resync', 'data')],
+              [State('map-sent-index', 'data')])
+def update_map(n_intervals, zoom, resync, sent):
+    with samples.lock:
+        version = samples.version
+        total = samples.total
+        first = samples.first
+
+    # The whole (decimated) track on first load, after zooming, on a stream resync and when the
+    # sample before the client's next one is no longer buffered, otherwise only the points added
+    # since the last tick (unless they are pushed)
+    triggered = [trigger['prop_id'] for trigger in dash.callback_context.triggered]
+    if sent is None or sent['zoom'] != zoom or 'stream-resync.data' in triggered or \
+            (sent['index'] <= first and not PUSH_UPDATES):
+        delta = render_track(version, zoom, first, total)
+    elif sent['version'] != version and not PUSH_UPDATES:
+        delta = render_track_delta(version, zoom, sent['index'], total)
+    else:
+        return dash.no_update, dash.no_update
+
+    return delta, {'index': total, 'zoom': zoom, 'version': version}
+
+
+# Merge the new track points into the map layers in the browser
+app.clientside_callback(
+    ClientsideFunction(namespace='luftdaten', function_name='mergeTrack'),
+    [Output('track-history', 'data'),
+     Output('track-recent', 'data')],
+    [Input('track-delta', 'data')],
+    [State('live-map', 'zoom'),
+     State('track-history', 'data'),
+     State('track-recent', 'data')]
+)
+
+
+# Heatmap cells changed after version 'since', all cells if None
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_heatmap(version, since):
+    return {'reset': since is None,
+            'features': cell_features(grid.changed(since), grid.cell_degrees, HEATMAP_COLUMNS)}
+
+
+@app.callback([Output('heatmap-delta', 'data'),
+               Output('heatmap-sent-version', 'data')],
+              [Input('heatmap-update', 'n_intervals')],
+              [State('heatmap-sent-version', 'data')])
+def update_heatmap(n_intervals, sent_version):
+    version = grid.version
+    # (a worker behind the one that answered last has nothing newer)
+    if sent_version is not None and version <= sent_version:
+        return dash.no_update, dash.no_update
+    return render_heatmap(version, sent_version), version
+
+
+# Replace the changed cells in the heatmap in the browser
+app.clientside_callback(
+    ClientsideFunction(namespace='luftdaten', function_name='mergeCells'),
+    Output('pm-heatmap', 'data'),
+    [Input('heatmap-delta', 'data')],
+    [State('pm-heatmap', 'data')]
+)
+
+
+# Lines and labels of the alert events on every graph showing their column: a line where a
+# rule started to hold, labelled with its name, and a dotted one where it stopped. And map
+# markers where the rules started to hold
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_alerts(version):
+    events = alerts.events()
+    times = plotly_times([event['time'] for event in events]).astype(str).tolist()
+    layouts = [{'shapes': [], 'annotations': []} for _ in graph_ids]
+    for event, x in zip(events, times):
+        begin = event['kind'] == 'begin'
+        for layout, columns in zip(layouts, graph_columns):
+            if event['column'] not in columns:
+                continue
+            layout['shapes'].append(dict(type='line', xref='x', yref='paper', x0=x, x1=x, y0=0, y1=1,
+                                         line=dict(color=ALERT_COLOR, width=1, dash='solid' if begin else 'dot')))
+            if begin:
+                layout['annotations'].append(dict(x=x, xref='x', y=1, yref='paper', text=event['rule'],
+                                                  textangle=-90, xanchor='right', yanchor='top', showarrow=False,
+                                                  font=dict(color=ALERT_COLOR, size=10)))
+
+    markers = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [event['lng'], event['lat']]},
+                'properties': {'tooltip': f"{event['rule']}: {event['value']:.1f} ({x.replace('T', ' ')} UTC)"}}
+               for event, x in zip(events, times)
+               if event['kind'] == 'begin' and (event['lat'] or event['lng'])]
+    return layouts, {'type': 'FeatureCollection', 'features': markers}
+
+
+# Alert lines of the graphs, patched into the figures, and the alert markers of the map.
+# Sent when there are new events and after every complete figure, which has none
+@app.callback([Output(graph_id, 'figure', allow_duplicate=True) for graph_id in graph_ids] +
+              [Output('alert-markers', 'data'),
+               Output('alert-sent', 'data')],
+              [Input('alert-update', 'n_intervals'),
+               Input('graph-sent-index', 'data')],
+              [State('alert-sent', 'data')],
+              prevent_initial_call=True)
+def update_alerts(n_intervals, graph_sent, sent):
+    version = alerts.version
+    figures = None if graph_sent is None else [graph_sent['full'], graph_sent.get('buckets')]
+    # (a worker behind the one that answered last has no newer events)
+    if sent is not None and sent['version'] >= version and sent['figures'] == figures:
+        return [dash.no_update] * (len(graph_ids) + 2)
+
+    layouts, markers = render_alerts(version)
+    patches = []
+    for layout in layouts:
+        if graph_sent is None:
+            patches.append(dash.no_update)
+            continue
+        patch = Patch()
+        patch['layout']['shapes'] = layout['shapes']
+        patch['layout']['annotations'] = layout['annotations']
+        patches.append(patch)
+    return patches + [markers if sent is None or sent['version'] != version else dash.no_update,
+                      {'version': version, 'figures': figures}]
+
+
+# Logged alert events as JSON, oldest first
+@app.server.route('/alerts')
+def serve_alerts():
+    return {'active': alerts.active(), 'events': alerts.events()}
+
+
+# Server-Sent Events with the samples from 'since' on, then every new batch as it is decoded
+@app.server.route('/stream')
+def live_stream():
+    since = request.args.get('since', type=int)
+    with samples.lock:
+        client = stream.subscribe()
+        first, total = samples.first, samples.total
+
+    if since is None or since < first:
+        backlog = [RESYNC_MESSAGE]
+    elif since < total:
+        data = samples.snapshot(since, total)
+        backlog = [batch_message(since, {name: data[name].tolist() for name in ('time',) + stream_columns})]
+    else:
+        backlog = []
+    return Response(stream.stream(client, backlog), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+if PUSH_UPDATES:
+    # Reconnect the stream after every complete figure rendered by the server
+    app.clientside_callback(
+        ClientsideFunction(namespace='stream', function_name='followStream'),
+        Output('stream-state', 'data'),
+        [Input('graph-sent-index', 'data'),
+         Input('map-sent-index', 'data')]
+    )
+
+    # Append every pushed batch to the graphs and the map
+    app.clientside_callback(
+        ClientsideFunction(namespace='stream', function_name='applyBatch'),
+        [Output(graph_id, 'extendData', allow_duplicate=True) for graph_id in graph_ids] +
+        [Output('track-delta', 'data', allow_duplicate=True)],
+        [Input('live-stream', 'data')],
+        [State('live-map', 'zoom'),
+         State('graph-sent-index', 'data')],
+        prevent_initial_call=True
+    )
+
+
+# One card per measurement with the rolling statistics of every window
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_stats_cards(version):
+    values = stats.values()
+    card_style = {'margin': '5px', 'padding': '5px 10px', 'backgroundColor': colors['paper_color'],
+                  'borderRadius': '4px'}
+    cards = []
+    for column, label, unit in STATS_COLUMNS:
+        rows = [html.Div(label, style={'fontWeight': 'bold'})]
+        for window in STATS_WINDOWS:
+            value = values[column, window]
+            if not value['count']:
+                rows.append(html.Div(f"{window}: keine Daten"))
+                continue
+            rows.append(html.Div([
+                html.Span(f"{window}-Mittel: {value['mean']:.1f} {unit}"),
+                html.Span(f"  (min {value['min']:.1f}, max {value['max']:.1f}, σ {value['std']:.1f})",
+                          style={'fontSize': 'small'}),
+            ]))
+        cards.append(html.Div(rows, style=card_style))
+    return cards
+
+
+@app.callback(Output('stats-cards', 'children'),
+              [Input('stats-update', 'n_intervals')])
+def update_stats_cards(n_intervals):
+    return render_stats_cards(stats.version)
+
+
+# Devices to choose from for the comparison, all of them are selected at first
+@app.callback([Output('device-select', 'options'),
+               Output('device-select', 'value')],
+              [Input('stats-update', 'n_intervals')],
+              [State('device-select', 'options')])
+def update_device_options(n_intervals, options):
+    device_ids = list(devices)
+    if options is not None and [option['value'] for option in options] == device_ids:
+        return dash.no_update, dash.no_update
+    return [{'label': device_id, 'value': device_id} for device_id in device_ids], device_ids
+
+
+# One column of the selected devices, resampled onto a common time grid so the values of
+# all devices line up at the same timestamps
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_comparison(versions, device_ids, column, lim_x_axis, max_time):
+    min_time = max_time - lim_x_axis * 60 * 1000
+    # Grid steps of whole seconds, at most MAX_POINTS_PER_TRACE points
+    step = max(lim_x_axis * 60 // MAX_POINTS_PER_TRACE, 1)
+    grid, aligned = align_devices({device_id: devices[device_id].samples for device_id in device_ids},
+                                  column, min_time, max_time, step)
+    label = dict(COMPARE_COLUMNS)[column]
+    return {
+        'data': [go.Scatter(x=plotly_times(grid), y=aligned[device_id], name=device_id, mode='lines')
+                 for device_id in device_ids],
+        'layout': go.Layout(
+            xaxis=dict(title='Zeit', type='date'),
+            yaxis=dict(title=label),
+            title=f'Gerätevergleich: {label}',
+            paper_bgcolor=colors['paper_color'],
+            plot_bgcolor=colors['plot_background'],
+            font=dict(color=colors['text']),
+            height=400,
+            margin={'l': 40, 'r': 20, 't': 40, 'b': 80}
+        )
+    }
+
+
+# The time window slider is an input unless the browser applies it itself (CLIENT_WINDOWS),
+# then moving it must not send a request
+def update_comparison(n_intervals, device_ids, column, window_index):
+    lim_x_axis = WINDOW_MINUTES[window_index]
+    device_ids = tuple(device_id for device_id in device_ids or () if device_id in devices)
+    versions = []
+    max_time = None
+    for device_id in device_ids:
+        buffer = devices[device_id].samples
+        with buffer.lock:
+            versions.append(buffer.version)
+            if buffer.total:
+                newest = int(buffer.view()['time'][-1])
+                max_time = newest if max_time is None else max(max_time, newest)
+    if max_time is None:
+        return dash.no_update
+    return render_comparison(tuple(versions), device_ids, column, lim_x_axis, max_time)
+
+
+app.callback(Output('live-graph-compare', 'figure'),
+             [Input('stats-update', 'n_intervals'),
+              Input('device-select', 'value'),
+              Input('compare-column', 'value')] +
+             ([] if CLIENT_WINDOWS else [Input('lim-x-axis-slider', 'value')]),
+             [State('lim-x-axis-slider', 'value')] if CLIENT_WINDOWS else [])(update_comparison)
+
+
+# Duration and response size of every callback request, labeled with the callback function.
+# flask-compress registered its hook first, so it runs after this one: both are measured
+# without the compression
+@app.server.before_request
+def start_callback_timer():
+    if request.path.endswith('/_dash-update-component'):
+        g.profile = profiler.start() if PROFILE_CALLBACKS else None
+        g.started = time.perf_counter()
+
+
+@app.server.after_request
+def record_callback_metrics(response):
+    if 'started' in g:
+        elapsed = time.perf_counter() - g.started
+        output = (request.get_json(silent=True) or {}).get('output', '')
+        name = getattr(app.callback_map.get(output, {}).get('callback'), '__name__', output)
+        profiler.stop(g.profile, name)
+        callback_seconds.observe(elapsed, name)
+        callback_response_bytes.observe(response.content_length or 0, name)
+    return response
+
+
+@app.server.route('/metrics')
+def serve_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.server.route('/metrics/slowest')
+def serve_slowest_callbacks():
+    return Response(profiler.report() or 'Profiling is off, start with --profile\n', mimetype='text/plain')
+
+
+# Download of the data of a device as CSV, NPZ or Parquet, streamed in chunks, e.g.
+# /export?format=csv&start=2024-06-01T10:00&end=2024-06-01T12:00&device=device1
+# The flight log is exported if there is one, otherwise what is still buffered
+@app.server.route('/export')
+def export_data():
+    kind = request.args.get('format', 'csv')
+    device_id = request.args.get('device') or next(iter(devices), 'device1')
+    if kind not in export_formats:
+        return Response(f'Unbekanntes Format {kind!r}, möglich: {", ".join(export_formats)}\n', 400,
+                        mimetype='text/plain')
+    try:
+        min_time, max_time = (to_epoch_ms(request.args[name]) if request.args.get(name) else None
+                              for name in ('start', 'end'))
+    except ValueError as error:
+        return Response(f'Ungültige Zeitangabe: {error}\n', 400, mimetype='text/plain')
+
+    device = devices.get(device_id)
+    if device is None and devices:
+        return Response(f'Unbekanntes Gerät {device_id!r}\n', 404, mimetype='text/plain')
+    if device is not None and device.record_path:
+        reader = recording_reader(device.record_path, min_time, max_time)
+    else:
+        reader = buffer_reader(device.samples if device else samples, min_time, max_time)
+
+    chunks, mimetype, extension = export_formats[kind]
+    try:
+        body = chunks(reader)
+    except ImportError as error:
+        return Response(f'Export als {kind} nicht verfügbar: {error}\n', 501, mimetype='text/plain')
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{device_id}.{extension}"'})
+
+
+# Popup with the measurements of a clicked track point, looked up only on demand
+@app.callback(Output('marker-layer', 'children'),
+              [Input('track-history', 'clickData'),
+               Input('track-recent', 'clickData')])
+def show_sample_popup(*click_data):
+    triggered = dash.callback_context.triggered
+    feature = triggered[0]['value'] if triggered else None
+    if not feature:
+        return []
+
+    index = feature['properties']['i']
+    pos = samples.snapshot(index, index + 1)
+    if not len(pos['time']):
+        return []
+    lat, lng = pos['lat'][0].item(), pos['lng'][0].item()
+    return [dl.Popup(position=[lat, lng], children=html.Div([
+        html.Div(f"Lat: {lat:.6f}"),
+        html.Div(f"Lng: {lng:.6f}"),
+        html.Div(f"Temp: {pos['temp'][0]:.2f}°C"),
+        html.Div(f"Hum: {pos['hum'][0]:.2f}%"),
+        html.Div(f"pm1: {pos['pm1'][0]:.2f}µg/m³"),
+        html.Div(f"pm10: {pos['pm10'][0]:.2f}µg/m³"),
+        html.Div(f"pm25: {pos['pm25'][0]:.2f}µg/m³"),
+    ]))]
+
+
+# Dashboard processes of a WSGI server attach to the ingestion process when they are
+# imported (without gunicorn's --preload, the reader thread doesn't survive a fork)
+if SHARED_MEMORY:
+    attach_ingestion(SHARED_MEMORY)
+
+
+# Start of the Dash server (python -m luftdaten dashboard)
+def main(argv=None, prog=None):
+    global PROFILE_CALLBACKS
+    parser = argparse.ArgumentParser(
+        prog=prog, description='Live dashboard of the air quality sensor package',
+        epilog='Environment: LUFTDATEN_PUSH_UPDATES=0 polls every second instead of pushing new samples, '
+               'LUFTDATEN_INCREMENTAL_UPDATES=0 redraws the complete figures every second, '
+               'LUFTDATEN_CLIENT_WINDOWS=1 draws the graph time windows in the browser, '
+               'LUFTDATEN_SHARED_MEMORY=NAME attaches to an ingestion process (python -m luftdaten ingest)')
+    parser.add_argument('--source', action='append',
+                        help='[DEVICE_ID=]SOURCE with SOURCE one of serial:COM7, serial:/dev/pts/3, tcp:HOST:PORT, '
+                             'unix:PATH, replay:FILE[@10x|@max] or synthetic[:FRAMES_PER_SECOND]. Repeat for '
+                             'several devices, the first one is shown in the main graphs. Use unix:PATH or '
+                             'tcp:HOST:PORT to show the frames a headless logger relays (default: %s)'
+                             % DATA_SOURCE)
+    parser.add_argument('--record', default=RECORD_PATH,
+                        help='flight log to append the frames to, empty to disable (default: %(default)s)')
+    parser.add_argument('--history',
+                        help='flight log to load the recent samples from without appending to it, e.g. the one '
+                             'of a headless logger (implies --record "")')
+    parser.add_argument('--port', type=int, default=4052, help='HTTP port of the dashboard')
+    parser.add_argument('--profile', action='store_true', default=PROFILE_CALLBACKS,
+                        help='profile the callbacks and show the slowest ones at /metrics/slowest')
+    parser.add_argument('--separate-process', action='store_true',
+                        help='read the sources in a separate ingestion process (see ingest.py) and attach '
+                             'to its shared memory')
+    args = parser.parse_args(argv)
+    PROFILE_CALLBACKS = args.profile
+
+    if args.separate_process and not SHARED_MEMORY:
+        name = f'luftdaten_{os.getpid()}'
+        multiprocessing.Process(target=ingest.run, args=(name, args.source or [DATA_SOURCE], args.record,
+                                                         BUFFER_CAPACITY, RELOAD_MINUTES), daemon=True).start()
+        attach_ingestion(name)
+    elif not SHARED_MEMORY:
+        # (with SHARED_MEMORY set, the dashboard attached to an ingestion process on import)
+        device_specs = [parse_device_spec(text, number + 1)
+                        for number, text in enumerate(args.source or [DATA_SOURCE])]
+        start_ingestion([(device_id, open_source(spec, timeout=0)) for device_id, spec in device_specs],
+                        '' if args.history else args.record, args.history)
+    app.run(port=args.port)
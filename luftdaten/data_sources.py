@@ -0,0 +1,254 @@
+import math
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from .flight_recorder import open_records, read_times
+from .frame_decoder import encode_frame
+
+# Maximum number of frames a replay or synthetic source returns from one read
+MAX_FRAMES_PER_READ = 4096
+
+
+# Sources deliver the raw '<...>' byte stream of the sensor package.
+#
+# 'read()' returns whatever bytes are available, waiting at most 'timeout' seconds for
+# the first ones (b'' if there were none). The reader thread feeds them to a FrameDecoder.
+# Sources backed by a file descriptor also have 'fileno()', so several of them can be
+# waited for at once with a selector. It may change or be None while a source reconnects.
+
+# Real serial port, also usable for a pty (e.g. '/dev/pts/3' from socat)
+class SerialSource:
+    def __init__(self, port, baudrate=115200, timeout=1):
+        import serial
+
+        self.name = port
+        self._serial = serial.Serial(port, baudrate, timeout=timeout)
+
+    # Bytes received by the port but not read yet
+    @property
+    def backlog(self):
+        return self._serial.in_waiting
+
+    # None on Windows: pyserial's ports have no file descriptor there and selectors only
+    # take sockets, the port is polled instead
+    def fileno(self):
+        return self._serial.fileno() if os.name == 'posix' else None
+
+    def read(self):
+        return self._serial.read(self._serial.in_waiting or 1)
+
+    def close(self):
+        self._serial.close()
+
+
+# Seconds before reconnecting a socket the peer closed, doubled after every failed attempt
+# up to RECONNECT_MAX_DELAY
+RECONNECT_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+
+
+# Stream socket: a (host, port) tuple for TCP or a path for a unix domain socket.
+#
+# When the peer closes the connection (e.g. a restarted logger relay), the socket is closed
+# and reconnected with backoff by the following reads. 'fileno()' is None meanwhile, so a
+# selector doesn't report the closed socket as readable forever.
+class SocketSource:
+    def __init__(self, address, timeout=1):
+        self.name = address
+        self.timeout = timeout
+        self.backlog = 0
+        self.reconnects = 0
+        self._delay = RECONNECT_DELAY
+        self._retry_at = 0
+        self._socket = None
+        self._connect()
+
+    def _connect(self):
+        if isinstance(self.name, tuple):
+            connection = socket.create_connection(self.name, timeout=self.timeout or None)
+        else:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                connection.connect(self.name)
+            except OSError:
+                connection.close()
+                raise
+        connection.settimeout(self.timeout)
+        self._socket = connection
+
+    def fileno(self):
+        return None if self._socket is None else self._socket.fileno()
+
+    def read(self):
+        if self._socket is None:
+            return self._reconnect()
+        try:
+            data = self._socket.recv(65536)
+        except (socket.timeout, BlockingIOError):
+            return b''
+        except OSError:
+            data = b''
+        if not data:
+            # Closed by the peer (recv only returns nothing at the end of the stream)
+            self._socket.close()
+            self._socket = None
+            self._retry_at = time.monotonic() + self._delay
+        return data
+
+    # Try to reconnect once the backoff delay has passed, waiting for it at most 'timeout'
+    # seconds like a read
+    def _reconnect(self):
+        wait = self._retry_at - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, self.timeout))
+            if wait > self.timeout:
+                return b''
+        try:
+            self._connect()
+        except OSError:
+            self._delay = min(self._delay * 2, RECONNECT_MAX_DELAY)
+            self._retry_at = time.monotonic() + self._delay
+            return b''
+        self._delay = RECONNECT_DELAY
+        self.reconnects += 1
+        return b''
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+# Replay of a flight log written by FlightRecorder.
+#
+# Frames are sent at 'speed' times the pace of their repaired timestamps, or as fast
+# as they are read with speed=None. Frames with the same (whole second) timestamp are
+# spread evenly over that second.
+class ReplaySource:
+    def __init__(self, path, speed=1.0, timeout=1):
+        self.name = path
+        self.speed = speed
+        self.timeout = timeout
+        self.backlog = 0
+        self._records = open_records(path)
+        self._times = read_times(path)[:len(self._records)]
+        self._offsets = self._replay_offsets()
+        self._position = 0
+        self._started = None
+
+    # Seconds after the first record at which every record is due
+    def _replay_offsets(self):
+        if not len(self._records):
+            return np.zeros(0)
+        seconds = self._times // 1000
+        seconds -= seconds[0]
+        # Fraction of the second: position of the record among the records of its second
+        _, first, counts = np.unique(seconds, return_index=True, return_counts=True)
+        rank = np.arange(len(seconds)) - np.repeat(first, counts)
+        return seconds + rank / np.repeat(counts, counts)
+
+    @property
+    def finished(self):
+        return self._position >= len(self._records)
+
+    def read(self):
+        if self.finished:
+            time.sleep(self.timeout)
+            return b''
+        if self._started is None:
+            self._started = time.monotonic()
+
+        if self.speed is None:
+            stop = self._position + MAX_FRAMES_PER_READ
+        else:
+            elapsed = (time.monotonic() - self._started) * self.speed
+            stop = int(np.searchsorted(self._offsets, elapsed, 'right'))
+            if stop == self._position:
+                # Wait for the next frame, but no longer than the timeout
+                wait = (self._offsets[self._position] - elapsed) / self.speed
+                time.sleep(min(wait, self.timeout))
+                return self.read() if wait <= self.timeout else b''
+            stop = min(stop, self._position + MAX_FRAMES_PER_READ)
+
+        records = self._records[self._position:stop]
+        self._position += len(records)
+        return b''.join(encode_frame(record) for record in records.tolist())
+
+    def close(self):
+        pass
+
+
+# Plausible sensor values of synthetic frame 'i', sent at 'rate' frames/s from 'start'
+def synthetic_values(i, start=datetime(2024, 6, 1, tzinfo=timezone.utc), rate=1.0):
+    t = i / rate
+    now = start + timedelta(seconds=t)
+    # Slow circles around the campus, climbing and descending
+    angle = 2 * math.pi * t / 600
+    pm = 10 + 6 * math.sin(2 * math.pi * t / 300) + 3 * math.sin(2 * math.pi * t / 37)
+    return (0.6 * pm, pm, 1.4 * pm, 40 * pm, 18 + 2 * math.sin(2 * math.pi * t / 900),
+            100 + 50 * math.sin(2 * math.pi * t / 240), 55 + 5 * math.cos(2 * math.pi * t / 900), 0.0, 420.0,
+            now.year, now.month, now.day, now.hour, now.minute, now.second,
+            51.2303 + 0.01 * math.sin(angle), 6.7936 + 0.016 * math.cos(angle), math.degrees(angle) % 360)
+
+
+# Generator of valid frames at 'rate' frames per second, starting at the current time
+class SyntheticSource:
+    def __init__(self, rate=1.0, timeout=1):
+        self.name = f'synthetic@{rate:g}/s'
+        self.rate = rate
+        self.timeout = timeout
+        self.backlog = 0
+        self._start = datetime.now(timezone.utc).replace(microsecond=0)
+        self._started = None
+        self._sent = 0
+
+    def read(self):
+        if self._started is None:
+            self._started = time.monotonic()
+        due = int((time.monotonic() - self._started) * self.rate) + 1
+        if due <= self._sent:
+            # Wait for the next frame, but no longer than the timeout
+            wait = (self._sent + 1 - due) / self.rate
+            time.sleep(min(wait, self.timeout))
+            if wait > self.timeout:
+                return b''
+            due = self._sent + 1
+        due = min(due, self._sent + MAX_FRAMES_PER_READ)
+
+        frames = b''.join(encode_frame(synthetic_values(i, self._start, self.rate))
+                          for i in range(self._sent, due))
+        self._sent = due
+        return frames
+
+    def close(self):
+        pass
+
+
+# Open the data source described by 'spec':
+#
+#   serial:COM7  serial:/dev/ttyUSB0@115200   serial port or pty (default baud rate 115200)
+#   tcp:localhost:5000   unix:/tmp/sensor.sock   stream socket
+#   replay:flight_log.bin  replay:flight_log.bin@10x  replay:flight_log.bin@max
+#   synthetic  synthetic:100                  generated frames (frames per second, default 1)
+def open_source(spec, timeout=1):
+    kind, _, argument = spec.partition(':')
+    if kind == 'serial':
+        port, _, baudrate = argument.partition('@')
+        return SerialSource(port, int(baudrate or 115200), timeout)
+    if kind == 'tcp':
+        host, _, port = argument.rpartition(':')
+        return SocketSource((host, int(port)), timeout)
+    if kind == 'unix':
+        return SocketSource(argument, timeout)
+    if kind == 'replay':
+        path, _, speed = argument.partition('@')
+        speed = speed or '1x'
+        return ReplaySource(path, None if speed == 'max' else float(speed.rstrip('x')), timeout)
+    if kind == 'synthetic':
+        return SyntheticSource(float(argument or 1), timeout)
+    raise ValueError(f'Unknown data source {spec!r}')
+
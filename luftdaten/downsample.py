@@ -0,0 +1,47 @@
+import numpy as np
+
+
+# Indices of the points kept when reducing the series (x, y) to 'n_out' points with
+# Largest-Triangle-Three-Buckets.
+#
+# The first and last point are always kept. The points in between are split into
+# n_out - 2 buckets and from every bucket the point spanning the largest triangle with
+# the point kept from the bucket before and the average of the bucket after is chosen,
+# which preserves peaks and the overall shape of the curve. 'x' must be sorted.
+def lttb_indices(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket i holds the points edges[i] .. edges[i + 1] - 1, none of them is empty
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+
+    # Third corner of the triangles of every bucket: the average of the next bucket,
+    # for the last bucket the last point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Twice the triangle area, without the constant factor
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+# Reduce the series (x, y) to at most 'n_out' points, returns the kept x and y values
+def lttb(x, y, n_out):
+    indices = lttb_indices(x, y, n_out)
+    return x[indices], y[indices]
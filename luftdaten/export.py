@@ -0,0 +1,148 @@
+import csv
+import io
+import zipfile
+
+import numpy as np
+
+from .flight_recorder import read_time_range
+from .frame_decoder import field_names
+from .sample_buffer import column_types
+from .timestamps import plotly_times
+
+# Rows read, converted and sent at a time
+CHUNK_ROWS = 10000
+
+# Exported columns: the timestamp (epoch ms) and all struct fields
+export_columns = ('time',) + tuple(field_names)
+_column_dtypes = dict([('time', np.dtype(np.int64))] + [(name, np.dtype(dtype)) for name, dtype in column_types])
+
+
+# Exports are produced chunk by chunk from a "chunk reader": the number of rows and a
+# function returning the columns of rows [start, stop) as a dict of arrays. Nothing is
+# held longer than one chunk, so hours of data can be exported while the reader thread
+# keeps running.
+
+# Chunk reader of the records of a flight log between min_time and max_time (epoch ms or
+# None), the same rows buffer_reader gives for them. The records are memory-mapped, no lock
+# is taken
+def recording_reader(path, min_time=None, max_time=None):
+    records, times = read_time_range(path, None if min_time is None else np.datetime64(min_time, 'ms'),
+                              None if max_time is None else np.datetime64(max_time, 'ms'))
+
+    def read(start, stop):
+        chunk = records[start:stop]
+        columns = {name: chunk[name] for name in field_names}
+        columns['time'] = times[start:stop]
+        return columns
+    return len(records), read
+
+
+# Chunk reader of the samples of a SampleBuffer between min_time and max_time. The lock is
+# only held to find the range and to copy each chunk. Samples the buffer overwrites during
+# a long export are missing from it
+def buffer_reader(samples, min_time=None, max_time=None):
+    with samples.lock:
+        first, total = samples.time_range(min_time, max_time)
+
+    def read(start, stop):
+        return samples.snapshot(first + start, first + stop)
+    return total - first, read
+
+
+def _chunks(reader):
+    count, read = reader
+    for start in range(0, count, CHUNK_ROWS):
+        columns = read(start, min(start + CHUNK_ROWS, count))
+        if not len(columns['time']):
+            return
+        yield columns
+
+
+# CSV with a header row, the time as ISO 8601 (UTC)
+def csv_chunks(reader):
+    text = io.StringIO()
+    writer = csv.writer(text, lineterminator='\n')
+    writer.writerow(export_columns)
+    yield text.getvalue()
+    for columns in _chunks(reader):
+        text.seek(0)
+        text.truncate()
+        values = [plotly_times(columns['time']).astype(str).tolist()]
+        values += [columns[name].tolist() for name in field_names]
+        writer.writerows(zip(*values))
+        yield text.getvalue()
+
+
+# Collects what a writer writes, to be handed out between writes
+class _Sink(io.RawIOBase):
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+# NumPy .npz archive with one array per column, like numpy.savez. The zip is written to
+# an unseekable stream and each column read chunk by chunk, so the row count has to be
+# known up front: rows that disappear meanwhile end the export with an error
+def npz_chunks(reader):
+    count, read = reader
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name in export_columns:
+            with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+                np.lib.format.write_array_header_1_0(member, {'descr': np.lib.format.dtype_to_descr(
+                    _column_dtypes[name]), 'fortran_order': False, 'shape': (count,)})
+                written = 0
+                for start in range(0, count, CHUNK_ROWS):
+                    values = read(start, min(start + CHUNK_ROWS, count))[name]
+                    member.write(np.ascontiguousarray(values, dtype=_column_dtypes[name]).tobytes())
+                    written += len(values)
+                    yield sink.take()
+                if written != count:
+                    raise RuntimeError(f'Export of {name} ended after {written} of {count} rows')
+            yield sink.take()
+    yield sink.take()
+
+
+# Parquet file with one row group per chunk, needs pyarrow. Raises ImportError right away
+# if it is not installed, before anything is sent
+def parquet_chunks(reader):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([('time', pa.timestamp('ms', tz='UTC'))] +
+                       [(name, pa.from_numpy_dtype(_column_dtypes[name])) for name in field_names])
+
+    def generate():
+        sink = _Sink()
+        with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema) as writer:
+            for columns in _chunks(reader):
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(columns['time'].astype('datetime64[ms]'), pa.timestamp('ms', tz='UTC'))] +
+                    [pa.array(columns[name], schema.field(name).type) for name in field_names], schema=schema))
+                yield sink.take()
+        yield sink.take()
+    return generate()
+
+
+# Export formats: chunk generator, mimetype and file extension
+formats = {
+    'csv': (csv_chunks, 'text/csv', 'csv'),
+    'npz': (npz_chunks, 'application/octet-stream', 'npz'),
+    'parquet': (parquet_chunks, 'application/vnd.apache.parquet', 'parquet'),
+}
@@ -0,0 +1,216 @@
+import logging
+import os
+import queue
+import threading
+
+import numpy as np
+
+from .frame_decoder import field_codes, field_names
+
+# Numpy type of each struct format character (little endian, like the struct)
+_record_types = {'f': '<f4', 'd': '<f8', 'H': '<u2', 'B': 'u1'}
+
+# One record of the flight log: the frame payload exactly as packed by the sensor ('<9fH5B3d', 67 bytes)
+record_dtype = np.dtype([(name, _record_types[code]) for name, code in zip(field_names, field_codes)])
+
+# Every INDEX_EVERY-th record gets an entry (epoch second, record number) in the time index
+INDEX_EVERY = 64
+
+# Layout of the sidecar time index
+index_dtype = np.dtype([('time', '<i8'), ('record', '<i8')])
+
+# Layout of the sidecar time column: the repaired timestamp of every record (epoch ms)
+time_dtype = np.dtype('<i8')
+
+_logger = logging.getLogger(__name__)
+
+
+# GPS timestamps of log records as datetime64[s], computed column-wise
+def record_times(records):
+    months = (records['year'].astype(np.int64) - 1970) * 12 + records['month'] - 1
+    days = months.astype('datetime64[M]').astype('datetime64[D]') + (records['day'].astype(np.int64) - 1)
+    seconds = (records['hour'].astype(np.int64) * 3600 + records['minute'].astype(np.int64) * 60 +
+               records['second'])
+    return days.astype('datetime64[s]') + seconds
+
+
+# GPS timestamps of log records in epoch milliseconds
+def _gps_times_ms(records):
+    return record_times(records).astype('datetime64[ms]').astype(np.int64)
+
+
+# Append-only binary flight log.
+#
+# Decoded frames are stored back to back in the fixed 67 byte record layout of the
+# struct, so the file can be mapped with numpy.memmap (see 'open_records'). The records
+# keep the GPS time fields exactly as the sensor sent them. The sidecar file '<path>.time'
+# holds the repaired timestamp of every record (see timestamps.TimeFilter), which never
+# runs backwards, and '<path>.idx' maps the time of every INDEX_EVERY-th record to its
+# record number, so the log can be searched by time (see 'read_time_range').
+#
+# 'write' only queues the frames, a background thread writes them in batches so the
+# serial reader is never blocked by disk I/O. The time column is written before the
+# records, so readers find the times of all records they see.
+#
+# If writing fails (disk full, log removed), the error is logged and kept in 'error' and
+# the recorder stops: 'write' refuses all further frames and 'dropped' counts the frames
+# that were not written. Records written before stay readable.
+class FlightRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.time_path = path + '.time'
+
+        # Drop a torn record (and index entries pointing behind it) left by a crash
+        with open(path, 'a+b') as log:
+            self.records = log.seek(0, os.SEEK_END) // record_dtype.itemsize
+            log.truncate(self.records * record_dtype.itemsize)
+        # Drop the times of records that were never written, and add the GPS times of
+        # records written without a time column
+        with open(self.time_path, 'a+b') as time_file:
+            times = min(time_file.seek(0, os.SEEK_END) // time_dtype.itemsize, self.records)
+            time_file.truncate(times * time_dtype.itemsize)
+            time_file.write(_gps_times_ms(open_records(path)[times:]).astype(time_dtype).tobytes())
+        entries = int(np.searchsorted(read_index(path)['record'], self.records))
+        with open(self.index_path, 'a+b') as index_file:
+            index_file.truncate(entries * index_dtype.itemsize)
+
+        self.error = None
+        self.dropped = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    # Queue decoded frames (tuples in struct field order) for writing, with their repaired
+    # timestamps (epoch ms) for the time column, their GPS times if None. Returns False if
+    # the recorder stopped after an error, the frames are dropped then
+    def write(self, frames, times=None):
+        if frames:
+            self._queue.put((frames, times))
+        return self.error is None
+
+    # Write everything queued so far and stop the writer thread
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _write_loop(self):
+        closing = False
+        frames = []
+        try:
+            with open(self.path, 'ab') as log, open(self.index_path, 'ab') as index_file, \
+                    open(self.time_path, 'ab') as time_file:
+                while not closing:
+                    closing, batches = self._take()
+                    frames = [frame for batch, _ in batches for frame in batch]
+                    if frames:
+                        self._write_batches(log, index_file, time_file, batches, frames)
+                    frames = []
+        except Exception as error:
+            self.error = error
+            self.dropped += len(frames)
+            _logger.exception('Writing the flight log %s failed, no more frames are recorded', self.path)
+
+        # Drop what was queued before 'write' noticed the error
+        while not closing:
+            closing, batches = self._take()
+            self.dropped += sum(len(batch) for batch, _ in batches)
+
+    # Everything that piled up in the queue while the last batch was written, and whether
+    # 'close' was called
+    def _take(self):
+        batches = [self._queue.get()]
+        while not self._queue.empty():
+            batches.append(self._queue.get())
+        return None in batches, [batch for batch in batches if batch is not None]
+
+    def _write_batches(self, log, index_file, time_file, batches, frames):
+        records = np.array(frames, dtype=record_dtype)
+        # The repaired timestamps, the GPS times of batches written without
+        offsets = np.cumsum([0] + [len(batch) for batch, _ in batches])
+        times = np.concatenate([_gps_times_ms(records[start:stop]) if batch_times is None else batch_times
+                                for (_, batch_times), start, stop in zip(batches, offsets, offsets[1:])])
+        time_file.write(times.astype(time_dtype).tobytes())
+        time_file.flush()
+        log.write(records.tobytes())
+        log.flush()
+
+        # Index entries for the records whose number is a multiple of INDEX_EVERY
+        first = -self.records % INDEX_EVERY
+        entries = np.empty(len(times[first::INDEX_EVERY]), dtype=index_dtype)
+        entries['time'] = times[first::INDEX_EVERY] // 1000
+        entries['record'] = self.records + first + INDEX_EVERY * np.arange(len(entries))
+        index_file.write(entries.tobytes())
+        index_file.flush()
+        self.records += len(records)
+
+
+# Memory-mapped view of all complete records of a flight log
+def open_records(path):
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    count = size // record_dtype.itemsize
+    if not count:
+        return np.zeros(0, dtype=record_dtype)
+    return np.memmap(path, dtype=record_dtype, mode='r', shape=(count,))
+
+
+# Time index of a flight log
+def read_index(path):
+    index_path = path + '.idx'
+    size = os.path.getsize(index_path) if os.path.exists(index_path) else 0
+    count = size // index_dtype.itemsize
+    if not count:
+        return np.zeros(0, dtype=index_dtype)
+    return np.memmap(index_path, dtype=index_dtype, mode='r', shape=(count,))
+
+
+# Repaired timestamps (epoch ms) of all complete records of a flight log, memory-mapped.
+# Records without one in the time column (a log written before it existed) get their
+# GPS times
+def read_times(path):
+    count = len(open_records(path))
+    time_path = path + '.time'
+    size = os.path.getsize(time_path) if os.path.exists(time_path) else 0
+    stored = min(size // time_dtype.itemsize, count)
+    times = np.memmap(time_path, dtype=time_dtype, mode='r', shape=(stored,)) if stored else \
+        np.zeros(0, dtype=time_dtype)
+    if stored < count:
+        return np.concatenate([times, _gps_times_ms(open_records(path)[stored:])])
+    return times
+
+
+# Number of the first record with a time after 't' ('right') or not before 't' ('left'),
+# in epoch seconds. The index narrows the search down to INDEX_EVERY records.
+def _search(times, index, t, side):
+    entry = int(np.searchsorted(index['time'], t, side))
+    lo = int(index['record'][entry - 1]) if entry > 0 else 0
+    hi = int(index['record'][entry]) if entry < len(index) else len(times)
+    lo, hi = min(lo, len(times)), min(hi, len(times))
+    return lo + int(np.searchsorted(times[lo:hi] // 1000, t, side))
+
+
+# Records of a flight log with min_time <= time <= max_time and their repaired timestamps
+# (epoch ms), as memory-mapped slices. The bounds may be finer than the whole seconds of
+# the records (datetime64 of any unit): a record is in the range exactly when
+# SampleBuffer.time_range would include its sample
+def read_time_range(path, min_time=None, max_time=None):
+    records = open_records(path)
+    times = read_times(path)[:len(records)]
+    index = read_index(path)
+    start, stop = 0, len(records)
+    if min_time is not None:
+        # The first whole second not before min_time
+        start = _search(times, index, -(-np.datetime64(min_time, 'ms').astype(np.int64) // 1000), 'left')
+    if max_time is not None:
+        stop = _search(times, index, np.datetime64(max_time, 'ms').astype(np.int64) // 1000, 'right')
+    stop = max(start, stop)
+    return records[start:stop], times[start:stop]
+
+
+# Records of the last 'minutes' minutes before the newest record of a flight log and their
+# repaired timestamps (epoch ms)
+def read_last_minutes(path, minutes):
+    times = read_times(path)
+    if not len(times):
+        return open_records(path), times
+    return read_time_range(path, np.datetime64(int(times[-1]) - minutes * 60 * 1000, 'ms'))
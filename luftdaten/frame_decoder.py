@@ -0,0 +1,100 @@
+import re
+import struct
+
+# Define the format of the struct sent by the sensor package
+struct_format = '<9fH5B3d'
+
+# Names of the struct fields, in the order they are packed
+field_names = ('pm1', 'pm25', 'pm10', 'sum_bins', 'temp', 'altitude', 'hum', 'xtra', 'co2',
+               'year', 'month', 'day', 'hour', 'minute', 'second',
+               'lat', 'lng', 'heading')
+
+# Struct format character of each field ('f' for pm1, 'H' for year, ...)
+field_codes = ''.join(code * int(count or 1) for count, code in re.findall(r'(\d*)([a-zA-Z])', struct_format[1:]))
+
+# Every frame on the wire is '<' + struct payload + '>'
+FRAME_START = b'<'
+FRAME_END = b'>'
+
+# Precompiled structs: the bare payload and the payload including both delimiters
+payload_struct = struct.Struct(struct_format)
+frame_struct = struct.Struct('<x' + struct_format[1:] + 'x')
+
+PAYLOAD_SIZE = payload_struct.size
+FRAME_SIZE = frame_struct.size
+
+
+# Pack one tuple of field values into a complete '<...>' frame
+def encode_frame(values):
+    return FRAME_START + payload_struct.pack(*values) + FRAME_END
+
+
+# Streaming decoder for the '<...>' framed serial protocol.
+#
+# Bytes are fed in whatever chunks the port delivers. Every complete frame in the
+# buffer is decoded in one go, an incomplete frame at the end is kept for the next
+# call. Garbage in front of a frame is skipped (counted in 'resyncs'), a '<' that is
+# not followed by a '>' one payload later is counted in 'bad_frames' and scanning
+# continues right after it.
+class FrameDecoder:
+    def __init__(self):
+        self._buffer = bytearray()
+        self.frames = 0
+        self.resyncs = 0
+        self.bad_frames = 0
+
+    # Number of bytes waiting for the rest of their frame
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        pos = 0
+        end = len(buffer)
+
+        while end - pos >= FRAME_SIZE:
+            start = buffer.find(FRAME_START, pos)
+            if start < 0:
+                # No frame start at all, only the tail can still become one
+                self.resyncs += 1
+                pos = end
+                break
+            if start != pos:
+                self.resyncs += 1
+                pos = start
+            if end - pos < FRAME_SIZE:
+                break
+
+            # Fast path: the leading run of back-to-back frames is unpacked with iter_unpack
+            count = (end - pos) // FRAME_SIZE
+            with memoryview(buffer) as view:
+                run = view[pos:pos + count * FRAME_SIZE]
+                starts = run[::FRAME_SIZE].tobytes()
+                ends = run[FRAME_SIZE - 1::FRAME_SIZE].tobytes()
+                good = count - max(len(starts.lstrip(FRAME_START)), len(ends.lstrip(FRAME_END)))
+                if good:
+                    frames.extend(frame_struct.iter_unpack(run[:good * FRAME_SIZE]))
+                run.release()
+            pos += good * FRAME_SIZE
+
+            # The frame at 'pos' is broken: either garbage (resynced by the next find) or a
+            # '<' without its '>', which is skipped
+            if good < count and buffer[pos] == FRAME_START[0]:
+                self.bad_frames += 1
+                pos += 1
+
+        # Keep the partial frame for the next read, garbage in front of it is dropped
+        tail = end
+        if pos < end:
+            tail = buffer.find(FRAME_START, pos)
+            if tail != pos:
+                self.resyncs += 1
+            if tail < 0:
+                tail = end
+        del buffer[:tail]
+
+        self.frames += len(frames)
+        return frames
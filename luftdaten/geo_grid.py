@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .map_track import COORDINATE_DECIMALS
+
+# Samples aggregated into the cells of a fixed latitude/longitude grid: the number of
+# samples and the mean and maximum of every column per cell, over everything ever added.
+#
+# Cells are keyed by their (row, column) in the grid, so a sample only changes the one
+# cell it falls into and the cost of the grid depends on the area covered, not on the
+# number of samples. Every cell remembers the version it was last changed at and the
+# cells are kept in the order of their last change, so the cells changed since a version
+# are found without looking at the others.
+#
+# The version is the global index of the sample after the last one added (the ring
+# buffer's 'total' after it), not a counter of the process: every dashboard worker
+# attached to the same ingestion process (SHARED_MEMORY) adds the same samples, so a
+# version one worker sent to a browser means the same in the others. They may add the
+# samples in other batches, then a cell changed just before a version can be sent again,
+# but a cell changed after it is never missed.
+class GeoGrid:
+    def __init__(self, columns, cell_degrees):
+        self.columns = columns
+        self.cell_degrees = cell_degrees
+        self.version = 0
+        self.lock = threading.Lock()
+        # (row, column) -> [version, count, sums, maxima], in the order of the last change
+        self._cells = OrderedDict()
+
+    def __len__(self):
+        return len(self._cells)
+
+    # Add samples: a mapping with 'lat', 'lng' and the columns as arrays (see
+    # sample_buffer.frame_columns, or flight log records). 'version' is the global index of
+    # the sample after the last one, it never goes backwards. Samples without a position
+    # (no GPS fix yet, 0/0) or with a missing value are left out
+    def update(self, columns, version):
+        lat = np.asarray(columns['lat'], dtype=np.float64)
+        lng = np.asarray(columns['lng'], dtype=np.float64)
+        values = np.column_stack([np.asarray(columns[column], dtype=np.float64) for column in self.columns])
+        valid = np.isfinite(lat) & np.isfinite(lng) & ((lat != 0) | (lng != 0)) & np.isfinite(values).all(axis=1)
+        if not valid.any():
+            return
+        cells = np.floor(np.column_stack([lat[valid], lng[valid]]) / self.cell_degrees).astype(np.int64)
+        values = values[valid]
+
+        # The samples of a batch are summed up per cell first, so every touched cell is
+        # updated once
+        keys, inverse = np.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse, minlength=len(keys))
+        sums = np.zeros((len(keys), len(self.columns)))
+        np.add.at(sums, inverse, values)
+        maxima = np.full((len(keys), len(self.columns)), -np.inf)
+        np.maximum.at(maxima, inverse, values)
+
+        with self.lock:
+            version = max(version, self.version)
+            for key, count, cell_sums, cell_maxima in zip(map(tuple, keys.tolist()), counts.tolist(),
+                                                          sums.tolist(), maxima.tolist()):
+                cell = self._cells.pop(key, None)
+                if cell is None:
+                    cell = [version, count, cell_sums, cell_maxima]
+                else:
+                    cell[0] = version
+                    cell[1] += count
+                    cell[2] = [old + new for old, new in zip(cell[2], cell_sums)]
+                    cell[3] = [max(old, new) for old, new in zip(cell[3], cell_maxima)]
+                self._cells[key] = cell
+            self.version = version
+
+    # Cells changed after version 'since' (all cells if None) as (row, column, count,
+    # {column: mean}, {column: maximum}) tuples, the most recently changed first
+    def changed(self, since=None):
+        cells = []
+        with self.lock:
+            for key in reversed(self._cells):
+                version, count, sums, maxima = self._cells[key]
+                if since is not None and version <= since:
+                    break
+                cells.append((key[0], key[1], count, dict(zip(self.columns, (total / count for total in sums))),
+                               dict(zip(self.columns, maxima))))
+        return cells
+
+
+# GeoJSON polygon features of grid cells from GeoGrid.changed.
+#
+# Features carry the cell 'id' (to replace the cell in the browser), the number of
+# samples, the mean of every column and its maximum as '<column>_max', and a tooltip.
+# 'labels' maps the columns to the labels shown in the tooltip
+def cell_features(cells, cell_degrees, labels):
+    features = []
+    for row, column, count, means, maxima in cells:
+        south, west = row * cell_degrees, column * cell_degrees
+        north, east = south + cell_degrees, west + cell_degrees
+        ring = np.round([[west, south], [east, south], [east, north], [west, north], [west, south]],
+                        COORDINATE_DECIMALS).tolist()
+        properties = {'id': f'{row}:{column}', 'count': count}
+        for name, mean in means.items():
+            properties[name] = round(mean, 1)
+            properties[name + '_max'] = round(maxima[name], 1)
+        properties['tooltip'] = '<br>'.join(
+            [f'{count} Messungen'] + [f'{label}: Ø {means[name]:.1f}, max. {maxima[name]:.1f} µg/m³'
+                                      for name, label in labels.items()])
+        features.append({'type': 'Feature', 'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+                         'properties': properties})
+    return features
@@ -0,0 +1,77 @@
+import argparse
+import os
+import signal
+import sys
+
+from .data_sources import open_source
+from .flight_recorder import FlightRecorder, read_last_minutes
+from .multi_ingest import Device, device_record_path, parse_device_spec, poll_devices
+from .shared_ring import SharedRing, create_directory, ring_name
+from .timestamps import frame_times
+
+# Samples kept per device in shared memory (24 h at one frame per second)
+RING_CAPACITY = 24 * 60 * 60
+
+# Minutes of recorded data loaded from the flight logs into the rings on startup
+RELOAD_MINUTES = 60
+
+
+# Ingestion process: reads all devices, appends their frames to the flight logs and
+# publishes them in shared memory rings '<name>_<device ID>', which any number of
+# dashboard processes can attach to (see dashboard.attach_ingestion). The segment '<name>'
+# lists the devices, it is created last, so the rings exist once it does.
+#
+# 'specs' are '[DEVICE_ID=]SOURCE' strings like the --source options of the dashboard. The
+# rings are removed again when the process ends.
+def run(name, specs, record_path, capacity=RING_CAPACITY, reload_minutes=RELOAD_MINUTES):
+    # Leave through the cleanup below when terminated
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    devices = []
+    recorders = {}
+    directory = None
+    try:
+        for number, text in enumerate(specs):
+            device_id, spec = parse_device_spec(text, number + 1)
+            ring = SharedRing.create(ring_name(name, device_id), capacity)
+            device = Device(device_id, open_source(spec, timeout=0), ring)
+            devices.append(device)
+            if record_path:
+                path = device.record_path = device_record_path(record_path, device_id, number)
+                recent, times = read_last_minutes(path, reload_minutes)
+                ring.load(recent.tolist(), times)
+                recorders[device_id] = FlightRecorder(path)
+        directory = create_directory(name, [{'id': device.device_id, 'record_path': device.record_path}
+                                            for device in devices])
+
+        for device, frames in poll_devices(devices):
+            times = device.samples.extend(frames, frame_times(frames))
+            device.samples.status.publish(device.decoder, device.source)
+            if device.device_id in recorders:
+                recorders[device.device_id].write(frames, times)
+    finally:
+        for recorder in recorders.values():
+            recorder.close()
+        for device in devices:
+            device.source.close()
+            device.samples.close(unlink=True)
+        if directory is not None:
+            directory.close()
+            directory.unlink()
+
+
+# Command line of the ingestion process (python -m luftdaten ingest)
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Ingestion process of the air quality dashboard, '
+                                                            'publishing the frames in shared memory')
+    parser.add_argument('--shared-memory', default=os.environ.get('LUFTDATEN_SHARED_MEMORY', 'luftdaten'),
+                        help='name of the shared memory, set LUFTDATEN_SHARED_MEMORY to the same name for the '
+                             'dashboard processes (default: %(default)s)')
+    parser.add_argument('--source', action='append',
+                        help='[DEVICE_ID=]SOURCE, see "python -m luftdaten dashboard --help" (default: '
+                             'LUFTDATEN_SOURCE or serial:COM7)')
+    parser.add_argument('--record', default='flight_log.bin',
+                        help='flight log to append the frames to, empty to disable (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    run(args.shared_memory, args.source or [os.environ.get('LUFTDATEN_SOURCE', 'serial:COM7')], args.record)
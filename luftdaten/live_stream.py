@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+# Buffer columns pushed to the browsers, enough for the graphs and the map track
+stream_columns = ('temp', 'hum', 'pm1', 'pm25', 'pm10', 'altitude', 'lat', 'lng')
+
+# Messages a client may fall behind before its backlog is dropped and it is told to resync
+MAX_PENDING = 50
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+# Minimum seconds between two writes to a client, messages arriving meanwhile are sent together
+MIN_SEND_INTERVAL = 0.1
+
+
+# Server-Sent Event message of the samples with global indices start, start + 1, ...
+# 'data' maps 'time' (epoch ms) and the stream_columns to arrays or sequences
+def batch_message(start, data):
+    batch = {'start': start}
+    for name in ('time',) + stream_columns:
+        batch[name] = np.asarray(data[name]).tolist()
+    return f'data: {json.dumps(batch)}\n\n'
+
+
+# Message telling a client it missed samples and has to reload the complete figures
+RESYNC_MESSAGE = 'event: resync\ndata: {}\n\n'
+
+
+class _Client:
+    def __init__(self):
+        self.pending = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+
+# Fan-out of new sample batches to all connected stream clients.
+#
+# 'publish' is called by the reader thread and never waits for a client: it only
+# appends the encoded message to every client's pending list. Each client's response generator
+# sends everything that piled up in one write. A client that falls more than
+# MAX_PENDING messages behind has its backlog replaced by a single resync message.
+class Broadcaster:
+    def __init__(self):
+        self._clients = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def subscribe(self):
+        client = _Client()
+        with self._lock:
+            self._clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def publish(self, message):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            with client.lock:
+                if len(client.pending) >= MAX_PENDING:
+                    # Coalesce: the client gets the complete figures again instead of the backlog
+                    client.pending = [RESYNC_MESSAGE]
+                elif client.pending[-1:] != [RESYNC_MESSAGE]:
+                    client.pending.append(message)
+            client.wakeup.set()
+
+    # Response body of one stream client, starting with the messages in 'backlog'
+    def stream(self, client, backlog=()):
+        try:
+            for message in backlog:
+                yield message
+            while True:
+                if not client.wakeup.wait(KEEPALIVE_INTERVAL):
+                    yield ': keepalive\n\n'
+                    continue
+                # Let a burst of messages pile up, then send them in one write
+                time.sleep(MIN_SEND_INTERVAL)
+                with client.lock:
+                    client.wakeup.clear()
+                    pending, client.pending = client.pending, []
+                if pending:
+                    yield ''.join(pending)
+        finally:
+            self.unsubscribe(client)
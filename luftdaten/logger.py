@@ -0,0 +1,168 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+
+from .data_sources import open_source
+from .flight_recorder import FlightRecorder, read_times
+from .frame_decoder import encode_frame
+from .multi_ingest import Device, device_record_path, parse_device_spec, poll_devices
+from .timestamps import TimeFilter, frame_times
+
+# Flight log the frames are appended to (overridden by --record)
+RECORD_PATH = 'flight_log.bin'
+
+
+# Relay of the decoded frames to dashboards on a local socket, 'unix:PATH' or
+# 'tcp:HOST:PORT' like the data sources, so a dashboard started with the same address as
+# its --source shows the frames live.
+#
+# The frames are encoded again, so a client gets whole frames from the first byte on.
+# Clients whose socket buffer is full miss the batch (or the end of it, their decoder
+# resyncs) instead of slowing down the logger.
+class FrameRelay:
+    def __init__(self, address):
+        kind, _, argument = address.partition(':')
+        self.address = address
+        self._path = None
+        if kind == 'unix':
+            # Left behind by a logger that was killed
+            if os.path.exists(argument):
+                os.unlink(argument)
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.bind(argument)
+            self._path = argument
+        elif kind == 'tcp':
+            host, _, port = argument.rpartition(':')
+            self._socket = socket.create_server((host, int(port)))
+        else:
+            raise ValueError(f'Unknown relay address {address!r}')
+        self._socket.listen()
+        self._clients = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                # Closed
+                return
+            client.setblocking(False)
+            with self._lock:
+                self._clients.append(client)
+
+    # Send decoded frames (tuples in struct field order) to all connected clients
+    def send(self, frames):
+        with self._lock:
+            clients = list(self._clients)
+        if not clients:
+            return
+        data = b''.join(encode_frame(frame) for frame in frames)
+        for client in clients:
+            try:
+                client.send(data)
+            except BlockingIOError:
+                pass
+            except OSError:
+                # Disconnected
+                with self._lock:
+                    self._clients.remove(client)
+                client.close()
+
+    def close(self):
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients = []
+        if self._path is not None and os.path.exists(self._path):
+            os.unlink(self._path)
+
+
+# Relay address of a device: the first device uses 'address' itself, the others
+# 'PATH_<device ID>' or the next TCP ports
+def device_relay_address(address, device_id, number):
+    kind, _, argument = address.partition(':')
+    if kind == 'tcp':
+        host, _, port = argument.rpartition(':')
+        return f'tcp:{host}:{int(port) + number}'
+    return f'{kind}:{device_record_path(argument, device_id, number)}'
+
+
+# Headless logger: reads all devices and appends their frames to the flight logs, and
+# optionally relays them to dashboards (see FrameRelay). Runs only the frame decoder and
+# the flight recorder, dash and plotly are never imported, so it starts fast and stays
+# small on the field loggers. A dashboard can load the flight logs later (--history or a
+# replay: source) or follow the relay live (--source unix:PATH).
+#
+# 'specs' are '[DEVICE_ID=]SOURCE' strings like the --source options of the dashboard.
+def run(specs, record_path=RECORD_PATH, relay_address=None):
+    # Leave through the cleanup below when terminated
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    devices = []
+    recorders = {}
+    relays = {}
+    # Timestamps of every device, repaired for the flight logs like in the sample buffers
+    time_filters = {}
+    try:
+        for number, text in enumerate(specs):
+            device_id, spec = parse_device_spec(text, number + 1)
+            # The logger keeps no samples in memory
+            device = Device(device_id, open_source(spec, timeout=0), None)
+            devices.append(device)
+            if record_path:
+                device.record_path = device_record_path(record_path, device_id, number)
+                recorders[device_id] = FlightRecorder(device.record_path)
+                # Continuing after the end of the flight log, so the appended records never run back
+                # before it
+                logged = read_times(device.record_path)
+                time_filters[device_id] = TimeFilter()
+                time_filters[device_id].resume(logged[-1] if len(logged) else None)
+            if relay_address:
+                relays[device_id] = FrameRelay(device_relay_address(relay_address, device_id, number))
+
+        for device, frames in poll_devices(devices):
+            if device.device_id in recorders:
+                recorders[device.device_id].write(frames, time_filters[device.device_id].apply(frame_times(frames)))
+            if device.device_id in relays:
+                relays[device.device_id].send(frames)
+    finally:
+        for recorder in recorders.values():
+            recorder.close()
+        for relay in relays.values():
+            relay.close()
+        for device in devices:
+            device.source.close()
+
+
+# Command line of the headless logger (python -m luftdaten log)
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Headless logger of the air quality sensor package, '
+                                                            'recording the frames without the dashboard')
+    parser.add_argument('--source', action='append',
+                        help='[DEVICE_ID=]SOURCE, see "python -m luftdaten dashboard --help" (default: '
+                             'LUFTDATEN_SOURCE or serial:COM7)')
+    parser.add_argument('--record', default=RECORD_PATH,
+                        help='flight log to append the frames to, empty to disable (default: %(default)s)')
+    parser.add_argument('--relay',
+                        help='unix:PATH or tcp:HOST:PORT to relay the frames to dashboards on, e.g. '
+                             'unix:/tmp/luftdaten.sock. Further devices get PATH_<device ID> or the next ports')
+    args = parser.parse_args(argv)
+
+    try:
+        run(args.source or [os.environ.get('LUFTDATEN_SOURCE', 'serial:COM7')], args.record, args.relay)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,64 @@
+import numpy as np
+
+# Minimum distance in screen pixels between two consecutive points drawn on the map
+MIN_PIXEL_DISTANCE = 4
+
+# Decimal places of the coordinates sent to the browser (~0.1 m)
+COORDINATE_DECIMALS = 6
+
+
+# Maximum number of points of a whole track sent to the browser, the newest are kept
+MAX_TRACK_POINTS = 2000
+
+
+# Size in degrees of one decimation cell at the given map zoom level (256 px tiles)
+def cell_size(zoom):
+    return MIN_PIXEL_DISTANCE * 360.0 / (256 * 2 ** zoom)
+
+
+# Mask of the track points to draw at the given zoom level.
+#
+# The map is cut into cells of MIN_PIXEL_DISTANCE pixels and only the first point in every
+# cell is drawn, so a hovering drone, GPS jitter of a parked sensor or a track flown again
+# add no points where there already is one. 'prev_lat'/'prev_lng' is the point before the
+# first one, if any, its cell is skipped too. The browser skips the points of new batches
+# in cells it already draws (assets/map.js).
+def decimate(lat, lng, zoom, prev_lat=None, prev_lng=None):
+    size = cell_size(zoom)
+    cells_lat = np.floor(np.asarray(lat, dtype=np.float64) / size).astype(np.int64)
+    cells_lng = np.floor(np.asarray(lng, dtype=np.float64) / size).astype(np.int64)
+    # One number per cell (the cell indices stay far below 2^31 up to zoom 24)
+    cells = cells_lat * (1 << 32) + cells_lng
+    keep = np.zeros(len(cells), dtype=bool)
+    keep[np.unique(cells, return_index=True)[1]] = True
+    if len(keep) and prev_lat is not None:
+        keep &= cells != (int(np.floor(prev_lat / size)) * (1 << 32) + int(np.floor(prev_lng / size)))
+    return keep
+
+
+# Mask of at most 'max_points' points: the newest of 'keep'
+def limit_points(keep, max_points=MAX_TRACK_POINTS):
+    kept = np.flatnonzero(keep)
+    if len(kept) > max_points:
+        keep = keep.copy()
+        keep[kept[:-max_points]] = False
+    return keep
+
+
+# GeoJSON point features of the masked samples.
+#
+# Features only carry the global sample index 'i' (to look up popup data on demand)
+# and the PM values the browser colors the points by.
+def track_features(data, start, keep):
+    indices = (start + np.flatnonzero(keep)).tolist()
+    lat = np.round(data['lat'][keep], COORDINATE_DECIMALS).tolist()
+    lng = np.round(data['lng'][keep], COORDINATE_DECIMALS).tolist()
+    pm1 = np.round(data['pm1'][keep], 1).tolist()
+    pm25 = np.round(data['pm25'][keep], 1).tolist()
+    pm10 = np.round(data['pm10'][keep], 1).tolist()
+    return [
+        {'type': 'Feature',
+         'geometry': {'type': 'Point', 'coordinates': [x, y]},
+         'properties': {'i': i, 'pm1': p1, 'pm25': p25, 'pm10': p10}}
+        for i, y, x, p1, p25, p10 in zip(indices, lat, lng, pm1, pm25, pm10)
+    ]
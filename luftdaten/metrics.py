@@ -0,0 +1,181 @@
+import bisect
+import cProfile
+import heapq
+import io
+import itertools
+import pstats
+import threading
+import time
+
+# Default histogram buckets for latencies in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Default histogram buckets for response sizes in bytes
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+# Metrics in the Prometheus text format.
+#
+# Counters and histograms are updated where things happen (reader thread, request hooks)
+# and only cost a lock and an addition. Values that already exist elsewhere, like the
+# decoder counters or the buffer fill level, are registered as functions and only read
+# when /metrics is scraped. A metric can have one label (e.g. 'device'), its values are
+# passed along with every update or returned by the function as a dict.
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    pairs = [(name, value) for name, value in pairs if name is not None]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, label_value=None):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, _labels([(self.label, label_value)]), value) for label_value, value in values.items()]
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(label_value, ([0] * len(self.buckets), 0.0))
+            counts[position] += 1
+            self._values[label_value] = counts, total + value
+
+    def samples(self):
+        with self._lock:
+            values = {label_value: (list(counts), total) for label_value, (counts, total) in self._values.items()}
+        lines = []
+        for label_value, (counts, total) in values.items():
+            label = (self.label, label_value)
+            for bound, count in zip(self.buckets, itertools.accumulate(counts)):
+                lines.append((self.name + '_bucket', _labels([label, ('le', _number(bound))]), count))
+            lines.append((self.name + '_sum', _labels([label]), total))
+            lines.append((self.name + '_count', _labels([label]), sum(counts)))
+        return lines
+
+
+# Gauge or counter read from 'function' at scrape time. The function returns a number, or
+# a dict {label value: number} if the metric has a label
+class Collected:
+    def __init__(self, name, help, function, type='gauge', label=None):
+        self.name = name
+        self.help = help
+        self.function = function
+        self.type = type
+        self.label = label
+
+    def samples(self):
+        values = self.function()
+        if self.label is None:
+            values = {None: values}
+        return [(self.name, _labels([(self.label, label_value)]), value) for label_value, value in values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help, label=None):
+        return self._add(Counter(name, help, label))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        return self._add(Histogram(name, help, buckets, label))
+
+    def collected(self, name, help, function, type='gauge', label=None):
+        return self._add(Collected(name, help, function, type, label))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    # All metrics in the Prometheus text exposition format
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(f'{name}{labels} {_number(value)}' for name, labels, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+# Profiling hook keeping the cProfile statistics of the 'keep' slowest calls.
+#
+# 'start()' before the call returns a token to pass to 'stop(token, name)' after it, so
+# it can be split over request hooks. Only one profiler can be active per process on
+# newer Pythons, calls overlapping a profiled one run unprofiled.
+class SlowestCalls:
+    def __init__(self, keep=10, lines=25):
+        self.keep = keep
+        self.lines = lines
+        self._slowest = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        return profile, time.perf_counter()
+
+    def stop(self, started, name):
+        if started is None:
+            return
+        profile, start = started
+        profile.disable()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if len(self._slowest) >= self.keep and elapsed <= self._slowest[0][0]:
+                return
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(self.lines)
+        entry = (elapsed, next(self._counter), name, time.strftime('%Y-%m-%d %H:%M:%S'), text.getvalue())
+        with self._lock:
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    # Profiles of the slowest calls, the slowest first
+    def report(self):
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+        return ''.join(f'=== {name}: {elapsed * 1000:.1f} ms at {when}\n{stats}\n'
+                       for elapsed, _, name, when, stats in slowest)
@@ -0,0 +1,109 @@
+import os
+import selectors
+import time
+
+import numpy as np
+
+from .frame_decoder import FrameDecoder
+
+# Seconds between two reads of sources without a file descriptor (replay, synthetic)
+POLL_INTERVAL = 0.05
+
+
+# One sensor package: its data source, frame decoder, sample buffer and flight log (if recorded)
+class Device:
+    def __init__(self, device_id, source, samples, decoder=None, record_path=None):
+        self.device_id = device_id
+        self.source = source
+        self.samples = samples
+        self.decoder = decoder or FrameDecoder()
+        self.record_path = record_path
+
+
+# Split 'ID=SPEC' into device ID and source spec, devices without ID are numbered
+def parse_device_spec(text, number):
+    device_id, separator, spec = text.partition('=')
+    if not separator or ':' in device_id:
+        return f'device{number}', text
+    return device_id, spec
+
+
+# Flight log of a device, the first device writes to 'record_path' itself and the others
+# to 'flight_log_<device ID>.bin' next to it
+def device_record_path(record_path, device_id, number):
+    if number == 0:
+        return record_path
+    root, ext = os.path.splitext(record_path)
+    return f'{root}_{device_id}{ext}'
+
+
+# Read all devices from one thread, yields (device, frames) for every decoded batch.
+#
+# Sources with a file descriptor (serial ports, sockets) are waited for with a selector
+# and only read when they have data. The others, and sockets while they reconnect, are
+# read without blocking every POLL_INTERVAL seconds. The sources must have been opened
+# with timeout=0.
+def poll_devices(devices):
+    selector = selectors.DefaultSelector()
+    registered = {}
+
+    # Follow the file descriptor of a device's source: registered while it has one,
+    # unregistered while it has none (a closed socket)
+    def register(device):
+        fileno = getattr(device.source, 'fileno', lambda: None)()
+        if device in registered and registered[device] == fileno:
+            return
+        if registered.get(device) is not None:
+            selector.unregister(registered[device])
+        if fileno is not None:
+            selector.register(fileno, selectors.EVENT_READ, device)
+        registered[device] = fileno
+
+    for device in devices:
+        register(device)
+
+    while True:
+        polled = [device for device in devices if registered[device] is None]
+        if selector.get_map():
+            ready = [key.data for key, _ in selector.select(POLL_INTERVAL if polled else None)]
+        else:
+            time.sleep(POLL_INTERVAL)
+            ready = []
+        for device in ready + polled:
+            frames = device.decoder.feed(device.source.read())
+            register(device)
+            if frames:
+                yield device, frames
+
+
+# Resample one column of several sample buffers onto a common time grid.
+#
+# The grid runs from 'min_time' to 'max_time' (epoch ms) in steps of 'step' seconds. Each
+# device is linearly interpolated onto it; grid points before a device's first or after
+# its last sample, or inside gaps longer than 'max_gap' seconds, are NaN.
+# Returns the grid (epoch ms) and a dict of the resampled values by device ID.
+def align_devices(buffers, column, min_time, max_time, step, max_gap=10):
+    margin = max_gap * 1000
+    grid = np.arange(min_time, max_time + 1, max(int(step), 1) * 1000, dtype=np.int64)
+
+    aligned = {}
+    for device_id, samples in buffers.items():
+        with samples.lock:
+            first, last = samples.time_range(min_time - margin, max_time + margin)
+            data = samples.view(first, last)
+            times = data['time'].copy()
+            values = data[column].astype(np.float64)
+        if not len(times):
+            aligned[device_id] = np.full(len(grid), np.nan)
+            continue
+
+        resampled = np.interp(grid, times, values, left=np.nan, right=np.nan)
+        # Distance of every grid point to the samples around it
+        after = np.clip(np.searchsorted(times, grid, 'left'), 0, len(times) - 1)
+        before = np.clip(after - 1, 0, len(times) - 1)
+        gap = np.maximum(times[after] - times[before], 0)
+        # Grid points on a sample keep its value, also right after a gap
+        gap[times[after] == grid] = 0
+        resampled[gap > margin] = np.nan
+        aligned[device_id] = resampled
+    return grid, aligned
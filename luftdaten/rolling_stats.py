@@ -0,0 +1,117 @@
+import itertools
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+# Statistics versions, unique across the process
+_versions = itertools.count(1)
+
+
+# Mean, minimum, maximum and standard deviation of the values of the last 'seconds' seconds.
+#
+# 'add' and the properties are amortized O(1): values leave the window in the order they
+# entered it, the sums are kept running and the minimum and maximum are the heads of two
+# monotonic deques (a value is dropped from them as soon as a newer one is smaller or
+# larger, it can never become the extreme again). The sums are taken relative to the
+# first value to keep the variance from cancelling out.
+class RollingWindow:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._length = seconds * 1000
+        self._values = deque()
+        self._minima = deque()
+        self._maxima = deque()
+        self._added = 0
+        self._offset = None
+        self._sum = 0.0
+        self._sum_squares = 0.0
+
+    def __len__(self):
+        return len(self._values)
+
+    # Add the value 'x' measured at 't' (epoch milliseconds) and drop the values older than the window
+    def add(self, t, x):
+        if math.isnan(x):
+            return
+        if self._offset is None:
+            self._offset = x
+        # Entries are (number of the value, t, x), the number tells equal values apart
+        entry = (self._added, t, x)
+        self._added += 1
+        self._values.append(entry)
+        self._sum += x - self._offset
+        self._sum_squares += (x - self._offset) ** 2
+        while self._minima and self._minima[-1][2] >= x:
+            self._minima.pop()
+        self._minima.append(entry)
+        while self._maxima and self._maxima[-1][2] <= x:
+            self._maxima.pop()
+        self._maxima.append(entry)
+
+        # Timestamps running backwards (GPS glitches) only keep values a little longer
+        while self._values[0][1] <= t - self._length:
+            old = self._values.popleft()
+            self._sum -= old[2] - self._offset
+            self._sum_squares -= (old[2] - self._offset) ** 2
+            if self._minima[0][0] == old[0]:
+                self._minima.popleft()
+            if self._maxima[0][0] == old[0]:
+                self._maxima.popleft()
+
+    @property
+    def mean(self):
+        return self._offset + self._sum / len(self) if self._values else math.nan
+
+    @property
+    def min(self):
+        return self._minima[0][2] if self._minima else math.nan
+
+    @property
+    def max(self):
+        return self._maxima[0][2] if self._maxima else math.nan
+
+    @property
+    def std(self):
+        if len(self) < 2:
+            return math.nan
+        n = len(self)
+        variance = (self._sum_squares - self._sum ** 2 / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+# Rolling statistics of several buffer columns over several time windows, updated by the
+# reader thread with every decoded batch.
+#
+# 'windows' maps a label (e.g. '1 h') to the window length in seconds. 'version' changes
+# with every update, like SampleBuffer.version, so rendered values can be cached.
+class RollingStats:
+    def __init__(self, columns, windows):
+        self.columns = columns
+        self.windows = windows
+        self.version = next(_versions)
+        self.lock = threading.Lock()
+        self._windows = {(column, label): RollingWindow(seconds)
+                         for column in columns for label, seconds in windows.items()}
+
+    # Add samples: a mapping of column arrays (see sample_buffer.frame_columns, or flight log
+    # records) and their timestamps (epoch ms)
+    def update(self, columns, times):
+        if not len(times):
+            return
+        times = np.asarray(times, dtype=np.int64).tolist()
+        with self.lock:
+            for column in self.columns:
+                windows = [self._windows[column, label] for label in self.windows]
+                for t, x in zip(times, np.asarray(columns[column], dtype=np.float64).tolist()):
+                    for window in windows:
+                        window.add(t, x)
+            self.version = next(_versions)
+
+    # Current statistics, {(column, window label): {'mean', 'min', 'max', 'std', 'count'}}
+    def values(self):
+        with self.lock:
+            return {key: {'mean': window.mean, 'min': window.min, 'max': window.max, 'std': window.std,
+                          'count': len(window)}
+                    for key, window in self._windows.items()}
@@ -0,0 +1,132 @@
+import itertools
+import threading
+
+import numpy as np
+
+# Rollup versions, unique across the process
+_versions = itertools.count(1)
+
+
+# Fixed-size ring of time buckets of 'seconds' seconds, with the number of samples and the
+# min, mean and max of every column per bucket.
+#
+# Buckets are addressed like samples in SampleBuffer: 'total' is the number of buckets
+# ever started, the last one is still open and grows until a sample of a later bucket
+# arrives. Empty buckets (gaps in the data) are not stored.
+class RollupTier:
+    def __init__(self, seconds, capacity, columns):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.columns = columns
+        self.total = 0
+        self._length = seconds * 1000
+        self._start = np.zeros(capacity, dtype=np.int64)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._min = {column: np.zeros(capacity) for column in columns}
+        self._sum = {column: np.zeros(capacity) for column in columns}
+        self._max = {column: np.zeros(capacity) for column in columns}
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    # Start of the last closed bucket (epoch ms), None if there is none
+    @property
+    def newest(self):
+        return int(self._start[(self.total - 2) % self.capacity]) if len(self) > 1 else None
+
+    # Add samples: sorted timestamps (epoch ms) and a dict of the column values
+    def update(self, times, columns):
+        bucket_ids = times // self._length
+        # First sample of every bucket in the batch
+        starts = np.flatnonzero(np.diff(bucket_ids, prepend=bucket_ids[0] - 1))
+        counts = np.diff(np.append(starts, len(times)))
+        mins = {column: np.minimum.reduceat(values, starts) for column, values in columns.items()}
+        sums = {column: np.add.reduceat(values, starts) for column, values in columns.items()}
+        maxs = {column: np.maximum.reduceat(values, starts) for column, values in columns.items()}
+        bucket_starts = bucket_ids[starts] * self._length
+
+        # Samples of the open bucket are merged into it
+        if self.total and bucket_starts[0] == self._start[(self.total - 1) % self.capacity]:
+            slot = (self.total - 1) % self.capacity
+            self._count[slot] += counts[0]
+            for column in self.columns:
+                self._min[column][slot] = min(self._min[column][slot], mins[column][0])
+                self._sum[column][slot] += sums[column][0]
+                self._max[column][slot] = max(self._max[column][slot], maxs[column][0])
+            bucket_starts, counts = bucket_starts[1:], counts[1:]
+            mins, sums, maxs = ({column: values[1:] for column, values in stat.items()}
+                                for stat in (mins, sums, maxs))
+
+        # Buckets that don't fit only advance 'total'
+        new = len(bucket_starts)
+        keep = slice(max(new - self.capacity, 0), new)
+        slots = (self.total + np.arange(new)[keep]) % self.capacity
+        self._start[slots] = bucket_starts[keep]
+        self._count[slots] = counts[keep]
+        for column in self.columns:
+            self._min[column][slots] = mins[column][keep]
+            self._sum[column][slots] = sums[column][keep]
+            self._max[column][slots] = maxs[column][keep]
+        self.total += new
+
+    # Copy of the closed buckets starting at min_time or later (epoch ms): 'time' (bucket
+    # start), 'count' and '<column>_min', '<column>_mean', '<column>_max' for every column
+    def window(self, min_time=None):
+        first = self.total - len(self)
+        slots = (first + np.arange(max(len(self) - 1, 0))) % self.capacity
+        if min_time is not None:
+            slots = slots[np.searchsorted(self._start[slots], min_time - self._length + 1):]
+        data = {'time': self._start[slots], 'count': self._count[slots]}
+        for column in self.columns:
+            data[column + '_min'] = self._min[column][slots]
+            data[column + '_mean'] = self._sum[column][slots] / data['count']
+            data[column + '_max'] = self._max[column][slots]
+        return data
+
+
+# Rollup tiers of increasing bucket size, updated with every decoded batch, so a time window
+# of hours can be drawn from a few hundred buckets instead of every sample.
+#
+# 'tiers' maps the bucket size in seconds to the number of buckets kept. 'version' changes
+# with every update like SampleBuffer.version.
+class RollupPyramid:
+    def __init__(self, columns, tiers):
+        self.columns = columns
+        self.tiers = {seconds: RollupTier(seconds, capacity, columns) for seconds, capacity in sorted(tiers.items())}
+        self.version = next(_versions)
+        self.lock = threading.Lock()
+
+    # Add samples: a mapping of column arrays (see sample_buffer.frame_columns, or flight log
+    # records) and their sorted timestamps (epoch ms)
+    def update(self, columns, times):
+        if not len(times):
+            return
+        times = np.asarray(times, dtype=np.int64)
+        columns = {column: np.asarray(columns[column], dtype=np.float64) for column in self.columns}
+        with self.lock:
+            for tier in self.tiers.values():
+                tier.update(times, columns)
+            self.version = next(_versions)
+
+    # Bucket size of the coarsest tier with at least 'min_points' buckets in a window of
+    # 'seconds' seconds, the finest tier if none has that many
+    def select(self, seconds, min_points):
+        for tier_seconds in sorted(self.tiers, reverse=True):
+            if seconds / tier_seconds >= min_points:
+                return tier_seconds
+        return min(self.tiers)
+
+
+# Merge neighbouring buckets of a tier window until at most 'max_points' are left
+def merge_buckets(data, columns, max_points):
+    factor = -(-len(data['time']) // max_points)
+    if factor <= 1:
+        return data
+    starts = np.arange(0, len(data['time']), factor)
+    counts = np.add.reduceat(data['count'], starts)
+    merged = {'time': data['time'][starts], 'count': counts}
+    for column in columns:
+        merged[column + '_min'] = np.minimum.reduceat(data[column + '_min'], starts)
+        merged[column + '_mean'] = np.add.reduceat(data[column + '_mean'] * data['count'], starts) / counts
+        merged[column + '_max'] = np.maximum.reduceat(data[column + '_max'], starts)
+    return merged
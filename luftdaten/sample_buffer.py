@@ -0,0 +1,110 @@
+import itertools
+import threading
+
+import numpy as np
+
+from .frame_decoder import field_codes, field_names
+from .timestamps import TimeFilter
+
+# Column type for each struct format character
+_column_types = {'f': np.float32, 'd': np.float64, 'H': np.int64, 'B': np.int64}
+
+# One (name, dtype) pair per struct field, in packing order
+column_types = [(name, _column_types[code]) for name, code in zip(field_names, field_codes)]
+
+# Data versions, unique across all buffers of the process
+_versions = itertools.count(1)
+
+
+# Columns of decoded frames (tuples in struct field order), one array per field like the buffer columns
+def frame_columns(frames):
+    return {name: np.array(values, dtype=dtype) for (name, dtype), values in zip(column_types, zip(*frames))}
+
+
+# Fixed-size, preallocated columnar ring buffer for decoded frames.
+#
+# Every struct field gets its own numpy column, plus a 'time' column holding the GPS
+# timestamp of the frame in epoch milliseconds (see timestamps.py). Each column is allocated twice as long as the capacity and
+# every sample is written to both halves, so the latest 'capacity' samples are always
+# one contiguous slice and can be handed out as views without copying.
+#
+# Samples are addressed by their global index (0 for the first frame ever appended),
+# 'total' is the index the next frame will get. 'version' changes with every append, so
+# it can be used to key caches of anything rendered from the buffer.
+#
+# The time column never runs backwards, so it can be binary searched: GPS clock glitches,
+# timestamps running backwards or jumping far ahead, are repaired by a TimeFilter and
+# counted in 'time_glitches'. Equal timestamps are fine.
+#
+# The writer and all readers share 'lock'. Views returned by 'view' are only
+# consistent while the lock is held; 'snapshot' takes the lock itself and copies.
+class SampleBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        self.version = next(_versions)
+        self.time_glitches = 0
+        self.lock = threading.Lock()
+        self._columns = {name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in column_types}
+        self._columns['time'] = np.zeros(2 * capacity, dtype=np.int64)
+        self._time_filter = TimeFilter()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    # Global index of the oldest sample still held
+    @property
+    def first(self):
+        return self.total - len(self)
+
+    # Append decoded frames (tuples in struct field order) with their timestamps (epoch ms),
+    # returns the timestamps as stored
+    def extend(self, frames, times):
+        times = np.asarray(times, dtype=np.int64)
+        if not frames:
+            return times
+        values = list(zip(*frames[-self.capacity:]))
+        with self.lock:
+            glitches = self._time_filter.glitches
+            monotonic = self._time_filter.apply(times)
+            self.time_glitches += self._time_filter.glitches - glitches
+            # Frames that don't fit into the buffer only advance the global index
+            times = monotonic[-self.capacity:]
+            skipped = len(monotonic) - len(times)
+            slots = (self.total + skipped + np.arange(len(times))) % self.capacity
+            for (name, _), column in zip(column_types, values):
+                self._columns[name][slots] = column
+                self._columns[name][slots + self.capacity] = column
+            self._columns['time'][slots] = times
+            self._columns['time'][slots + self.capacity] = times
+            self.total += len(monotonic)
+            self.version = next(_versions)
+        return monotonic
+
+    # Append frames loaded from a flight log on startup, with their repaired timestamps
+    # (epoch ms). The source starts a new session after them, its first timestamp may be
+    # any time later (see TimeFilter.resume)
+    def load(self, frames, times):
+        times = self.extend(frames, times)
+        self._time_filter.resume()
+        return times
+
+    # Zero-copy views of the samples with global indices [start, stop), clamped to what is held
+    def view(self, start=None, stop=None):
+        first = self.first
+        start = first if start is None else min(max(start, first), self.total)
+        stop = self.total if stop is None else min(max(stop, start), self.total)
+        offset = start % self.capacity
+        return {name: column[offset:offset + stop - start] for name, column in self._columns.items()}
+
+    # Global index range [start, stop) of the samples with min_time <= time <= max_time (epoch ms)
+    def time_range(self, min_time=None, max_time=None):
+        times = self.view()['time']
+        start = 0 if min_time is None else int(np.searchsorted(times, min_time, 'left'))
+        stop = len(times) if max_time is None else int(np.searchsorted(times, max_time, 'right'))
+        return self.first + start, self.first + stop
+
+    # Consistent copy of the samples with global indices [start, stop)
+    def snapshot(self, start=None, stop=None):
+        with self.lock:
+            return {name: column.copy() for name, column in self.view(start, stop).items()}
@@ -0,0 +1,170 @@
+import json
+import os
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from .sample_buffer import SampleBuffer, column_types, _versions
+from .timestamps import TimeFilter
+
+# Header at the start of every ring. 'seq' is odd while the writer changes the ring; the
+# decoder and source counters of the ingestion process are published for /metrics
+header_dtype = np.dtype([('seq', '<i8'), ('capacity', '<i8'), ('total', '<i8'), ('version', '<i8'),
+                         ('time_glitches', '<i8'), ('frames', '<i8'), ('resyncs', '<i8'), ('bad_frames', '<i8'),
+                         ('backlog', '<i8')])
+
+# Size of the segment listing the devices of an ingestion process (JSON)
+DIRECTORY_SIZE = 64 * 1024
+
+# Seconds attaching waits for the ingestion process to create the rings
+ATTACH_TIMEOUT = 30
+
+
+def _open_memory(name, size=0):
+    if size:
+        try:
+            return shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by an ingestion process that was killed
+            shared_memory.SharedMemory(name).unlink()
+            return shared_memory.SharedMemory(name, create=True, size=size)
+    memory = shared_memory.SharedMemory(name)
+    # Before Python 3.13 the resource tracker would remove the segment when a reader exits.
+    # It only tracks POSIX shared memory, Windows removes a segment with its last handle
+    if os.name == 'posix' and sys.version_info < (3, 13):
+        resource_tracker.unregister(memory._name, 'shared_memory')
+    return memory
+
+
+# Property reading and writing one field of the segment header
+def _header_field(name):
+    return property(lambda self: int(self._header[name]),
+                    lambda self, value: self._header.__setitem__(name, value))
+
+
+def _wait_for_memory(name, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return _open_memory(name)
+        except FileNotFoundError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+# SampleBuffer in a multiprocessing.shared_memory segment, written by one ingestion process
+# and read by any number of dashboard processes.
+#
+# The columns have the mirrored layout of SampleBuffer, the counters live in the segment
+# header. Readers attach read-only and never block the writer: 'extend' makes the sequence
+# counter odd while it writes and even again afterwards, 'snapshot' copies and retries
+# until the counter was the same even number before and after the copy (a seqlock).
+# 'lock' is only a lock of the own process, views taken under it may see the oldest samples
+# being overwritten; everything rendered from the ring goes through 'snapshot'.
+class SharedRing(SampleBuffer):
+    def __init__(self, memory, writable):
+        self._memory = memory
+        self._header = np.ndarray((), dtype=header_dtype, buffer=memory.buf)
+        self._header.flags.writeable = writable
+        self.capacity = int(self._header['capacity'])
+        self.lock = threading.Lock()
+        self.status = RingStatus(self._header)
+        # Only used by the writing process
+        self._time_filter = TimeFilter()
+
+        offset = header_dtype.itemsize
+        self._columns = {}
+        for name, dtype in column_types + [('time', np.int64)]:
+            column = np.ndarray(2 * self.capacity, dtype=dtype, buffer=memory.buf, offset=offset)
+            column.flags.writeable = writable
+            self._columns[name] = column
+            offset += column.nbytes
+
+    @staticmethod
+    def size(capacity):
+        return header_dtype.itemsize + 2 * capacity * sum(np.dtype(dtype).itemsize
+                                                          for _, dtype in column_types + [('time', np.int64)])
+
+    # New ring in the segment 'name', for the ingestion process
+    @classmethod
+    def create(cls, name, capacity):
+        memory = _open_memory(name, cls.size(capacity))
+        header = np.ndarray((), dtype=header_dtype, buffer=memory.buf)
+        header['capacity'] = capacity
+        header['version'] = next(_versions)
+        return cls(memory, writable=True)
+
+    # Read-only view of the ring 'name', waiting up to 'timeout' seconds for it to appear
+    @classmethod
+    def attach(cls, name, timeout=ATTACH_TIMEOUT):
+        return cls(_wait_for_memory(name, timeout), writable=False)
+
+    def close(self, unlink=False):
+        self._header = self._columns = self.status = None
+        self._memory.close()
+        if unlink:
+            self._memory.unlink()
+
+    total = _header_field('total')
+    version = _header_field('version')
+    time_glitches = _header_field('time_glitches')
+
+    def extend(self, frames, times):
+        self._header['seq'] += 1
+        try:
+            return super().extend(frames, times)
+        finally:
+            self._header['seq'] += 1
+
+    def snapshot(self, start=None, stop=None):
+        while True:
+            seq = int(self._header['seq'])
+            if seq % 2 == 0:
+                data = super().snapshot(start, stop)
+                if int(self._header['seq']) == seq:
+                    return data
+            time.sleep(0.0005)
+
+
+# Decoder and source counters of a ring's device, with the attributes of FrameDecoder and
+# the data sources that /metrics reads
+class RingStatus:
+    def __init__(self, header):
+        self._header = header
+
+    frames = _header_field('frames')
+    resyncs = _header_field('resyncs')
+    bad_frames = _header_field('bad_frames')
+    backlog = _header_field('backlog')
+
+    # Copy the counters of the ingestion process' decoder and source
+    def publish(self, decoder, source):
+        self.frames = decoder.frames
+        self.resyncs = decoder.resyncs
+        self.bad_frames = decoder.bad_frames
+        self.backlog = source.backlog
+
+
+# Name of the ring of a device
+def ring_name(name, device_id):
+    return f'{name}_{device_id}'
+
+
+# Segment 'name' listing the devices of an ingestion process: [{'id', 'record_path'}, ...]
+def create_directory(name, devices):
+    memory = _open_memory(name, DIRECTORY_SIZE)
+    text = json.dumps(devices).encode()
+    memory.buf[:len(text)] = text
+    return memory
+
+
+def read_directory(name, timeout=ATTACH_TIMEOUT):
+    memory = _wait_for_memory(name, timeout)
+    try:
+        return json.loads(bytes(memory.buf).rstrip(b'\0'))
+    finally:
+        memory.close()
@@ -0,0 +1,99 @@
+import numpy as np
+
+from .flight_recorder import record_times
+from .frame_decoder import field_names
+
+# Positions of the GPS date and time fields (the 'H5B' part of the struct) in a decoded frame
+_time_fields = ('year', 'month', 'day', 'hour', 'minute', 'second')
+_time_positions = slice(field_names.index('year'), field_names.index('second') + 1)
+
+
+# Sample timestamps are int64 milliseconds since the epoch (GPS time, UTC), computed
+# column-wise straight from the date and time fields and only turned into something
+# Plotly can show once per rendered slice.
+
+# Largest plausible step between the timestamps of consecutive frames of a device (ms). A
+# frame further ahead is a GPS glitch, unless the frame after it confirms the jump
+MAX_TIME_STEP = 10 * 60 * 1000
+
+
+# Repairs the GPS timestamps of one device's frames, so they never run backwards and one
+# glitch doesn't drag the later frames along:
+# - a timestamp before the last good one is raised to it
+# - a timestamp more than 'max_step' after the last good one is replaced by it. If the
+#   next frame is within 'max_step' of the jumped time, the jump was real (the sensor was
+#   switched off for a while) and the timestamps are taken from that frame on
+# 'glitches' counts the replaced timestamps. After 'resume' the next timestamp may be any
+# time after the last one.
+class TimeFilter:
+    def __init__(self, max_step=MAX_TIME_STEP):
+        self.max_step = max_step
+        self.glitches = 0
+        self._last = None
+        self._jump = None
+        self._resumed = False
+
+    # Continue after the timestamps applied so far, or after 'last' (epoch ms) if given,
+    # when the source starts a new session: a restart after the end of the flight log was
+    # loaded. The sensor may have been off in between, so a forward jump is no glitch
+    def resume(self, last=None):
+        if last is not None:
+            self._last = int(last)
+        self._jump = None
+        self._resumed = True
+
+    # Repaired copy of a batch of timestamps (epoch ms)
+    def apply(self, times):
+        times = np.asarray(times, dtype=np.int64)
+        if not len(times):
+            return times
+        if self._resumed:
+            self._resumed = False
+            if self._last is not None and times[0] > self._last:
+                self._last = int(times[0])
+        # Nearly every batch is fine as it is
+        steps = np.diff(times, prepend=times[0] if self._last is None else self._last)
+        if self._jump is None and ((steps >= 0) & (steps <= self.max_step)).all():
+            self._last = int(times[-1])
+            return times
+
+        repaired = times.copy()
+        last, jump = self._last, self._jump
+        for position, t in enumerate(times.tolist()):
+            if last is None or last <= t <= last + self.max_step or \
+                    (jump is not None and jump <= t <= jump + self.max_step):
+                last, jump = t, None
+                continue
+            if t > last:
+                jump = t
+            repaired[position] = last
+            self.glitches += 1
+        self._last, self._jump = last, jump
+        return repaired
+
+
+# Timestamps of decoded frames (tuples in struct field order)
+def frame_times(frames):
+    fields = np.array([frame[_time_positions] for frame in frames], dtype=np.int64).reshape(-1, 6)
+    return record_times(dict(zip(_time_fields, fields.T))).astype('datetime64[ms]').astype(np.int64)
+
+
+# Timestamps of flight log records
+def record_times_ms(records):
+    return record_times(records).astype('datetime64[ms]').astype(np.int64)
+
+
+# Timestamps as datetime64 values, which Plotly serializes as dates. GPS times are whole
+# seconds, those are sent without the (always zero) milliseconds
+def plotly_times(times):
+    times = np.asarray(times, dtype=np.int64)
+    if (times % 1000).any():
+        return times.astype('datetime64[ms]')
+    return (times // 1000).astype('datetime64[s]')
+
+
+# Convert a datetime, datetime64 or epoch milliseconds to epoch milliseconds
+def to_epoch_ms(t):
+    if isinstance(t, (int, np.integer)):
+        return int(t)
+    return int(np.datetime64(t, 'ms').astype(np.int64))
@@ -0,0 +1,22 @@
+import base64
+
+import numpy as np
+
+# Array types Plotly.js decodes from typed array specs
+PLOTLY_DTYPES = ('i1', 'u1', 'i2', 'u2', 'i4', 'u4', 'f4', 'f8')
+
+
+# Plotly.js typed array spec of 'values' ({'dtype', 'bdata'}, Plotly.js >= 2.28): the raw
+# little endian bytes, base64 encoded, instead of a JSON list of numbers. Encoding takes
+# one copy instead of a Python float per value and the browser doesn't parse numbers
+def typed_array(values, dtype):
+    if dtype not in PLOTLY_DTYPES:
+        raise ValueError(f'Plotly.js has no typed arrays of {dtype!r}')
+    values = np.ascontiguousarray(values, dtype='<' + dtype)
+    return {'dtype': dtype, 'bdata': base64.b64encode(values).decode('ascii')}
+
+
+# Typed array of timestamps (epoch ms) for a date axis, which takes numbers as epoch ms.
+# Float64, Plotly.js has no 64 bit integer arrays
+def time_array(times):
+    return typed_array(times, 'f8')
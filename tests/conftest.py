@@ -0,0 +1,23 @@
+import pytest
+
+from luftdaten.data_sources import synthetic_values
+from luftdaten.timestamps import frame_times
+
+
+# Synthetic frames [first, first + n) at 1 frame/s and their timestamps (epoch ms)
+@pytest.fixture
+def make_frames():
+    def make(n, first=0):
+        frames = [synthetic_values(i) for i in range(first, first + n)]
+        return frames, frame_times(frames)
+    return make
+
+
+# Synthetic frames whose pm1 is their number, so copied samples can be checked against
+# their timestamps
+@pytest.fixture
+def numbered_frames(make_frames):
+    def make(n, first=0):
+        frames, times = make_frames(n, first)
+        return [(float(first + k),) + frame[1:] for k, frame in enumerate(frames)], times
+    return make
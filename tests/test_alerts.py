@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from luftdaten.alerts import AlertEngine, RateRule, StuckRule, ThresholdRule, ZScoreRule
+from luftdaten.data_sources import synthetic_values
+from luftdaten.sample_buffer import frame_columns
+from luftdaten.timestamps import frame_times
+
+
+# One rule of every kind, with limits the synthetic frames cross now and then
+def make_rules():
+    return [ThresholdRule('pm25 hoch', 'pm25', on=15, off=13),
+            RateRule('pm10 Sprung', 'pm10', limit=8, seconds=10),
+            ZScoreRule('pm1 Spitze', 'pm1', threshold=2, samples=60, min_samples=10),
+            StuckRule('xtra steht', 'xtra', seconds=30)]
+
+
+@pytest.fixture(scope='module')
+def stream():
+    frames = [synthetic_values(i) for i in range(2000)]
+    columns = frame_columns(frames)
+    # A missing value and a spike for the rules to handle
+    columns['pm1'][500] = np.nan
+    columns['pm1'][900] = 100
+    return columns, frame_times(frames)
+
+
+def run(columns, times, batch_size):
+    engine = AlertEngine(make_rules(), capacity=1000)
+    for start in range(0, len(times), batch_size):
+        engine.update({name: values[start:start + batch_size] for name, values in columns.items()},
+                      times[start:start + batch_size], start)
+    return engine
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 64, 999])
+def test_batching_gives_the_same_events(stream, batch_size):
+    columns, times = stream
+    expected = run(columns, times, len(times))
+    engine = run(columns, times, batch_size)
+
+    assert {event['rule'] for event in expected.events()} == {rule.name for rule in make_rules()}
+    assert engine.events() == expected.events()
+    assert engine.active() == expected.active()
+    assert engine.counts() == expected.counts()
+    assert engine.version == expected.version
+
+
+def test_version_is_the_index_after_the_newest_event(stream):
+    columns, times = stream
+    engine = run(columns, times, 100)
+
+    assert engine.version == engine.events()[-1]['index'] + 1
+    assert AlertEngine(make_rules()).version == 0
+
+
+def test_threshold_has_hysteresis():
+    rule = ThresholdRule('t', 'pm25', on=10, off=5)
+    values = np.array([4, 11, 8, 6, 5, 8, 10, 9])
+
+    assert rule.condition(np.arange(8), values).tolist() == [False, True, True, True, False, False, True, True]
+
+
+def test_stuck_rule_needs_the_whole_duration():
+    rule = StuckRule('s', 'pm25', seconds=3)
+    times = 1000 * np.arange(8, dtype=np.int64)
+    values = np.array([1.0, 2, 2, 2, 2, 2, np.nan, 3])
+
+    assert rule.condition(times, values).tolist() == [False, False, False, False, True, True, False, False]
+
+
+def test_log_keeps_the_newest_events_and_counts_all(stream):
+    columns, times = stream
+    engine = AlertEngine(make_rules(), capacity=5)
+    engine.update(columns, times, 0)
+    events = run(columns, times, len(times)).events()
+
+    assert engine.events() == events[-5:]
+    assert sum(engine.counts().values()) == sum(event['kind'] == 'begin' for event in events)
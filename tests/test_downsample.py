@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from luftdaten.downsample import lttb, lttb_indices
+
+
+# Largest-Triangle-Three-Buckets written out point by point, as described in Steinarsson's thesis
+def reference_lttb(x, y, n_out):
+    n = len(x)
+    edges = [int(edge) for edge in np.linspace(1, n - 1, n_out - 1)]
+    selected = [0]
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = np.mean(x[hi:edges[i + 2]])
+            next_y = np.mean(y[hi:edges[i + 2]])
+        else:
+            next_x, next_y = x[-1], y[-1]
+        a = selected[-1]
+        areas = [abs((x[a] - next_x) * (y[k] - y[a]) - (x[a] - x[k]) * (next_y - y[a])) for k in range(lo, hi)]
+        selected.append(lo + int(np.argmax(areas)))
+    return selected + [n - 1]
+
+
+@pytest.mark.parametrize('n, n_out', [(10, 3), (100, 7), (1000, 100), (1001, 999)])
+def test_matches_the_reference(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.cumsum(rng.integers(1, 5, n)).astype(np.float64)
+    y = rng.normal(0, 1, n).cumsum()
+
+    indices = lttb_indices(x, y, n_out)
+
+    assert indices.tolist() == reference_lttb(x, y, n_out)
+    assert len(indices) == n_out
+    assert (np.diff(indices) > 0).all()
+
+
+def test_keeps_a_single_peak():
+    x = np.arange(500.0)
+    y = np.zeros(500)
+    y[333] = 50
+
+    assert 333 in lttb_indices(x, y, 20)
+
+
+@pytest.mark.parametrize('n_out', [0, 2, 10, 20])
+def test_short_series_and_tiny_outputs_are_kept_whole(n_out):
+    x = np.arange(10.0)
+
+    assert lttb_indices(x, x, n_out).tolist() == list(range(10))
+
+
+def test_lttb_returns_the_kept_values():
+    x = np.arange(100.0)
+    y = np.sin(x / 10)
+    kept_x, kept_y = lttb(x, y, 10)
+
+    assert np.array_equal(kept_y, y[kept_x.astype(int)])
+    assert (kept_x[0], kept_x[-1]) == (0, 99)
@@ -0,0 +1,125 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+
+from luftdaten import dashboard
+from luftdaten.export import export_columns
+from luftdaten.flight_recorder import FlightRecorder
+from luftdaten.multi_ingest import Device
+from luftdaten.sample_buffer import SampleBuffer
+
+# Frames in the flight log and the buffer. The export chunks are made smaller than that, so
+# every export has several
+N_FRAMES = 250
+
+
+# Device 'logged' with the frames in a flight log and device 'buffered' with the same
+# frames only in its buffer. Returns the timestamps
+@pytest.fixture
+def devices(tmp_path, monkeypatch, make_frames):
+    frames, times = make_frames(N_FRAMES)
+    path = str(tmp_path / 'flight_log.bin')
+    recorder = FlightRecorder(path)
+    recorder.write(frames, times)
+    recorder.close()
+    buffer = SampleBuffer(N_FRAMES)
+    buffer.extend(frames, times)
+
+    monkeypatch.setattr(dashboard, 'devices', {'logged': Device('logged', None, SampleBuffer(1), record_path=path),
+                                               'buffered': Device('buffered', None, buffer)})
+    monkeypatch.setattr('luftdaten.export.CHUNK_ROWS', 64)
+    return times
+
+
+def export(query):
+    with dashboard.app.server.test_client() as client:
+        response = client.get('/export?' + query)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_data()
+
+
+def iso(t):
+    return str(np.datetime64(int(t), 'ms').astype('datetime64[s]'))
+
+
+def read_csv(data):
+    rows = list(csv.reader(io.StringIO(data.decode())))
+    assert tuple(rows[0]) == export_columns
+    return rows[1:]
+
+
+def read_npz(data):
+    archive = np.load(io.BytesIO(data))
+    assert tuple(archive.files) == export_columns
+    return {name: archive[name] for name in archive.files}
+
+
+def read_parquet(data):
+    pq = pytest.importorskip('pyarrow.parquet')
+    table = pq.read_table(io.BytesIO(data))
+    assert tuple(table.column_names) == export_columns
+    columns = {name: table[name].to_numpy() for name in table.column_names}
+    columns['time'] = columns['time'].astype('datetime64[ms]').astype(np.int64)
+    return columns
+
+
+@pytest.mark.parametrize('device', ['logged', 'buffered'])
+def test_csv(devices, device):
+    times = devices
+    rows = read_csv(export(f'format=csv&device={device}&start={iso(times[10])}&end={iso(times[199])}'))
+
+    assert len(rows) == 190
+    assert rows[0][0] == iso(times[10])
+    assert rows[-1][0] == iso(times[199])
+    assert [int(row[export_columns.index('second')]) for row in rows[:3]] == [10, 11, 12]
+
+
+@pytest.mark.parametrize('device', ['logged', 'buffered'])
+def test_npz(devices, device):
+    times = devices
+    columns = read_npz(export(f'format=npz&device={device}&start={iso(times[100])}'))
+
+    assert np.array_equal(columns['time'], times[100:])
+    assert columns['pm1'].dtype == np.float32
+    assert len(columns['lat']) == N_FRAMES - 100
+
+
+@pytest.mark.parametrize('device', ['logged', 'buffered'])
+def test_parquet(devices, device):
+    times = devices
+    columns = read_parquet(export(f'format=parquet&device={device}&end={iso(times[63])}'))
+
+    assert np.array_equal(columns['time'], times[:64])
+    assert len(columns['pm25']) == 64
+
+
+@pytest.mark.parametrize('kind, read', [('csv', read_csv), ('npz', read_npz), ('parquet', read_parquet)])
+def test_flight_log_and_buffer_export_the_same(devices, kind, read):
+    times = devices
+    query = f'format={kind}&start={iso(times[5])}&end={iso(times[230])}'
+    logged, buffered = read(export(query + '&device=logged')), read(export(query + '&device=buffered'))
+
+    if kind == 'csv':
+        assert logged == buffered
+    else:
+        for name in export_columns:
+            assert np.array_equal(logged[name], buffered[name]), name
+
+
+# Bounds between the whole seconds of the timestamps
+def test_bounds_in_milliseconds(devices):
+    times = devices
+    start = str(np.datetime64(int(times[5]) + 500, 'ms'))
+    end = str(np.datetime64(int(times[9]) + 999, 'ms'))
+    for device in ('logged', 'buffered'):
+        columns = read_npz(export(f'format=npz&device={device}&start={start}&end={end}'))
+        assert np.array_equal(columns['time'], times[6:10]), device
+
+
+def test_unknown_format_and_device(devices):
+    with dashboard.app.server.test_client() as client:
+        assert client.get('/export?format=xls').status_code == 400
+        assert client.get('/export?device=other').status_code == 404
+        assert client.get('/export?start=gestern').status_code == 400
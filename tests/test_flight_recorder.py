@@ -0,0 +1,92 @@
+import errno
+import os
+
+import numpy as np
+
+from luftdaten.flight_recorder import FlightRecorder, open_records, read_last_minutes, read_time_range, read_times
+from luftdaten.frame_decoder import field_names
+from luftdaten.timestamps import record_times_ms
+
+
+# Copy of a decoded frame with another GPS year
+def frame_with_year(frame, year):
+    position = field_names.index('year')
+    return frame[:position] + (year,) + frame[position + 1:]
+
+
+def test_records_stay_raw_and_repaired_times_are_written(tmp_path, make_frames):
+    path = str(tmp_path / 'flight_log.bin')
+    frames, times = make_frames(300)
+    repaired = times.copy()
+    repaired[100] = repaired[99]
+    recorder = FlightRecorder(path)
+    assert recorder.write(frames[:150], repaired[:150])
+    assert recorder.write(frames[150:], repaired[150:])
+    recorder.close()
+
+    records = open_records(path)
+    assert len(records) == 300
+    assert np.array_equal(record_times_ms(records), times)
+    assert np.array_equal(read_times(path), repaired)
+    assert np.array_equal(records['pm25'], np.array([frame[1] for frame in frames], dtype=np.float32))
+    records, found = read_time_range(path, np.datetime64(int(times[200]), 'ms'), np.datetime64(int(times[209]), 'ms'))
+    assert np.array_equal(found, times[200:210])
+    assert np.array_equal(record_times_ms(records), times[200:210])
+
+
+# A glitch far ahead stays in the record, the log is searched by the repaired time
+def test_search_uses_the_repaired_times(tmp_path, make_frames):
+    path = str(tmp_path / 'flight_log.bin')
+    frames, times = make_frames(200)
+    frames[130] = frame_with_year(frames[130], 2030)
+    recorder = FlightRecorder(path)
+    recorder.write(frames, times)
+    recorder.close()
+
+    assert open_records(path)['year'][130] == 2030
+    records, found = read_time_range(path, np.datetime64(int(times[120]), 'ms'), np.datetime64(int(times[139]), 'ms'))
+    assert np.array_equal(found, times[120:140])
+    assert read_last_minutes(path, 1)[0]['second'][-1] == frames[-1][field_names.index('second')]
+
+
+# Logs written before the time column get theirs from the GPS times when reopened
+def test_time_column_is_added_to_old_logs(tmp_path, make_frames):
+    path = str(tmp_path / 'flight_log.bin')
+    frames, times = make_frames(100)
+    recorder = FlightRecorder(path)
+    recorder.write(frames[:70], times[:70])
+    recorder.close()
+    os.remove(path + '.time')
+
+    assert np.array_equal(read_times(path), times[:70])
+    recorder = FlightRecorder(path)
+    recorder.write(frames[70:], times[70:])
+    recorder.close()
+    assert os.path.getsize(path + '.time') == 100 * 8
+    assert np.array_equal(read_times(path), times)
+
+
+def test_write_error_stops_the_recorder(tmp_path, make_frames, monkeypatch, caplog):
+    path = str(tmp_path / 'flight_log.bin')
+    frames, times = make_frames(30)
+    recorder = FlightRecorder(path)
+    recorder.write(frames[:10], times[:10])
+    recorder.close()
+
+    def disk_full(*args):
+        raise OSError(errno.ENOSPC, 'No space left on device')
+
+    recorder = FlightRecorder(path)
+    monkeypatch.setattr(recorder, '_write_batches', disk_full)
+    recorder.write(frames[10:20], times[10:20])
+    # The writer thread fails on the first batch, everything after is refused
+    recorder._thread.join(0.2)
+    assert isinstance(recorder.error, OSError)
+    assert not recorder.write(frames[20:], times[20:])
+    recorder.close()
+
+    assert recorder.dropped == 20
+    assert 'flight_log.bin' in caplog.text
+    assert len(open_records(path)) == 10
+    assert len(read_times(path)) == 10
+
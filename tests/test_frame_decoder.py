@@ -0,0 +1,50 @@
+import pytest
+
+from luftdaten.frame_decoder import FRAME_SIZE, FrameDecoder, encode_frame
+
+
+@pytest.fixture
+def frames(make_frames):
+    frames, _ = make_frames(3)
+    # Through the struct once, so float32 fields compare equal with the decoded ones
+    return FrameDecoder().feed(b''.join(encode_frame(frame) for frame in frames))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, FRAME_SIZE - 1, FRAME_SIZE, FRAME_SIZE + 1, 2 * FRAME_SIZE + 3])
+def test_frames_split_across_reads(frames, chunk_size):
+    data = b''.join(encode_frame(frame) for frame in frames)
+    decoder = FrameDecoder()
+    decoded = []
+    for start in range(0, len(data), chunk_size):
+        decoded += decoder.feed(data[start:start + chunk_size])
+
+    assert decoded == frames
+    assert decoder.frames == 3
+    assert decoder.pending == 0
+    assert decoder.resyncs == decoder.bad_frames == 0
+
+
+def test_partial_frame_is_kept_for_the_next_read(frames):
+    data = encode_frame(frames[0]) + encode_frame(frames[1])[:10]
+    decoder = FrameDecoder()
+
+    assert decoder.feed(data) == frames[:1]
+    assert decoder.pending == 10
+    assert decoder.feed(encode_frame(frames[1])[10:]) == frames[1:2]
+    assert decoder.pending == 0
+
+
+def test_garbage_before_a_frame_is_skipped(frames):
+    decoder = FrameDecoder()
+
+    assert decoder.feed(b'\x00garbage' + encode_frame(frames[0])) == frames[:1]
+    assert decoder.resyncs >= 1
+    assert decoder.bad_frames == 0
+
+
+def test_frame_without_end_is_counted_and_skipped(frames):
+    broken = encode_frame(frames[0])[:-1] + b'x'
+    decoder = FrameDecoder()
+
+    assert decoder.feed(broken + encode_frame(frames[1])) == frames[1:2]
+    assert decoder.bad_frames == 1
@@ -0,0 +1,56 @@
+import numpy as np
+
+from luftdaten.geo_grid import GeoGrid, cell_features
+
+
+# Sample columns with positions and one value column
+def columns(lat, lng, pm25):
+    return {'lat': np.array(lat, dtype=np.float64), 'lng': np.array(lng, dtype=np.float64),
+            'pm25': np.array(pm25, dtype=np.float32)}
+
+
+def test_samples_are_aggregated_per_cell():
+    grid = GeoGrid(['pm25'], 0.01)
+    grid.update(columns([48.001, 48.009, 48.011, -0.005], [11.001, 11.002, 11.001, -0.001], [4, 8, 30, 1]), 4)
+
+    cells = {(row, column): (count, means, maxima) for row, column, count, means, maxima in grid.changed()}
+    assert len(grid) == 3
+    assert cells[4800, 1100] == (2, {'pm25': 6}, {'pm25': 8})
+    assert cells[4801, 1100] == (1, {'pm25': 30}, {'pm25': 30})
+    # Floor division, so cells below zero don't fold into the one at zero
+    assert (-1, -1) in cells
+
+
+def test_samples_without_position_or_value_are_left_out():
+    grid = GeoGrid(['pm25'], 0.01)
+    grid.update(columns([0, np.nan, 48.0], [0, 11.0, 11.0], [5, 5, np.nan]), 3)
+
+    assert len(grid) == 0
+    assert grid.version == 0
+
+
+def test_changed_since_a_version():
+    grid = GeoGrid(['pm25'], 0.01)
+    grid.update(columns([48.001, 48.021], [11.001, 11.001], [1, 2]), 2)
+    grid.update(columns([48.011], [11.001], [3]), 3)
+    grid.update(columns([48.001], [11.001], [5]), 4)
+
+    assert [(row, count) for row, _, count, _, _ in grid.changed(2)] == [(4800, 2), (4801, 1)]
+    assert grid.changed(4) == []
+    assert len(grid.changed()) == 3
+    # Batches added out of order never move the version back
+    grid.update(columns([48.031], [11.001], [1]), 1)
+    assert grid.version == 4
+    assert grid.changed(3)[0][0] == 4803
+
+
+def test_cell_features():
+    grid = GeoGrid(['pm25'], 0.5)
+    grid.update(columns([48.2, 48.3], [11.1, 11.4], [10, 20]), 2)
+
+    feature, = cell_features(grid.changed(), 0.5, {'pm25': 'PM2.5'})
+    assert feature['geometry']['coordinates'][0][0] == [11.0, 48.0]
+    assert feature['geometry']['coordinates'][0][2] == [11.5, 48.5]
+    assert feature['properties']['id'] == '96:22'
+    assert (feature['properties']['pm25'], feature['properties']['pm25_max']) == (15, 20)
+    assert feature['properties']['tooltip'] == '2 Messungen<br>PM2.5: Ø 15.0, max. 20.0 µg/m³'
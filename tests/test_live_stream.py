@@ -0,0 +1,79 @@
+import json
+
+import numpy as np
+import pytest
+
+from luftdaten import live_stream
+from luftdaten.live_stream import MAX_PENDING, RESYNC_MESSAGE, Broadcaster, batch_message, stream_columns
+
+
+# Send without waiting for a burst to pile up
+@pytest.fixture(autouse=True)
+def no_send_delay(monkeypatch):
+    monkeypatch.setattr(live_stream, 'MIN_SEND_INTERVAL', 0)
+
+
+def test_messages_piled_up_are_sent_in_one_write():
+    broadcaster = Broadcaster()
+    client = broadcaster.subscribe()
+    body = broadcaster.stream(client, backlog=['first\n\n'])
+
+    assert next(body) == 'first\n\n'
+    broadcaster.publish('a\n\n')
+    broadcaster.publish('b\n\n')
+    assert next(body) == 'a\n\nb\n\n'
+    broadcaster.publish('c\n\n')
+    assert next(body) == 'c\n\n'
+
+
+def test_every_client_gets_every_message():
+    broadcaster = Broadcaster()
+    bodies = [broadcaster.stream(broadcaster.subscribe()) for _ in range(3)]
+    broadcaster.publish('x\n\n')
+
+    assert len(broadcaster) == 3
+    assert [next(body) for body in bodies] == ['x\n\n'] * 3
+
+
+def test_slow_client_gets_one_resync_instead_of_the_backlog():
+    broadcaster = Broadcaster()
+    client = broadcaster.subscribe()
+    body = broadcaster.stream(client)
+    for k in range(MAX_PENDING + 10):
+        broadcaster.publish(f'{k}\n\n')
+
+    assert next(body) == RESYNC_MESSAGE
+    broadcaster.publish('after\n\n')
+    assert next(body) == 'after\n\n'
+
+
+def test_idle_stream_sends_keepalives(monkeypatch):
+    monkeypatch.setattr(live_stream, 'KEEPALIVE_INTERVAL', 0.01)
+    broadcaster = Broadcaster()
+    body = broadcaster.stream(broadcaster.subscribe())
+
+    assert next(body) == ': keepalive\n\n'
+
+
+def test_closed_stream_unsubscribes():
+    broadcaster = Broadcaster()
+    body = broadcaster.stream(broadcaster.subscribe(), backlog=['hello\n\n'])
+    next(body)
+    body.close()
+
+    assert len(broadcaster) == 0
+    # Publishing to nobody is fine
+    broadcaster.publish('x\n\n')
+
+
+def test_batch_message():
+    data = {name: np.arange(2, dtype=np.float32) for name in stream_columns}
+    data['time'] = np.array([1000, 2000], dtype=np.int64)
+    message = batch_message(42, data)
+
+    assert message.startswith('data: ') and message.endswith('\n\n')
+    batch = json.loads(message[len('data: '):])
+    assert batch['start'] == 42
+    assert batch['time'] == [1000, 2000]
+    assert batch['pm25'] == [0.0, 1.0]
+    assert set(batch) == {'start', 'time'} | set(stream_columns)
@@ -0,0 +1,59 @@
+import numpy as np
+
+from luftdaten.map_track import cell_size, decimate, limit_points, track_features
+
+# Zoom level of the tests, its cells are about 0.0003 degrees
+ZOOM = 14
+
+
+# South-west corner of the cell of (lat, lng) at ZOOM, test points are placed relative to it
+def cell_origin(lat, lng):
+    size = cell_size(ZOOM)
+    return np.floor(lat / size) * size, np.floor(lng / size) * size
+
+
+def test_first_point_per_cell_is_kept():
+    size = cell_size(ZOOM)
+    south, west = cell_origin(48, 11)
+    # A parked sensor jittering inside one cell, then a move two cells north and back
+    lat = south + size * np.array([0.1, 0.2, 0.15, 2.1, 2.2, 0.3])
+    lng = west + size * np.array([0.5, 0.6, 0.4, 0.5, 0.5, 0.5])
+
+    assert decimate(lat, lng, ZOOM).tolist() == [True, False, False, True, False, False]
+    # Zoomed in far enough, every point gets its own cell
+    assert decimate(lat, lng, ZOOM + 6).all()
+
+
+def test_negative_coordinates_use_their_own_cells():
+    size = cell_size(ZOOM)
+    lat = np.array([-0.4, 0.4]) * size
+    lng = np.array([-0.4, 0.4]) * size
+
+    assert decimate(lat, lng, ZOOM).tolist() == [True, True]
+
+
+def test_cell_of_the_previous_point_is_skipped():
+    size = cell_size(ZOOM)
+    south, west = cell_origin(48, 11)
+    lat = south + size * np.array([0.5, 1.5])
+    lng = np.full(2, west + size * 0.5)
+
+    assert decimate(lat, lng, ZOOM, prev_lat=south + size * 0.2, prev_lng=lng[0]).tolist() == [False, True]
+    assert decimate(lat[:0], lng[:0], ZOOM, prev_lat=48, prev_lng=11).tolist() == []
+
+
+def test_limit_points_keeps_the_newest():
+    keep = np.array([True, False, True, True, False, True])
+
+    assert limit_points(keep, 2).tolist() == [False, False, False, True, False, True]
+    assert limit_points(keep, 10) is keep
+    assert keep.sum() == 4
+
+
+def test_track_features():
+    data = {'lat': np.array([48.1234567, 48.2]), 'lng': np.array([11.7654321, 11.3]),
+            'pm1': np.array([1.04, 2.0]), 'pm25': np.array([2.26, 3.0]), 'pm10': np.array([3.0, 4.0])}
+
+    feature, = track_features(data, 100, np.array([True, False]))
+    assert feature['geometry']['coordinates'] == [11.765432, 48.123457]
+    assert feature['properties'] == {'i': 100, 'pm1': 1.0, 'pm25': 2.3, 'pm10': 3.0}
@@ -0,0 +1,57 @@
+import pytest
+
+from luftdaten.metrics import Registry, SlowestCalls
+
+
+def test_render_counters_histograms_and_collected_values():
+    registry = Registry()
+    frames = registry.counter('frames_total', 'Frames decoded', 'device')
+    latency = registry.histogram('latency_seconds', 'Callback latency', buckets=(0.1, 1))
+    registry.collected('buffer_fill', 'Samples held', lambda: 7)
+    registry.collected('glitches', 'Time glitches', lambda: {'a': 1, 'b"\\': 2}, 'counter', 'device')
+    frames.inc(3, 'device1')
+    frames.inc(label_value='device1')
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    assert registry.render() == '\n'.join([
+        '# HELP frames_total Frames decoded',
+        '# TYPE frames_total counter',
+        'frames_total{device="device1"} 4',
+        '# HELP latency_seconds Callback latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        'latency_seconds_sum 3.65',
+        'latency_seconds_count 4',
+        '# HELP buffer_fill Samples held',
+        '# TYPE buffer_fill gauge',
+        'buffer_fill 7',
+        '# HELP glitches Time glitches',
+        '# TYPE glitches counter',
+        'glitches{device="a"} 1',
+        'glitches{device="b\\"\\\\"} 2',
+    ]) + '\n'
+
+
+def test_metrics_without_samples_only_have_help_and_type():
+    registry = Registry()
+    registry.counter('requests_total', 'Requests')
+
+    assert registry.render() == '# HELP requests_total Requests\n# TYPE requests_total counter\n'
+
+
+# Calls made to look 'elapsed' seconds long by moving their start back
+def test_slowest_calls_keeps_the_slowest():
+    profiler = SlowestCalls(keep=2)
+    for name, elapsed in (('a', 0.3), ('b', 0.1), ('c', 0.2)):
+        started = profiler.start()
+        if started is None:
+            pytest.skip('another profiler is active')
+        profile, start = started
+        profiler.stop((profile, start - elapsed), name)
+
+    report = profiler.report()
+    assert report.index('=== a:') < report.index('=== c:')
+    assert '=== b:' not in report
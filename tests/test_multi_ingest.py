@@ -0,0 +1,103 @@
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from luftdaten.data_sources import open_source
+from luftdaten.flight_recorder import FlightRecorder
+from luftdaten.frame_decoder import encode_frame
+from luftdaten.multi_ingest import Device, align_devices, device_record_path, parse_device_spec, poll_devices
+from luftdaten.sample_buffer import SampleBuffer
+
+# Seconds a test waits for the frames of all sources
+WAIT = 5
+
+
+# TCP server on localhost sending 'data' to the first client, then keeping the connection open
+@pytest.fixture
+def tcp_server():
+    server = socket.create_server(('127.0.0.1', 0))
+    connections = []
+
+    def serve(data):
+        connection, _ = server.accept()
+        connections.append(connection)
+        connection.sendall(data)
+
+    def start(data):
+        threading.Thread(target=serve, args=(data,), daemon=True).start()
+        return server.getsockname()[1]
+    yield start
+    for connection in connections:
+        connection.close()
+    server.close()
+
+
+# Frames per device ID from 'poll_devices' until every device has 'counts[device ID]' frames
+def collect(devices, counts):
+    received = {device.device_id: 0 for device in devices}
+    deadline = time.monotonic() + WAIT
+    for device, frames in poll_devices(devices):
+        received[device.device_id] += len(frames)
+        if all(received[device_id] >= count for device_id, count in counts.items()):
+            return received
+        assert time.monotonic() < deadline, received
+    return received
+
+
+def test_sources_without_file_descriptor_are_polled():
+    devices = [Device('synthetic', open_source('synthetic:200', timeout=0), SampleBuffer(10))]
+
+    assert collect(devices, {'synthetic': 20})['synthetic'] >= 20
+
+
+def test_synthetic_replay_and_socket_sources_together(tmp_path, make_frames, tcp_server):
+    frames, times = make_frames(50)
+    path = str(tmp_path / 'flight_log.bin')
+    recorder = FlightRecorder(path)
+    recorder.write(frames, times)
+    recorder.close()
+    port = tcp_server(b''.join(encode_frame(frame) for frame in frames[:30]))
+
+    devices = [Device('synthetic', open_source('synthetic:100', timeout=0), SampleBuffer(10)),
+               Device('replay', open_source(f'replay:{path}@max', timeout=0), SampleBuffer(10)),
+               Device('socket', open_source(f'tcp:127.0.0.1:{port}', timeout=0), SampleBuffer(10))]
+
+    received = collect(devices, {'synthetic': 10, 'replay': 50, 'socket': 30})
+    assert received['replay'] == 50
+    assert received['socket'] == 30
+
+
+def test_parse_device_spec_and_record_path():
+    assert parse_device_spec('serial:COM7', 1) == ('device1', 'serial:COM7')
+    assert parse_device_spec('drohne=tcp:host:5000', 2) == ('drohne', 'tcp:host:5000')
+    assert device_record_path('logs/flight_log.bin', 'device1', 0) == 'logs/flight_log.bin'
+    assert device_record_path('logs/flight_log.bin', 'drohne', 1) == 'logs/flight_log_drohne.bin'
+
+
+def test_align_devices_interpolates_and_leaves_gaps(numbered_frames):
+    frames, times = numbered_frames(40)
+    a, b = SampleBuffer(100), SampleBuffer(100)
+    a.extend(frames, times)
+    # Device b starts later, has every other sample and a gap of 6 s between 18 and 24
+    kept = [k for k in range(10, 40, 2) if not 18 < k < 24]
+    b.extend([frames[k] for k in kept], times[kept])
+
+    grid, aligned = align_devices({'a': a, 'b': b}, 'pm1', int(times[0]), int(times[39]), 1, max_gap=5)
+
+    assert np.array_equal(grid, times)
+    assert np.array_equal(aligned['a'], np.arange(40))
+    # NaN before the first sample of b and inside its gap, interpolated everywhere else
+    assert np.isnan(aligned['b'][:10]).all()
+    assert np.isnan(aligned['b'][19:24]).all()
+    assert np.array_equal(aligned['b'][10:19], np.arange(10, 19))
+    assert np.array_equal(aligned['b'][24:39], np.arange(24, 39))
+
+
+def test_align_devices_without_samples():
+    grid, aligned = align_devices({'leer': SampleBuffer(10)}, 'pm1', 0, 4000, 2)
+
+    assert grid.tolist() == [0, 2000, 4000]
+    assert np.isnan(aligned['leer']).all()
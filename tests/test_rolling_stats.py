@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pytest
+
+from luftdaten.rolling_stats import RollingStats, RollingWindow
+
+
+# Statistics of the values in the window after every add, recomputed from scratch. NaN
+# values are skipped, adding them changes nothing
+def brute_force(times, values, seconds):
+    expected = []
+    for k, t in enumerate(times):
+        if math.isnan(values[k]):
+            expected.append(None)
+            continue
+        inside = [x for s, x in zip(times[:k + 1], values[:k + 1]) if s > t - seconds * 1000 and not math.isnan(x)]
+        expected.append((np.mean(inside), min(inside), max(inside), np.std(inside, ddof=1) if len(inside) > 1
+                         else math.nan, len(inside)))
+    return expected
+
+
+@pytest.mark.parametrize('seconds', [1, 5, 60])
+def test_window_matches_brute_force(seconds):
+    rng = np.random.default_rng(seconds)
+    times = np.cumsum(rng.integers(0, 3000, 400)).tolist()
+    # A large offset, so the running sums would cancel out without the shift
+    values = (1e6 + rng.normal(0, 1, 400)).tolist()
+    values[17] = math.nan
+    window = RollingWindow(seconds)
+
+    for t, x, expected in zip(times, values, brute_force(times, values, seconds)):
+        window.add(t, x)
+        if expected is None:
+            continue
+        mean, low, high, std, count = expected
+        assert len(window) == count
+        assert window.mean == pytest.approx(mean, abs=1e-6)
+        assert (window.min, window.max) == (low, high)
+        if count > 1:
+            assert window.std == pytest.approx(std, rel=1e-6)
+
+
+def test_equal_extremes_leave_the_window_one_by_one():
+    window = RollingWindow(3)
+    for t, x in enumerate([5.0, 5.0, 1.0, 1.0, 4.0]):
+        window.add(t * 1000, x)
+
+    assert (window.min, window.max) == (1.0, 4.0)
+    window.add(5000, 2.0)
+    window.add(6000, 3.0)
+    assert (window.min, window.max) == (2.0, 4.0)
+
+
+def test_empty_window_is_nan():
+    window = RollingWindow(10)
+    window.add(0, math.nan)
+
+    assert len(window) == 0
+    assert math.isnan(window.mean) and math.isnan(window.min) and math.isnan(window.std)
+
+
+def test_stats_of_several_columns_and_windows():
+    stats = RollingStats(['pm1', 'pm25'], {'2 s': 2, '1 h': 3600})
+    version = stats.version
+    times = 1000 * np.arange(5, dtype=np.int64)
+    stats.update({'pm1': np.arange(5.0), 'pm25': np.full(5, 7.0)}, times)
+
+    values = stats.values()
+    assert stats.version != version
+    assert values['pm1', '2 s']['count'] == 2 and values['pm1', '2 s']['mean'] == 3.5
+    assert values['pm1', '1 h']['count'] == 5 and values['pm1', '1 h']['min'] == 0
+    assert values['pm25', '1 h']['std'] == 0
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from luftdaten.rollups import RollupPyramid, merge_buckets
+
+# 10 minutes of samples at 1/s, starting on a full hour
+START = 1717200000000
+TIMES = START + 1000 * np.arange(600, dtype=np.int64)
+VALUES = np.arange(600, dtype=np.float64)
+
+
+def test_levels_aggregate_their_buckets():
+    pyramid = RollupPyramid(['pm25'], {10: 100, 60: 100})
+    pyramid.update({'pm25': VALUES}, TIMES)
+
+    for seconds in (10, 60):
+        window = pyramid.tiers[seconds].window()
+        # The last bucket is still open and not in the window
+        buckets = 600 // seconds - 1
+        assert window['time'].tolist() == (START + 1000 * seconds * np.arange(buckets)).tolist()
+        assert window['count'].tolist() == [seconds] * buckets
+        assert window['pm25_min'].tolist() == (seconds * np.arange(buckets)).tolist()
+        assert window['pm25_max'].tolist() == (seconds * np.arange(buckets) + seconds - 1).tolist()
+        assert window['pm25_mean'].tolist() == (seconds * np.arange(buckets) + (seconds - 1) / 2).tolist()
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 60, 599])
+def test_batching_gives_the_same_buckets(batch_size):
+    whole = RollupPyramid(['pm25'], {10: 100, 60: 100})
+    whole.update({'pm25': VALUES}, TIMES)
+    batched = RollupPyramid(['pm25'], {10: 100, 60: 100})
+    for start in range(0, len(TIMES), batch_size):
+        batched.update({'pm25': VALUES[start:start + batch_size]}, TIMES[start:start + batch_size])
+
+    for seconds in (10, 60):
+        expected, window = whole.tiers[seconds].window(), batched.tiers[seconds].window()
+        assert window.keys() == expected.keys()
+        for name in expected:
+            assert np.array_equal(window[name], expected[name]), name
+
+
+def test_full_tier_keeps_the_newest_buckets():
+    pyramid = RollupPyramid(['pm25'], {10: 5})
+    pyramid.update({'pm25': VALUES}, TIMES)
+    tier = pyramid.tiers[10]
+
+    assert tier.total == 60
+    assert len(tier) == 5
+    assert tier.window()['time'].tolist() == (START + 10000 * np.arange(55, 59)).tolist()
+    assert tier.newest == START + 10000 * 58
+
+
+def test_gaps_leave_no_empty_buckets():
+    times = np.concatenate([TIMES[:30], TIMES[300:330]])
+    pyramid = RollupPyramid(['pm25'], {10: 100})
+    pyramid.update({'pm25': np.ones(60)}, times)
+
+    window = pyramid.tiers[10].window()
+    assert window['time'].tolist() == [START, START + 10000, START + 20000, START + 300000, START + 310000]
+
+
+def test_window_from_min_time_includes_the_bucket_containing_it():
+    pyramid = RollupPyramid(['pm25'], {60: 100})
+    pyramid.update({'pm25': VALUES}, TIMES)
+
+    assert pyramid.tiers[60].window(START + 125000)['time'].tolist() == [START + 120000 + 60000 * k
+                                                                          for k in range(7)]
+
+
+def test_select_takes_the_coarsest_level_with_enough_points():
+    pyramid = RollupPyramid(['pm25'], {10: 100, 60: 100, 600: 100})
+
+    assert pyramid.select(24 * 3600, 100) == 600
+    assert pyramid.select(3600, 100) == 10
+    assert pyramid.select(6 * 3600, 300) == 60
+    assert pyramid.select(60, 100) == 10
+
+
+def test_merge_buckets_weights_the_means_by_count():
+    data = {'time': np.array([0, 10, 20, 30]), 'count': np.array([1, 3, 2, 2]),
+            'pm25_min': np.array([1.0, 2.0, 0.0, 5.0]), 'pm25_mean': np.array([1.0, 3.0, 4.0, 6.0]),
+            'pm25_max': np.array([1.0, 4.0, 8.0, 7.0])}
+
+    merged = merge_buckets(data, ['pm25'], 2)
+
+    assert merged['time'].tolist() == [0, 20]
+    assert merged['count'].tolist() == [4, 4]
+    assert merged['pm25_min'].tolist() == [1.0, 0.0]
+    assert merged['pm25_mean'].tolist() == [2.5, 5.0]
+    assert merged['pm25_max'].tolist() == [4.0, 8.0]
+    assert merge_buckets(data, ['pm25'], 4) is data
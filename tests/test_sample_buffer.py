@@ -0,0 +1,92 @@
+import numpy as np
+
+from luftdaten.sample_buffer import SampleBuffer
+
+
+def test_wraparound_keeps_the_newest_samples_contiguous(numbered_frames):
+    buffer = SampleBuffer(5)
+    for first, n in ((0, 3), (3, 4), (7, 2)):
+        buffer.extend(*numbered_frames(n, first))
+
+    assert buffer.total == 9
+    assert len(buffer) == 5
+    assert buffer.first == 4
+    view = buffer.view()
+    assert view['pm1'].tolist() == [4, 5, 6, 7, 8]
+    assert np.diff(view['time']).tolist() == [1000] * 4
+    # Views are slices of the mirrored columns, not copies
+    assert view['pm1'].base is not None
+
+
+def test_view_clamps_to_the_held_samples(numbered_frames):
+    buffer = SampleBuffer(4)
+    buffer.extend(*numbered_frames(10))
+
+    assert buffer.view(0, 7)['pm1'].tolist() == [6]
+    assert buffer.view(8)['pm1'].tolist() == [8, 9]
+    assert buffer.view(12, 20)['pm1'].tolist() == []
+    assert buffer.snapshot(7, 9)['pm1'].tolist() == [7, 8]
+
+
+def test_batch_larger_than_the_capacity_advances_the_index(numbered_frames):
+    buffer = SampleBuffer(4)
+    buffer.extend(*numbered_frames(2))
+    times = buffer.extend(*numbered_frames(10, 2))
+
+    assert len(times) == 10
+    assert buffer.total == 12
+    assert buffer.view()['pm1'].tolist() == [8, 9, 10, 11]
+
+
+def test_time_range_is_inclusive_and_global(numbered_frames):
+    buffer = SampleBuffer(5)
+    frames, times = numbered_frames(8)
+    buffer.extend(frames, times)
+
+    assert buffer.time_range() == (3, 8)
+    assert buffer.time_range(times[4], times[6]) == (4, 7)
+    assert buffer.time_range(times[4] + 1, times[6] - 1) == (5, 6)
+    # Bounds outside the held samples
+    assert buffer.time_range(times[0], times[1]) == (3, 3)
+    assert buffer.time_range(times[7] + 1) == (8, 8)
+    assert buffer.time_range(max_time=times[3]) == (3, 4)
+
+
+def test_time_range_with_equal_timestamps(numbered_frames):
+    buffer = SampleBuffer(6)
+    frames, times = numbered_frames(6)
+    times = times.copy()
+    times[2:5] = times[2]
+    buffer.extend(frames, times)
+
+    assert buffer.time_range(times[2], times[2]) == (2, 5)
+
+
+def test_glitches_keep_the_times_sorted(numbered_frames):
+    buffer = SampleBuffer(10)
+    frames, times = numbered_frames(6)
+    times = times.copy()
+    times[2] -= 60 * 1000
+    times[4] += 24 * 60 * 60 * 1000
+
+    stored = buffer.extend(frames, times)
+
+    assert (np.diff(stored) >= 0).all()
+    assert stored[2] == stored[1]
+    assert stored[4] == stored[3]
+    assert stored[5] == times[5]
+    assert buffer.time_glitches == 2
+
+
+# A new session after the loaded flight log jumps ahead without being taken for a glitch
+def test_forward_jump_after_load_is_kept(numbered_frames):
+    buffer = SampleBuffer(10)
+    buffer.load(*numbered_frames(3))
+    frames, times = numbered_frames(3, 5000)
+
+    assert np.array_equal(buffer.extend(frames[:1], times[:1]), times[:1])
+    assert np.array_equal(buffer.extend(frames[1:], times[1:]), times[1:])
+    assert buffer.time_glitches == 0
+    # Only the first timestamp after the load may jump, and never backwards
+    assert buffer.extend(*numbered_frames(1, 9000))[0] == times[-1]
+    assert buffer.extend(*numbered_frames(1, 0))[0] == times[-1]
@@ -0,0 +1,85 @@
+import itertools
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from luftdaten.shared_ring import SharedRing
+
+_names = itertools.count()
+
+
+# Writer of a new ring and a reader attached to it, like the ingestion and a dashboard process
+@pytest.fixture
+def ring():
+    name = f'luftdaten_test_{os.getpid()}_{next(_names)}'
+    writer = SharedRing.create(name, 8)
+    reader = SharedRing.attach(name, timeout=1)
+    yield writer, reader
+    reader.close()
+    writer.close(unlink=True)
+
+
+def test_reader_sees_the_writer_samples(ring, numbered_frames):
+    writer, reader = ring
+    writer.extend(*numbered_frames(5))
+    writer.extend(*numbered_frames(7, 5))
+
+    assert reader.total == 12
+    assert reader.first == 4
+    assert reader.version == writer.version
+    data = reader.snapshot()
+    assert data['pm1'].tolist() == list(range(4, 12))
+    assert np.array_equal(data['time'], writer.snapshot()['time'])
+    assert reader.snapshot(10, 20)['pm1'].tolist() == [10, 11]
+
+
+def test_reader_is_read_only(ring, numbered_frames):
+    _, reader = ring
+    with pytest.raises(ValueError):
+        reader.extend(*numbered_frames(1))
+
+
+def test_snapshot_waits_while_the_writer_writes(ring, numbered_frames):
+    writer, reader = ring
+    writer.extend(*numbered_frames(3))
+    # What 'extend' does around the write
+    writer._header['seq'] += 1
+    result = []
+    thread = threading.Thread(target=lambda: result.append(reader.snapshot()))
+    thread.start()
+    thread.join(0.1)
+    assert thread.is_alive()
+
+    writer._header['seq'] += 1
+    thread.join(1)
+    assert not thread.is_alive()
+    assert result[0]['pm1'].tolist() == [0, 1, 2]
+
+
+def test_snapshots_are_consistent_during_writes(ring, numbered_frames):
+    writer, reader = ring
+    batches = [numbered_frames(3, first) for first in range(0, 3000, 3)]
+    done = threading.Event()
+
+    def write():
+        for frames, times in batches:
+            writer.extend(frames, times)
+        done.set()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    snapshots = 0
+    while not done.is_set() or not snapshots:
+        data = reader.snapshot()
+        if not len(data['time']):
+            continue
+        # Every sample of a copy belongs to the same write: numbered 1 s apart, without
+        # old samples of the slots being overwritten
+        assert np.diff(data['pm1']).tolist() == [1] * (len(data['pm1']) - 1)
+        assert np.diff(data['time']).tolist() == [1000] * (len(data['time']) - 1)
+        assert data['time'][0] - batches[0][1][0] == 1000 * int(data['pm1'][0])
+        snapshots += 1
+    thread.join()
+    assert reader.total == 3000